@@ -0,0 +1,120 @@
+# Fixtures dos benchmarks dos fluxos contra o e-SUS simulado (tests/mock_esus)
+# Uso: python -m pytest benchmarks --benchmark-only
+#      BENCH_LATENCY_MS=150 python -m pytest benchmarks --benchmark-only   (rede mais lenta)
+import asyncio
+import json
+import os
+import pytest
+from playwright.async_api import async_playwright, Error as PlaywrightError
+from src.config.settings import settings
+from src.core.notifier import close_notifier
+from src.utils.readiness import wait_for_calendar, wait_for_options
+from tests.mock_esus import CBO_ESF, MockEsusServer, default_config, settings_for
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+# Enfermeiras extras para o lote: uma por paciente evita que contextos paralelos disputem a mesma agenda
+ENFERMEIRAS_LOTE = [f"ENFERMEIRA LOTE {letra}" for letra in "ABCDEFGH"]
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def run(loop):
+    """Executa uma corrotina no loop compartilhado pelos benchmarks (o pytest-benchmark é síncrono)."""
+    return loop.run_until_complete
+
+
+@pytest.fixture(scope="session")
+def mock_esus():
+    profissionais = default_config()["professionals"] + [
+        {"id": 100 + i, "nome": nome, "cbo": CBO_ESF} for i, nome in enumerate(ENFERMEIRAS_LOTE)
+    ]
+    server = MockEsusServer(
+        latency_ms=int(os.getenv("BENCH_LATENCY_MS", "50")),
+        slots_per_day=int(os.getenv("BENCH_SLOTS", "24")),
+        base_date="2026-10-19",
+        professionals=profissionais,
+    ).start()
+    originais = {}
+    for chave, valor in settings_for(server).items():
+        originais[chave] = getattr(settings, chave)
+        setattr(settings, chave, valor)
+    yield server
+    for chave, valor in originais.items():
+        setattr(settings, chave, valor)
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def browser(run, mock_esus):
+    async def abrir():
+        playwright = await async_playwright().start()
+        try:
+            return playwright, await playwright.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            await playwright.stop()
+            pytest.skip(f"Chromium do Playwright indisponível: {e}")
+
+    playwright, browser = run(abrir())
+    yield browser
+    run(close_notifier())
+    run(browser.close())
+    run(playwright.stop())
+
+
+@pytest.fixture(scope="session")
+def session_context(run, browser):
+    """Contexto autenticado uma única vez e reaproveitado pelos benchmarks de fluxo."""
+    from src.core.automation import WebsiteAutomation
+
+    automation = WebsiteAutomation()
+    context, page = run(automation.open_session(browser, use_cache=False))
+    run(page.close())
+    yield context
+    run(context.close())
+
+
+@pytest.fixture
+def page(run, session_context, mock_esus):
+    """Página nova, já autenticada, na tela inicial do e-SUS simulado."""
+    async def abrir():
+        page = await session_context.new_page()
+        await page.goto(mock_esus.url)
+        await page.get_by_role("navigation").wait_for(state="visible")
+        return page
+
+    page = run(abrir())
+    yield page
+    run(page.close())
+
+
+async def abrir_agenda(page, enfermeiro):
+    """Abre a agenda do profissional, como no início do agendamento."""
+    await page.get_by_role("link", name="Agenda").click()
+    await page.get_by_role("textbox", name="Busque um profissional pelo").fill(enfermeiro.lower())
+    await wait_for_options(page, enfermeiro, "bench.profissional")
+    await page.get_by_role("option", name=enfermeiro).click()
+    await wait_for_calendar(page, "bench.grade")
+
+
+@pytest.fixture
+def threshold(request):
+    """Compara a média medida com o limite de thresholds.json para o teste atual."""
+    with open(THRESHOLDS_PATH, encoding="utf-8") as arquivo:
+        limites = json.load(arquivo)
+
+    def verificar(benchmark, por_item=1):
+        if benchmark.stats is None:  # --benchmark-disable: executa sem medir
+            return
+        limite = limites[request.node.name]
+        media = benchmark.stats.stats.mean / por_item
+        benchmark.extra_info["limite"] = limite
+        assert media <= limite, f"{request.node.name}: média {media:.2f}s acima do limite de {limite}s"
+
+    return verificar
@@ -0,0 +1,66 @@
+# Benchmark: custo de importação na partida (python -X importtime) dos subcomandos leves vs. da pilha completa
+# Uso: python -m benchmarks.import_time [--repeticoes 5] [--top 5]
+#      python -m src.cli bench imports
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cada caso roda em um processo novo (cache de módulos frio); "antes" reproduz o que o main.py importava
+# ao partir: a automação inteira, com o aiogram puxado pelo notificador e as configurações validadas
+CASOS = [
+    ("check-config", ["-m", "src.cli", "check-config"]),
+    ("cli --help", ["-m", "src.cli", "--help"]),
+    ("run (automação)", ["-c", "import src.core.automation"]),
+    ("antes: main.py", ["-c", "import aiogram, src.core.automation; from src.config.settings import settings; settings.validate()"]),
+]
+
+
+def medir(argumentos):
+    """Tempo de parede do processo e tempos do -X importtime: total e por pacote de primeiro nível."""
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", *argumentos], cwd=RAIZ, capture_output=True, text=True,
+    )
+    parede = time.perf_counter() - inicio
+    pacotes = {}
+    for linha in processo.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        if not nome.startswith("  "):
+            # Sem recuo: importado diretamente (o acumulado já inclui as dependências)
+            raiz = nome.strip().split(".")[0]
+            pacotes[raiz] = pacotes.get(raiz, 0) + int(acumulado)
+    return parede * 1000, sum(pacotes.values()) / 1000, pacotes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo de importação na partida dos subcomandos")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Pacotes mais caros exibidos por caso")
+    args = parser.parse_args(argv)
+
+    medianas = {}
+    for nome, argumentos in CASOS:
+        medidas = [medir(argumentos) for _ in range(max(1, args.repeticoes))]
+        parede = statistics.median(m[0] for m in medidas)
+        importacao = statistics.median(m[1] for m in medidas)
+        medianas[nome] = parede
+        pacotes = sorted(medidas[-1][2].items(), key=lambda item: -item[1])[:args.top]
+        caros = ", ".join(f"{pacote} {tempo / 1000:.0f}ms" for pacote, tempo in pacotes)
+        print(f"{nome:18s} processo {parede:7.1f}ms  importação {importacao:7.1f}ms  ({caros})")
+
+    antes = medianas["antes: main.py"]
+    for nome in ("check-config", "run (automação)"):
+        print(f"Ganho de {nome} sobre a partida antiga: {antes - medianas[nome]:.1f}ms ({antes / medianas[nome]:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
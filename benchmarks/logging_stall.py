@@ -0,0 +1,117 @@
+# Benchmark: tempo de bloqueio do loop de eventos com os handlers síncronos antigos vs. QueueHandler
+# Uso: python -m benchmarks.logging_stall [--mensagens 20000] [--console] [--io-ms 0.2]
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+IO_SECONDS = 0.0
+
+
+class SlowIOMixin:
+    """Simula a latência de escrita de um disco lento ou terminal congestionado."""
+
+    def emit(self, record):
+        if IO_SECONDS:
+            time.sleep(IO_SECONDS)
+        super().emit(record)
+
+
+class SlowFileHandler(SlowIOMixin, logging.FileHandler):
+    pass
+
+
+class SlowRotatingFileHandler(SlowIOMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+def logger_sincrono(path, console):
+    """Configuração anterior: FileHandler + StreamHandler direto no logger."""
+    logger = logging.getLogger("bench.sincrono")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handlers = [SlowFileHandler(path)]
+    if console:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(FORMAT))
+        logger.addHandler(handler)
+    return logger, handlers, None
+
+
+def logger_fila(path, console):
+    """Configuração atual: QueueHandler no logger, escrita na thread do QueueListener."""
+    logger = logging.getLogger("bench.fila")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handlers = [SlowRotatingFileHandler(path, maxBytes=50 * 1024 * 1024, backupCount=1)]
+    if console:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return logger, handlers, listener
+
+
+async def medir(logger, mensagens, lote=50):
+    """Roda um ticker de 1 ms enquanto o fluxo loga; retorna o atraso acumulado e máximo do ticker."""
+    atrasos = []
+    parar = asyncio.Event()
+
+    async def ticker():
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.001)
+            atrasos.append(time.perf_counter() - inicio - 0.001)
+
+    async def fluxo():
+        for i in range(mensagens):
+            logger.info("Verificando slot %s: paciente=%s horário=%s", i, "Maria da Silva", "07:30")
+            if i % lote == 0:
+                await asyncio.sleep(0)
+        parar.set()
+
+    tarefa = asyncio.create_task(ticker())
+    inicio = time.perf_counter()
+    await fluxo()
+    total = time.perf_counter() - inicio
+    await tarefa
+    return {
+        "tempo_fluxo_s": round(total, 4),
+        "atraso_total_ms": round(sum(atrasos) * 1000, 2),
+        "atraso_max_ms": round(max(atrasos, default=0) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mensagens", type=int, default=20000)
+    parser.add_argument("--console", action="store_true", help="Inclui o handler de console")
+    parser.add_argument("--io-ms", type=float, default=0.0, help="Latência simulada por escrita no arquivo (ms)")
+    args = parser.parse_args()
+
+    global IO_SECONDS
+    IO_SECONDS = args.io_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome, fabrica in (("sincrono", logger_sincrono), ("fila", logger_fila)):
+            logger, handlers, listener = fabrica(os.path.join(tmp, f"{nome}.log"), args.console)
+            resultado = asyncio.run(medir(logger, args.mensagens))
+            if listener:
+                listener.stop()
+            for handler in handlers:
+                handler.close()
+            print(f"{nome:9s} {resultado}")
+
+
+if __name__ == "__main__":
+    main()
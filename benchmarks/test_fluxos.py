@@ -0,0 +1,101 @@
+# Benchmarks dos fluxos da automação contra o e-SUS simulado, com limites em thresholds.json
+import itertools
+import os
+from benchmarks.conftest import ENFERMEIRAS_LOTE, abrir_agenda
+from src.core.agendamento import ScheduleAppointment
+from src.core.atendimento import AttendanceList
+from src.core.automation import WebsiteAutomation
+from src.core.context_pool import ContextPool
+from src.core.session_cache import SessionCache
+from tests.mock_esus import ENFERMEIRO
+
+# Cada rodada usa um paciente diferente para não depender do estado deixado pela anterior
+pacientes = (f"PACIENTE MOCK {i:03d}" for i in itertools.count(1))
+
+
+def test_login_frio(benchmark, run, browser, threshold):
+    """Login completo: cookies, credenciais e escolha da unidade."""
+    automation = WebsiteAutomation()
+
+    async def login():
+        context, _ = await automation.open_session(browser, use_cache=False)
+        await context.close()
+
+    benchmark.pedantic(lambda: run(login()), rounds=3, iterations=1, warmup_rounds=1)
+    threshold(benchmark)
+
+
+def test_login_quente(benchmark, run, browser, tmp_path, threshold):
+    """Restauração da sessão em cache (storage_state) e validação no site."""
+    automation = WebsiteAutomation()
+    automation.session_cache = SessionCache(path=str(tmp_path / "session.bin"), key=SessionCache._derive_key())
+
+    async def login():
+        context, _ = await automation.open_session(browser)
+        await context.close()
+
+    run(login())  # Primeira execução faz o login a frio e grava o cache
+    benchmark.pedantic(lambda: run(login()), rounds=5, iterations=1)
+    threshold(benchmark)
+
+
+def test_busca_horario(benchmark, run, page, threshold):
+    """Captura da grade e escolha do horário (política padrão) na agenda já aberta."""
+    run(abrir_agenda(page, ENFERMEIRO))
+    scheduler = ScheduleAppointment(enfermeiro=ENFERMEIRO)
+
+    slot, candidato = benchmark.pedantic(lambda: run(scheduler._find_slot(page)), rounds=5, iterations=1)
+    assert slot is not None and candidato["time"]
+    threshold(benchmark)
+
+
+def test_agendamento(benchmark, run, page, mock_esus, threshold):
+    """Agendamento completo, seguido da remoção do agendamento criado."""
+    def agendar():
+        scheduler = ScheduleAppointment(paciente=next(pacientes), enfermeiro=ENFERMEIRO)
+        run(scheduler.schedule_appointment(page))
+        run(scheduler.remover_agenda(page))
+
+    benchmark.pedantic(agendar, rounds=3, iterations=1)
+    assert mock_esus.mock.appointments == {}
+    threshold(benchmark)
+
+
+def test_atendimento(benchmark, run, page, mock_esus, threshold):
+    """Inclusão na lista de atendimentos, SOAP (modelo padrão, A03) e notificação."""
+    finalizados = len(mock_esus.mock.finished)
+
+    def atender():
+        attendance = AttendanceList(paciente=next(pacientes), enfermeiro=ENFERMEIRO)
+        run(attendance.lista_atendimento(page))
+        run(attendance.abrir_atendimento(page))
+        run(attendance.preencher_soap(page))
+        run(attendance.notify_telegram_bot())
+
+    benchmark.pedantic(atender, rounds=3, iterations=1)
+    assert len(mock_esus.mock.finished) > finalizados
+    threshold(benchmark)
+
+
+def test_lote_vazao(benchmark, run, browser, threshold):
+    """Lote de pacientes pelo pool de contextos (login incluso); o limite é por paciente."""
+    tamanho = int(os.getenv("BENCH_POOL_SIZE", "2"))
+    entradas_por_rodada = len(ENFERMEIRAS_LOTE[:4])
+
+    async def lote():
+        automation = WebsiteAutomation()
+        entradas = [
+            {"paciente": next(pacientes), "enfermeiro": enfermeira, "unidade": None}
+            for enfermeira in ENFERMEIRAS_LOTE[:entradas_por_rodada]
+        ]
+        pool = ContextPool(browser, automation, size=tamanho)
+        await pool.start()
+        try:
+            return await pool.run(entradas)
+        finally:
+            await pool.close()
+
+    resultados = benchmark.pedantic(lambda: run(lote()), rounds=2, iterations=1)
+    assert [r for r in resultados if r["status"] != "sucesso"] == []
+    benchmark.extra_info["pool_size"] = tamanho
+    threshold(benchmark, por_item=entradas_por_rodada)
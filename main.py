@@ -1,10 +1,71 @@
-# Ponto de entrada da aplicação
+# Ponto de entrada da aplicação (opções antigas; os subcomandos estão em python -m src.cli)
+import argparse
 import asyncio
-from src.core.automation import WebsiteAutomation
+import sys
+from src import cli
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HealthSync Automator")
+    parser.add_argument(
+        "--worklist",
+        help="Arquivo CSV/JSONL com a fila de pacientes ('-' para ler da entrada padrão)",
+    )
+    parser.add_argument(
+        "--output",
+        help="Arquivo JSONL onde gravar o resultado de cada paciente do lote",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        help="Número de contextos paralelos do lote (padrão: POOL_SIZE do .env)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processos que dividem o lote por unidade/enfermeiro (padrão: SHARD_WORKERS do .env)",
+    )
+    parser.add_argument(
+        "--report",
+        help="Arquivo JSON onde gravar o relatório consolidado do lote dividido em processos",
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Identificador da execução a retomar (padrão: derivado da lista de pacientes e da data)",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Descarta os checkpoints da execução e refaz todas as etapas",
+    )
+    parser.add_argument(
+        "--record-har",
+        metavar="ARQUIVO",
+        help="Grava o tráfego de rede da execução em um arquivo HAR",
+    )
+    parser.add_argument(
+        "--replay-har",
+        metavar="ARQUIVO",
+        help="Executa offline, servindo as respostas de um HAR gravado (sem notificar o Telegram)",
+    )
+    parser.add_argument(
+        "--har-timing",
+        choices=("original", "zero"),
+        help="No replay, usa os tempos de resposta gravados ou nenhuma espera (padrão: HAR_TIMING do .env)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Mantém o navegador logado e executa os jobs pedidos pelo bot do Telegram ou pela API local",
+    )
+    return parser.parse_args()
 
 async def main():
-    automation = WebsiteAutomation()
-    await automation.run()
+    args = parse_args()
+    if args.daemon:
+        return await cli.cmd_bot(args)
+    if not args.worklist:
+        return await cli.cmd_run(args)
+    return await cli.cmd_batch(args)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
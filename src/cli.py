@@ -0,0 +1,177 @@
+# src/cli.py
+# Linha de comando: python -m src.cli {run,batch,bot,bench,check-config}
+# Só as configurações são importadas aqui; Playwright, aiogram e a automação são carregados pelo
+# subcomando que os usa, então check-config e --help partem sem o custo do fluxo completo.
+import argparse
+import json
+import os
+import subprocess
+import sys
+from src.config.settings import REQUIRED, settings
+
+# Escopos de configuração exigidos por subcomando (veja REQUIRED em src/config/settings.py)
+SCOPES = {
+    "run": ("site", "fluxo", "telegram"),
+    "batch": ("site", "telegram"),
+    "bot": ("site", "telegram"),
+}
+
+
+def scopes_for(command, replay=False):
+    """Escopos validados pelo subcomando; no replay do HAR não há notificação ao Telegram."""
+    escopos = SCOPES.get(command, ())
+    if replay:
+        escopos = tuple(escopo for escopo in escopos if escopo != "telegram")
+    return escopos
+
+
+def _add_har_options(parser, record=True):
+    if record:
+        parser.add_argument("--record-har", metavar="ARQUIVO", help="Grava o tráfego de rede da execução em um arquivo HAR")
+    parser.add_argument(
+        "--replay-har", metavar="ARQUIVO",
+        help="Executa offline, servindo as respostas de um HAR gravado (sem notificar o Telegram)",
+    )
+    parser.add_argument(
+        "--har-timing", choices=("original", "zero"),
+        help="No replay, usa os tempos de resposta gravados ou nenhuma espera (padrão: HAR_TIMING do .env)",
+    )
+
+
+def _add_run_options(parser):
+    parser.add_argument("--run-id", help="Identificador da execução a retomar (padrão: derivado dos pacientes e da data)")
+    parser.add_argument("--fresh", action="store_true", help="Descarta os checkpoints da execução e refaz todas as etapas")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="HealthSync Automator")
+    comandos = parser.add_subparsers(dest="command", required=True)
+
+    run = comandos.add_parser("run", help="Fluxo completo para o PACIENTE do .env")
+    _add_run_options(run)
+    _add_har_options(run)
+
+    batch = comandos.add_parser("batch", help="Fila de pacientes de um CSV/JSONL")
+    batch.add_argument("worklist", help="Arquivo CSV/JSONL com a fila de pacientes ('-' para ler da entrada padrão)")
+    batch.add_argument("--output", help="Arquivo JSONL onde gravar o resultado de cada paciente")
+    batch.add_argument("--pool-size", type=int, help="Número de contextos paralelos (padrão: POOL_SIZE do .env)")
+    batch.add_argument("--workers", type=int, help="Processos que dividem o lote por unidade/enfermeiro (padrão: SHARD_WORKERS)")
+    batch.add_argument("--report", help="Arquivo JSON com o relatório consolidado do lote dividido em processos")
+    _add_run_options(batch)
+    _add_har_options(batch, record=False)
+
+    comandos.add_parser("bot", help="Daemon com o navegador logado e o bot do Telegram recebendo jobs")
+
+    bench = comandos.add_parser("bench", help="Benchmarks: custo de importação na partida ou fluxos no e-SUS simulado")
+    bench.add_argument("alvo", nargs="?", choices=("imports", "fluxos"), default="imports")
+    bench.add_argument("--repeticoes", type=int, default=5, help="Processos medidos por caso no benchmark de importação")
+
+    check = comandos.add_parser("check-config", help="Confere as variáveis exigidas por cada subcomando")
+    check.add_argument("--scope", choices=tuple(SCOPES), help="Confere apenas o subcomando dado")
+    return parser
+
+
+def apply_har(args):
+    """Opções de HAR da linha de comando sobre as do .env; retorna se a execução é um replay."""
+    record = getattr(args, "record_har", None)
+    if record or args.replay_har:
+        settings.HAR_MODE = "record" if record else "replay"
+        settings.HAR_PATH = record or args.replay_har
+    if args.har_timing:
+        settings.HAR_TIMING = args.har_timing
+    return (settings.HAR_MODE or "").lower() == "replay"
+
+
+async def cmd_run(args):
+    settings.validate(*scopes_for("run", apply_har(args)))
+    from src.core.automation import WebsiteAutomation
+
+    await WebsiteAutomation().run(run_id=args.run_id, fresh=args.fresh)
+    return 0
+
+
+async def cmd_batch(args):
+    settings.validate(*scopes_for("batch", apply_har(args)))
+    from src.core.worklist import load_worklist
+
+    entradas = load_worklist(args.worklist)
+    if not settings.ENFERMEIRO and any(not entrada.get("enfermeiro") for entrada in entradas):
+        raise ValueError("Variável de ambiente ENFERMEIRO não está definida (há pacientes sem enfermeiro na lista)")
+    unidades = {(entrada.get("unidade") or settings.UNIDADE).lower() for entrada in entradas}
+    if (args.workers or settings.SHARD_WORKERS) > 1 or len(unidades) > 1:
+        # Lista com várias unidades (ou vários processos pedidos): um processo por (unidade, enfermeiro)
+        from src.core.sharding import run_sharded
+
+        resultados, relatorio = await run_sharded(
+            entradas, workers=args.workers, pool_size=args.pool_size, run_id=args.run_id, fresh=args.fresh
+        )
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as arquivo:
+                json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    else:
+        from src.core.automation import WebsiteAutomation
+
+        resultados = await WebsiteAutomation().run_batch(
+            entradas, pool_size=args.pool_size, run_id=args.run_id, fresh=args.fresh
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as arquivo:
+            for resultado in resultados:
+                arquivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+    return 0 if all(r["status"] == "sucesso" for r in resultados) else 1
+
+
+async def cmd_bot(args):
+    settings.validate(*scopes_for("bot"))
+    from src.core.daemon import run_daemon
+
+    await run_daemon()
+    return 0
+
+
+def cmd_bench(args):
+    if args.alvo == "imports":
+        from benchmarks.import_time import main as import_time
+
+        return import_time(["--repeticoes", str(args.repeticoes)])
+    comando = [sys.executable, "-m", "pytest", "benchmarks", "--benchmark-only"]
+    return subprocess.call(comando, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def check_config(scope=None, out=None):
+    """Relata, por subcomando, as variáveis obrigatórias ausentes; retorna 0 se tudo estiver definido."""
+    out = out or sys.stdout
+    try:
+        settings.load()
+    except ValueError as e:
+        # Um número inválido no .env (ex.: POOL_SIZE=dois) impede a leitura das demais
+        print(f"Configuração inválida: {e}", file=out)
+        return 1
+    codigo = 0
+    for comando in (scope,) if scope else tuple(SCOPES):
+        faltando = settings.missing(*SCOPES[comando])
+        if faltando:
+            codigo = 1
+            print(f"{comando}: faltando {', '.join(faltando)}", file=out)
+        else:
+            print(f"{comando}: ok ({', '.join(SCOPES[comando])})", file=out)
+    opcionais = [campo for campo in REQUIRED["telegram"] if not getattr(settings, campo)]
+    if opcionais and not scope:
+        print("Sem o Telegram, apenas 'run --replay-har' e 'batch --replay-har' podem ser usados", file=out)
+    return codigo
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "check-config":
+        return check_config(args.scope)
+    if args.command == "bench":
+        return cmd_bench(args)
+    import asyncio
+
+    comandos = {"run": cmd_run, "batch": cmd_batch, "bot": cmd_bot}
+    return asyncio.run(comandos[args.command](args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
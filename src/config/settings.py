@@ -2,27 +2,133 @@
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+# Variáveis obrigatórias por escopo; cada subcomando valida só as que usa
+REQUIRED = {
+    "site": ("WEBSITE_URL", "USERNAME", "PASSWORD", "UNIDADE"),
+    "fluxo": ("ENFERMEIRO", "PACIENTE"),
+    "telegram": ("TELEGRAM_BOT_TOKEN", "TELEGRAM_BOT_CHAT_ID", "TELEGRAM_GROUP_CHAT_ID"),
+}
+
+
+def _from_env():
+    """Lê o .env e o ambiente; chamado no primeiro acesso a uma configuração, não na importação."""
+    load_dotenv()
+
+    class Valores:
+        WEBSITE_URL = os.getenv("WEBSITE_URL")
+        USERNAME = os.getenv("USERNAME")
+        PASSWORD = os.getenv("PASSWORD")
+        UNIDADE = os.getenv("UNIDADE")
+        ENFERMEIRO = os.getenv("ENFERMEIRO")
+        PACIENTE = os.getenv("PACIENTE")
+        TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")  # Token do bot
+        TELEGRAM_BOT_CHAT_ID = os.getenv("TELEGRAM_BOT_CHAT_ID")  # ID do chat privado com o bot
+        TELEGRAM_GROUP_CHAT_ID = os.getenv("TELEGRAM_GROUP_CHAT_ID")  # ID do grupo
+        TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")  # Servidor da Bot API (padrão: api.telegram.org)
+        NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "10"))  # Conclusões agrupadas por mensagem
+        NOTIFY_INTERVAL = float(os.getenv("NOTIFY_INTERVAL", "30"))  # Espera máxima (s) para montar um resumo
+        NOTIFY_MIN_INTERVAL = float(os.getenv("NOTIFY_MIN_INTERVAL", "3"))  # Intervalo mínimo (s) entre envios ao grupo
+        POOL_SIZE = int(os.getenv("POOL_SIZE", "1"))  # Contextos paralelos no modo em lote
+        DAEMON_CONCURRENCY = int(os.getenv("DAEMON_CONCURRENCY", "2"))  # Jobs simultâneos no daemon (contextos logados)
+        DAEMON_MAX_QUEUE = int(os.getenv("DAEMON_MAX_QUEUE", "20"))  # Jobs aguardando antes de recusar novos pedidos
+        DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8787"))  # Porta da API local de jobs (127.0.0.1)
+        DAEMON_FULL_DAYS_TTL = int(os.getenv("DAEMON_FULL_DAYS_TTL", "900"))  # Segundos em que um dia lotado vale no daemon
+        SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "1"))  # Processos do lote dividido por unidade/enfermeiro
+        BULK_CANCEL = os.getenv("BULK_CANCEL", "1") == "1"  # No lote, remove os agendamentos criados numa passada ao final
+        CHECKPOINTS = os.getenv("CHECKPOINTS", "1") == "1"  # Guarda o progresso por etapa para retomar execuções
+        CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "src/cache/checkpoints.db")
+        STEP_RETRIES = int(os.getenv("STEP_RETRIES", "2"))  # Novas tentativas de cada etapa antes de falhar o paciente
+        STEP_BACKOFF = os.getenv("STEP_BACKOFF", "3,notificacao=10")  # Espera base (s) por etapa: "3" ou "etapa=s,..."
+        STEP_BACKOFF_MAX = float(os.getenv("STEP_BACKOFF_MAX", "60"))
+        SESSION_CACHE = os.getenv("SESSION_CACHE", "1") == "1"  # Reutiliza a sessão autenticada entre execuções
+        SESSION_CACHE_PATH = os.getenv("SESSION_CACHE_PATH", "src/cache/session.bin")
+        SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "1800"))  # Validade da sessão em cache (segundos)
+        SESSION_CACHE_KEY = os.getenv("SESSION_CACHE_KEY")  # Chave Fernet; derivada das credenciais se ausente
+        SLOT_POLICY = os.getenv("SLOT_POLICY", "earliest")  # earliest, closest ou after
+        SLOT_TIME = os.getenv("SLOT_TIME")  # Horário alvo (HH:MM) para as políticas closest/after
+        AGENDA_SEARCH_VIEWS = int(os.getenv("AGENDA_SEARCH_VIEWS", "1"))  # Visões (dias/semanas) percorridas na busca
+        AGENDA_VIEW = os.getenv("AGENDA_VIEW")  # Botão da visão a usar na busca (ex.: Dia, Semana); padrão: a que abrir
+        LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text ou json (arquivo de log)
+        LOG_ROTATION = os.getenv("LOG_ROTATION", "size")  # size ou time
+        LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+        LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")
+        LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+        TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"  # Grava trace e métricas de cada execução
+        TRACE_DIR = os.getenv("TRACE_DIR", "src/logs/traces")
+        DIAGNOSTICS_ENABLED = os.getenv("DIAGNOSTICS_ENABLED", "1") == "1"  # Grava um pacote de diagnóstico a cada falha
+        DIAGNOSTICS_DIR = os.getenv("DIAGNOSTICS_DIR", "src/logs/diagnostics")
+        DIAGNOSTICS_TRACE = os.getenv("DIAGNOSTICS_TRACE", "0") == "1"  # Inclui o trace do Playwright do paciente
+        DIAGNOSTICS_MAX_BUNDLE_MB = float(os.getenv("DIAGNOSTICS_MAX_BUNDLE_MB", "20"))  # Limite de cada pacote
+        DIAGNOSTICS_MAX_MB = float(os.getenv("DIAGNOSTICS_MAX_MB", "200"))  # Limite do diretório (remove os mais antigos)
+        DIAGNOSTICS_KEEP_DAYS = float(os.getenv("DIAGNOSTICS_KEEP_DAYS", "7"))  # Retenção dos pacotes
+        BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "normal")  # normal (janela visível) ou fast (headless, com bloqueios)
+        HEADLESS = os.getenv("HEADLESS") == "1" if os.getenv("HEADLESS") else None  # Sobrescreve o padrão do perfil
+        BLOCK_RESOURCE_TYPES = os.getenv("BLOCK_RESOURCE_TYPES", "image,font,media")  # Tipos bloqueados no perfil fast
+        BLOCK_URL_PATTERNS = os.getenv(
+            "BLOCK_URL_PATTERNS", "google-analytics.com,googletagmanager.com,doubleclick.net,hotjar.com,clarity.ms"
+        )  # Trechos de URL bloqueados no perfil fast (analytics, rastreadores)
+        SELECTOR_STRATEGY = os.getenv("SELECTOR_STRATEGY", "race")  # race (variantes em paralelo) ou ordered (pela taxa de acerto)
+        SELECTOR_PROBE_MS = int(os.getenv("SELECTOR_PROBE_MS", "1500"))  # Espera por variante no modo ordered
+        SELECTOR_STATS_PATH = os.getenv("SELECTOR_STATS_PATH", "src/cache/selectors.json")
+        API_CAPTURE = os.getenv("API_CAPTURE", "1") == "1"  # Lê agenda e lista das respostas da API antes do DOM
+        API_URL_PATTERN = os.getenv("API_URL_PATTERN", "graphql")  # Regex das URLs da API capturadas
+        HAR_MODE = os.getenv("HAR_MODE")  # record (grava o tráfego da execução) ou replay (serve o HAR, sem rede)
+        HAR_PATH = os.getenv("HAR_PATH", "src/cache/sessao.har")
+        HAR_TIMING = os.getenv("HAR_TIMING", "zero")  # Replay com os tempos gravados (original) ou sem espera (zero)
+        ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "0") == "1"  # Ajusta os fluxos simultâneos do pool pela saúde do e-SUS
+        ADAPTIVE_MIN = int(os.getenv("ADAPTIVE_MIN", "1"))  # Mínimo de fluxos simultâneos (o máximo é o tamanho do pool)
+        ADAPTIVE_LATENCY_MS = int(os.getenv("ADAPTIVE_LATENCY_MS", "1500"))  # p90 da latência da API que faz o limite cair
+        ADAPTIVE_ERROR_RATE = float(os.getenv("ADAPTIVE_ERROR_RATE", "0.05"))  # Fração de 5xx/timeouts que faz o limite cair
+        ADAPTIVE_WINDOW = int(os.getenv("ADAPTIVE_WINDOW", "4"))  # Fluxos concluídos entre duas decisões
+        ADAPTIVE_SCHEDULE = os.getenv("ADAPTIVE_SCHEDULE", "")  # Tetos por horário, ex.: 07:00-12:00=2,13:00-17:00=3
+        GOVERNOR = os.getenv("GOVERNOR", "1") == "1"  # Recicla contextos do pool por memória/fluxos e relança o navegador se cair
+        GOVERNOR_MAX_FLOWS = int(os.getenv("GOVERNOR_MAX_FLOWS", "100"))  # Fluxos por contexto antes da troca (0 desliga)
+        GOVERNOR_MAX_HEAP_MB = int(os.getenv("GOVERNOR_MAX_HEAP_MB", "400"))  # Heap JS do contexto que força a troca (0 desliga)
+        GOVERNOR_MAX_NODES = int(os.getenv("GOVERNOR_MAX_NODES", "0"))  # Nós de DOM que forçam a troca (0 desliga)
+        GOVERNOR_MAX_RESTARTS = int(os.getenv("GOVERNOR_MAX_RESTARTS", "3"))  # Relançamentos do navegador por execução
+        AUTOCOMPLETE_CACHE = os.getenv("AUTOCOMPLETE_CACHE", "1") == "1"  # Guarda a opção escolhida em cada autocomplete
+        AUTOCOMPLETE_CACHE_PATH = os.getenv("AUTOCOMPLETE_CACHE_PATH", "src/cache/autocomplete.json")
+        AUTOCOMPLETE_CACHE_TTL = int(os.getenv("AUTOCOMPLETE_CACHE_TTL", "604800"))  # Validade de cada entrada (segundos)
+        AUTOCOMPLETE_CACHE_SIZE = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "500"))  # Entradas mantidas (descarta as menos usadas)
+        AUTOCOMPLETE_CACHE_WAIT_MS = int(os.getenv("AUTOCOMPLETE_CACHE_WAIT_MS", "3000"))  # Espera pela opção em cache antes de refazer a busca
+        SOAP_TEMPLATE = os.getenv("SOAP_TEMPLATE", "a03")  # Modelo de SOAP padrão (nome em SOAP_TEMPLATES_DIR ou caminho)
+        SOAP_TEMPLATES_DIR = os.getenv("SOAP_TEMPLATES_DIR", "src/config/soap")
+
+    return {nome: valor for nome, valor in vars(Valores).items() if nome.isupper()}
+
 
 class Settings:
-    WEBSITE_URL = os.getenv("WEBSITE_URL")
-    USERNAME = os.getenv("USERNAME")
-    PASSWORD = os.getenv("PASSWORD")
-    UNIDADE = os.getenv("UNIDADE")
-    ENFERMEIRO = os.getenv("ENFERMEIRO")
-    PACIENTE = os.getenv("PACIENTE")
-    TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")  # Token do bot
-    TELEGRAM_BOT_CHAT_ID = os.getenv("TELEGRAM_BOT_CHAT_ID")  # ID do chat privado com o bot
-    TELEGRAM_GROUP_CHAT_ID = os.getenv("TELEGRAM_GROUP_CHAT_ID")  # ID do grupo
-
-    def validate(self):
-        required = [
-            "WEBSITE_URL", "USERNAME", "PASSWORD", "UNIDADE", "ENFERMEIRO", "PACIENTE",
-            "TELEGRAM_BOT_TOKEN", "TELEGRAM_BOT_CHAT_ID", "TELEGRAM_GROUP_CHAT_ID"
-        ]
-        for field in required:
-            if not getattr(self, field):
-                raise ValueError(f"Variável de ambiente {field} não está definida")
+    """Configurações da aplicação, lidas do ambiente no primeiro acesso a qualquer uma delas.
+
+    Valores atribuídos no processo (ex.: settings.HAR_MODE pela linha de comando) prevalecem sobre o .env.
+    """
+
+    def __getattr__(self, name):
+        # Só é chamado para nomes ainda não carregados
+        if name.startswith("_") or self.__dict__.get("_loaded"):
+            raise AttributeError(name)
+        self.load()
+        return getattr(self, name)
+
+    def load(self):
+        if not self.__dict__.get("_loaded"):
+            for nome, valor in _from_env().items():
+                self.__dict__.setdefault(nome, valor)
+            self._loaded = True
+        return self
+
+    def missing(self, *scopes):
+        """Variáveis obrigatórias ausentes nos escopos dados (todos, se nenhum for informado)."""
+        faltando = []
+        for scope in scopes or REQUIRED:
+            if scope not in REQUIRED:
+                raise ValueError(f"Escopo de validação desconhecido: {scope} (use {', '.join(REQUIRED)})")
+            faltando += [field for field in REQUIRED[scope] if not getattr(self, field) and field not in faltando]
+        return faltando
+
+    def validate(self, *scopes):
+        for field in self.missing(*scopes):
+            raise ValueError(f"Variável de ambiente {field} não está definida")
 
 settings = Settings()
-settings.validate()
\ No newline at end of file
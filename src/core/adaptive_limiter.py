@@ -0,0 +1,198 @@
+# src/core/adaptive_limiter.py
+import asyncio
+import re
+from collections import deque
+from datetime import datetime
+from src.config.settings import settings
+from src.utils.logger import logger
+from src.utils.tracing import tracer
+
+# Faixa de horário com teto de fluxos simultâneos: "07:00-12:00=2"
+FAIXA = re.compile(r"^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})=(\d+)$")
+
+
+def parse_schedule(texto):
+    """Tetos por horário ("07:00-12:00=2,13:00-17:00=3") como [(início, fim, teto)] em minutos do dia."""
+    faixas = []
+    for parte in (texto or "").split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        casamento = FAIXA.match(parte)
+        if not casamento:
+            raise ValueError(f"Faixa de ADAPTIVE_SCHEDULE inválida: '{parte}' (formato: HH:MM-HH:MM=N)")
+        h1, m1, h2, m2, teto = map(int, casamento.groups())
+        inicio, fim = h1 * 60 + m1, h2 * 60 + m2
+        if inicio >= fim or fim > 24 * 60 or teto < 1:
+            raise ValueError(f"Faixa de ADAPTIVE_SCHEDULE inválida: '{parte}' (início antes do fim e teto de pelo menos 1)")
+        faixas.append((inicio, fim, teto))
+    return faixas
+
+
+def _p90(valores):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.9))]
+
+
+class AdaptiveLimiter:
+    """Controle AIMD do número de fluxos simultâneos contra o e-SUS.
+
+    A cada ADAPTIVE_WINDOW fluxos concluídos o controlador olha a janela: se o p90 da latência das
+    chamadas à API passou de ADAPTIVE_LATENCY_MS, ou se a fração de respostas 5xx (ou de fluxos que
+    falharam por timeout) passou de ADAPTIVE_ERROR_RATE, o limite cai pela metade (sem ficar abaixo do
+    mínimo); se a janela foi saudável e todos os fluxos permitidos estiveram em uso, sobe um. O teto
+    do horário (ADAPTIVE_SCHEDULE) vale sobre o limite, para poupar o servidor no horário das consultas.
+    """
+
+    def __init__(self, minimum=None, maximum=None, initial=None, latency_ms=None, error_rate=None,
+                 window=None, decrease=0.5, schedule=None, clock=None):
+        self.minimum = max(1, minimum or settings.ADAPTIVE_MIN)
+        self.maximum = max(self.minimum, maximum or settings.POOL_SIZE)
+        self.limit = min(self.maximum, max(self.minimum, initial or self.minimum))
+        self.latency_ms = latency_ms if latency_ms is not None else settings.ADAPTIVE_LATENCY_MS
+        self.error_rate = error_rate if error_rate is not None else settings.ADAPTIVE_ERROR_RATE
+        self.window = max(1, window or settings.ADAPTIVE_WINDOW)
+        self.decrease = decrease
+        self.schedule = parse_schedule(settings.ADAPTIVE_SCHEDULE if schedule is None else schedule)
+        self.clock = clock or datetime.now
+        self.active = 0
+        self.decisions = deque(maxlen=50)
+        self._condition = None
+        self._loop = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self.latencies = []
+        self.requests = 0
+        self.server_errors = 0
+        self.flows = 0
+        self.timeouts = 0
+        self.saturated = False
+
+    # Limite vigente
+
+    def ceiling(self):
+        """Teto do horário atual (ou o máximo configurado fora das faixas)."""
+        agora = self.clock()
+        minuto = agora.hour * 60 + agora.minute
+        for inicio, fim, teto in self.schedule:
+            if inicio <= minuto < fim:
+                return max(self.minimum, min(self.maximum, teto))
+        return self.maximum
+
+    def current(self):
+        return min(self.limit, self.ceiling())
+
+    def _condicao(self):
+        # A condição pertence ao loop em que é usada (o lote e o daemon rodam em loops próprios)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._condition = loop, asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        """Aguarda uma vaga dentro do limite vigente antes de iniciar um fluxo."""
+        condicao = self._condicao()
+        async with condicao:
+            await condicao.wait_for(lambda: self.active < self.current())
+            self.active += 1
+            if self.active >= self.current():
+                self.saturated = True
+
+    async def release(self, resultado=None):
+        """Libera a vaga do fluxo e registra o seu resultado."""
+        condicao = self._condicao()
+        async with condicao:
+            self.active -= 1
+            if resultado is not None:
+                self.observe_flow(resultado)
+            condicao.notify_all()
+
+    # Sinais observados
+
+    def attach(self, context):
+        """Acompanha a latência e o status das chamadas à API feitas pelo contexto."""
+        padrao = re.compile(settings.API_URL_PATTERN)
+
+        def finalizada(request):
+            if padrao.search(request.url):
+                fim = (request.timing or {}).get("responseEnd", -1)
+                if fim is not None and fim >= 0:
+                    self.observe_latency(fim)
+
+        def resposta(response):
+            if padrao.search(response.url):
+                self.observe_status(response.status)
+
+        def falhou(request):
+            if padrao.search(request.url):
+                self.observe_status(None)
+
+        context.on("requestfinished", finalizada)
+        context.on("response", resposta)
+        context.on("requestfailed", falhou)
+
+    def observe_latency(self, latencia_ms):
+        self.latencies.append(latencia_ms)
+
+    def observe_status(self, status):
+        """Status da resposta da API; None para uma chamada que falhou sem resposta."""
+        self.requests += 1
+        if status is None or status >= 500:
+            self.server_errors += 1
+
+    def observe_flow(self, resultado):
+        self.flows += 1
+        erro = (resultado.get("erro") or "").lower()
+        if resultado.get("status") == "falha" and ("timeout" in erro or "tempo de espera" in erro):
+            self.timeouts += 1
+        if self.flows >= self.window:
+            self._decide()
+
+    # Decisão AIMD
+
+    def _decide(self):
+        p90 = _p90(self.latencies) if self.latencies else None
+        taxa_5xx = self.server_errors / self.requests if self.requests else 0.0
+        taxa_timeout = self.timeouts / self.flows if self.flows else 0.0
+        anterior = self.limit
+        teto = self.ceiling()
+        if p90 is not None and self.latency_ms and p90 > self.latency_ms:
+            motivo = "latencia"
+        elif taxa_5xx > self.error_rate:
+            motivo = "erros_5xx"
+        elif taxa_timeout > self.error_rate:
+            motivo = "timeouts"
+        elif self.saturated and self.limit < teto:
+            motivo = "aumento"
+        else:
+            motivo = "mantido"
+        if motivo in ("latencia", "erros_5xx", "timeouts"):
+            self.limit = max(self.minimum, int(self.limit * self.decrease))
+        elif motivo == "aumento":
+            self.limit += 1
+        decisao = {
+            "hora": self.clock().strftime("%H:%M:%S"),
+            "motivo": motivo,
+            "limite_anterior": anterior,
+            "limite": self.limit,
+            "teto": teto,
+            "p90_ms": round(p90, 1) if p90 is not None else None,
+            "taxa_5xx": round(taxa_5xx, 3),
+            "taxa_timeout": round(taxa_timeout, 3),
+        }
+        self.decisions.append(decisao)
+        tracer.gauge("healthsync_concurrency_limit", self.current())
+        if self.limit != anterior:
+            logger.info("Concorrência adaptativa: %s -> %s fluxos (%s)", anterior, self.limit, decisao)
+        self._reset_window()
+        return decisao
+
+    def stats(self):
+        return {
+            "limite": self.current(),
+            "limite_aimd": self.limit,
+            "teto": self.ceiling(),
+            "ativos": self.active,
+            "decisoes": list(self.decisions)[-10:],
+        }
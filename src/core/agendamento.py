@@ -1,156 +1,434 @@
 # src/core/agendamento.py
 import re
+from playwright.async_api import TimeoutError
 from src.utils.logger import logger
 from datetime import datetime, timedelta
 from src.config.settings import settings
+from src.core.api_capture import agenda_slots, capture_for
+from src.core.slot_scanner import FullDayCache, SlotIndex, default_policy, matches_dom, read_view, snapshot_slots
+from src.utils.autocomplete_cache import autocomplete_cache
+from src.utils.tracing import traced, tracer
+from src.utils.readiness import wait_for_calendar, wait_for_dialog_closed, wait_for_options, wait_for_visible
+from src.utils.selector_registry import selector_registry
+
+# Botão da barra do calendário que avança para o próximo dia/semana
+NEXT_VIEW_BUTTON = re.compile(r"próxim|avançar|next", re.IGNORECASE)
+
+# CBOs aceitos para o profissional da agenda, em ordem de preferência
+CBOS_ENFERMEIRO = ("ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA", "ENFERMEIRO")
+
+# Agendamentos exibidos na grade em uma única leitura: ID, título ("horário: cidadão") e texto
+EVENTS_JS = """
+() => Array.from(document.querySelectorAll('.rbc-event')).map(el => ({
+    id: el.dataset.id || null,
+    title: el.getAttribute('title') || '',
+    text: (el.innerText || '').trim(),
+}))
+"""
+
+
+def _opcao_com_cbo(cbo):
+    """Opção do autocomplete com o nome do enfermeiro e um span com o CBO dado."""
+    def fabrica(page, enfermeiro):
+        return (
+            page.get_by_role("option")
+            .filter(has_text=selector_registry.regex(enfermeiro))
+            .filter(has=page.locator("span").filter(has_text=selector_registry.regex(cbo)))
+            .first
+        )
+    return fabrica
+
+
+selector_registry.register(
+    "agenda.opcao_profissional",
+    ("cbo_esf", _opcao_com_cbo(CBOS_ENFERMEIRO[0])),
+    ("cbo_enfermeiro", _opcao_com_cbo(CBOS_ENFERMEIRO[1])),
+)
+
+
+def match_event(events, agendamento):
+    """Índice do evento da grade que corresponde ao agendamento registrado, ou None.
+
+    Com o ID do agendamento e eventos identificados na grade, só o ID vale; sem ele, o evento precisa
+    ter o nome do cidadão e o horário registrados.
+    """
+    if agendamento.get("id") is not None and any(evento.get("id") for evento in events):
+        return next((i for i, evento in enumerate(events) if evento.get("id") == str(agendamento["id"])), None)
+    paciente = agendamento["paciente"].lower()
+    horario = agendamento.get("horario")
+    for i, evento in enumerate(events):
+        texto = f"{evento.get('title') or ''} {evento.get('text') or ''}".lower()
+        if paciente in texto and (not horario or horario in texto):
+            return i
+    return None
 
 class ScheduleAppointment:
-    def __init__(self):
-        self.unidade = settings.UNIDADE
-        self.enfermeiro = settings.ENFERMEIRO
-        self.paciente = settings.PACIENTE
+    def __init__(self, paciente=None, enfermeiro=None, slot_policy=None, full_days=None, unidade=None):
+        """Inicializa com variáveis do .env, permitindo sobrescrever paciente, enfermeiro, unidade e política de horário."""
+        self.unidade = unidade or settings.UNIDADE
+        self.enfermeiro = enfermeiro or settings.ENFERMEIRO
+        self.paciente = paciente or settings.PACIENTE
+        self.slot_policy = slot_policy or default_policy()
+        self.full_days = full_days if full_days is not None else FullDayCache()
+        self.views_advanced = 0
+        self.selected_slot = None
+        self.appointment = None
+        # Verdadeiro a partir do clique em Salvar: uma falha depois dele pode ter gravado o agendamento
+        self.submitted = False
+        self.profissional_id = None
+        self._capture = None
+        self._agenda_mark = 0
 
+    @traced("agendamento")
     async def schedule_appointment(self, page):
         logger.info("Iniciando processo de agendamento")
-        # await page.get_by_text(self.unidade).click()
-        await page.get_by_role("navigation").filter(has_text="AcompanhamentosAgendaBusca").click()
-        await page.get_by_role("link", name="Agenda").click()
-        await page.get_by_role("textbox", name="Busque um profissional pelo").click()
-        await page.get_by_role("textbox", name="Busque um profissional pelo").fill(self.enfermeiro.lower())
-        # Aguarda as opções carregarem
-        await page.wait_for_timeout(2000)  # Dá tempo para a lista de opções aparecer
-
-        # Busca a opção pelo nome do enfermeiro e CBO
-        logger.info(f"Procurando profissional: {self.enfermeiro} com CBO 'ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA'")
-        options = page.get_by_role("option").filter(has_text=re.compile(self.enfermeiro, re.IGNORECASE))
-        count = await options.count()
-        logger.info(f"Opções encontradas para '{self.enfermeiro}': {count}")
-        
-        profissional_encontrado = False
-        for i in range(count):
-            option = options.nth(i)
-            option_text = await option.inner_text()
-            logger.info(f"Verificando opção {i}: {option_text}")
-            
-            # Tenta primeiro "ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA"
-            cbo_element = option.locator("span").filter(has_text=re.compile("ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA", re.IGNORECASE))
-            if await cbo_element.count() > 0:
-                cbo_text = await cbo_element.first.inner_text()
-                logger.info(f"Profissional {option_text} encontrado com CBO compatível: {cbo_text}")
-                await option.click()
-                profissional_encontrado = True
-                break
-            else:
-                # Fallback para "ENFERMEIRO" se o primeiro não for encontrado
-                logger.info(f"CBO 'ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA' não encontrado. Tentando 'ENFERMEIRO'")
-                cbo_element = option.locator("span").filter(has_text=re.compile("ENFERMEIRO", re.IGNORECASE))
-                if await cbo_element.count() > 0:
-                    cbo_text = await cbo_element.first.inner_text()
-                    logger.info(f"Profissional {option_text} encontrado com CBO compatível: {cbo_text}")
-                    await option.click()
-                    profissional_encontrado = True
-                    break
-                else:
-                    logger.info(f"Opção {option_text} (índice {i}) não possui CBO 'ENFERMEIRO'")
-
-        if not profissional_encontrado:
-            todas_opcoes = page.get_by_role("option")
-            todas_count = await todas_opcoes.count()
-            logger.info(f"Total de opções na lista: {todas_count}")
-            for i in range(todas_count):
-                texto = await todas_opcoes.nth(i).inner_text()
-                logger.info(f"Opção {i}: {texto}")
-            logger.error(f"Nenhum profissional {self.enfermeiro} encontrado com CBO 'ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA' ou 'ENFERMEIRO'")
-            raise Exception(f"Profissional {self.enfermeiro} não encontrado com CBO compatível")
-
-        logger.info("Aguardando a grade de horários carregar")
-        await page.wait_for_selector(".rbc-time-content", timeout=15000)
-        await page.wait_for_timeout(2000)
+        await self._open_agenda(page, "agenda")
 
         await page.locator(".rbc-time-content").first.click()
 
         logger.info("Verificando horários disponíveis")
-        time_slots = page.locator(".rbc-timeslot-group")
-        count = await time_slots.count()  # Usa await para obter o número de slots
-        available_slot = None
-        selected_time = None
-
-        for i in range(count):
-            slot_group = time_slots.nth(i)
-            slot_time = await slot_group.locator(".rbc-label").inner_text() if await slot_group.locator(".rbc-label").count() > 0 else "sem horário"
-            slot = slot_group.locator(".rbc-time-slot")
-            slot_classes = await slot.get_attribute("class") or ""
-            add_button = slot.locator(".rbc-time-slot-hover button", has_text="Adicionar agendamento")
-
-            logger.info(f"Verificando slot {i}: classes={slot_classes}, horário={slot_time}, botão visível={await add_button.is_visible()}")
-
-            if "rbc-time-slot-available" in slot_classes:
-                await slot.hover()
-                await page.wait_for_timeout(500)
-                if await add_button.is_visible():
-                    available_slot = add_button
-                    selected_time = slot_time
-                    logger.info(f"Horário disponível encontrado: {selected_time}")
-                    await available_slot.click()
-                    logger.info(f"Horário selecionado: {selected_time}")
-                    break
-
+        available_slot, candidato = await self._find_slot(page)
         if not available_slot:
             logger.warning("Nenhum horário disponível encontrado")
             raise Exception("Nenhum horário disponível para agendamento")
 
+        selected_time = candidato["time"] or "sem horário"
+        self.selected_slot = {"time": candidato["time"], "day_key": candidato["day_key"]}
+        await available_slot.click()
+        logger.info("Horário selecionado: %s (%s)", selected_time, candidato['day_key'])
+
         logger.info("Aguardando formulário de agendamento")
         await page.wait_for_selector("text=Cidadão*", timeout=15000, state="visible")
-        await page.wait_for_timeout(1000)
 
         logger.info("Prosseguindo com o agendamento")
-        logger.info(f"Selecionando cidadão: {self.paciente}")
+        logger.info("Selecionando cidadão: %s", self.paciente)
         citizen_field = page.get_by_role("textbox", name="Cidadão*")
         await citizen_field.wait_for(timeout=5000, state="visible")
         await citizen_field.click()
-        await citizen_field.fill(self.paciente.lower())
-        await page.wait_for_timeout(2000)
-        await citizen_field.press("ArrowDown")
-        await citizen_field.press("Enter")
-        logger.info(f"Paciente selecionado: {self.paciente}")
+        with tracer.span("autocomplete.agenda.cidadao"):
+            await citizen_field.fill(self.paciente.lower())
+            selecionado = await autocomplete_cache.pick(page, "agenda.cidadao", self.paciente, self.unidade)
+            if selecionado is None:
+                await wait_for_options(page, self.paciente, "agenda.cidadao")
+        if selecionado is None:
+            await autocomplete_cache.remember(
+                "agenda.cidadao", self.paciente, self.unidade, page.get_by_role("option").first
+            )
+            await citizen_field.press("ArrowDown")
+            await citizen_field.press("Enter")
+        logger.info("Paciente selecionado: %s", self.paciente)
 
         logger.info("Marcando opção de imprimir comprovante")
         await page.locator("label").filter(has_text="Imprimir comprovante ao salvar").locator("span").first.click()
 
         logger.info("Finalizando agendamento")
-        await page.get_by_role("button", name="Salvar").click()
+        with tracer.span("agendamento.salvar"):
+            self.submitted = True
+            await page.get_by_role("button", name="Salvar").click()
+            logger.info("Aguardando confirmação do agendamento")
+            await wait_for_dialog_closed(page, "agenda.salvar")
+        self.appointment = await self._record_appointment(candidato)
+        logger.info("Agendamento concluído com sucesso (ID %s)", self.appointment["id"] or "não capturado")
 
-        logger.info("Aguardando confirmação do agendamento")
-        logger.info("Agendamento concluído com sucesso")
-
-        await self.remover_agenda(page)
-
-    async def remover_agenda(self, page):
-        logger.info("Iniciando processo de remoção de agendamento")
+    async def _open_agenda(self, page, etapa):
+        """Abre a Agenda do profissional com CBO compatível e aguarda a grade de horários."""
+        self._capture = capture_for(page.context)
+        # await page.get_by_text(self.unidade).click()
         await page.get_by_role("navigation").filter(has_text="AcompanhamentosAgendaBusca").click()
         await page.get_by_role("link", name="Agenda").click()
-        await page.get_by_role("textbox", name="Busque um profissional pelo").click()
-        await page.get_by_role("textbox", name="Busque um profissional pelo").fill(self.enfermeiro.lower())
-        await page.get_by_role("option", name=self.enfermeiro).click()
-        await page.wait_for_selector(".rbc-time-content", timeout=15000)
-        await page.wait_for_timeout(2000)
-
-        logger.info(f"Procurando agendamento de {self.paciente}")
-        appointment = page.locator("div").filter(has_text=re.compile(f"^{self.paciente}", re.IGNORECASE))
-        if await appointment.count() > 0:  # Usa await para contar os elementos
-            logger.info(f"Agendamento encontrado, total encontrado: {await appointment.count()}")
-            logger.info(f"Texto do agendamento encontrado: {await appointment.nth(2).inner_text()}")
-            await appointment.nth(2).click()
-
-            options_button = appointment.locator("xpath=..").locator("button[aria-haspopup='true']").first
-            await options_button.click()
-            await page.get_by_role("menuitem", name="Cancelar").locator("div").click()
-            await page.get_by_role("button", name="Excluir").click()
-            logger.info("Agendamento removido com sucesso")
+        campo = page.get_by_role("textbox", name="Busque um profissional pelo")
+        await campo.click()
+        with tracer.span(f"autocomplete.{etapa}.profissional"):
+            await campo.fill(self.enfermeiro.lower())
+            self._mark_agenda()
+            # Profissional já resolvido (nesta ou em outra execução): clique direto na opção guardada
+            profissional_encontrado = await self._select_from_cache(page)
+            if not profissional_encontrado:
+                # Aguarda as opções do profissional serem renderizadas
+                await wait_for_options(page, self.enfermeiro, f"{etapa}.profissional")
+
+        if not profissional_encontrado:
+            profissional_encontrado = await self._select_from_api(page)
+        if not profissional_encontrado:
+            profissional_encontrado = await self._select_from_options(page)
+
+        if not profissional_encontrado:
+            logger.error("Nenhum profissional %s encontrado com CBO 'ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA' ou 'ENFERMEIRO'", self.enfermeiro)
+            raise Exception(f"Profissional {self.enfermeiro} não encontrado com CBO compatível")
+
+        logger.info("Aguardando a grade de horários carregar")
+        await wait_for_calendar(page, f"{etapa}.grade")
+
+    async def _record_appointment(self, candidato):
+        """Identificador estável do agendamento criado: horário, visão e, se capturado, o ID devolvido pela API."""
+        agendamento = {
+            "id": None,
+            "paciente": self.paciente,
+            "enfermeiro": self.enfermeiro,
+            "dia": candidato["day_key"],
+            "horario": candidato["time"],
+            "views_advanced": self.views_advanced,
+        }
+        if self._capture is not None:
+            capture = self._capture
+
+            def criado():
+                # A resposta do salvamento traz o agendamento com ID; o último recebido é o deste cidadão
+                encontrados = [
+                    a for a in capture.appointments_for(self.paciente, self.profissional_id)
+                    if a.horario == candidato["time"]
+                ]
+                return encontrados[-1] if encontrados else None
+
+            registrado = await capture.wait_for(criado, timeout=1000)
+            if registrado is not None:
+                agendamento.update(id=registrado.id, data=registrado.data)
+        return agendamento
+
+    async def _select_from_cache(self, page):
+        """Seleciona a opção de profissional guardada no cache de autocomplete para esta unidade."""
+        entrada = await autocomplete_cache.pick(page, "agenda.profissional", self.enfermeiro, self.unidade)
+        if entrada is None:
+            return False
+        self.profissional_id = entrada.get("id")
+        return True
+
+    async def _select_from_api(self, page):
+        """Escolhe o profissional pelos dados capturados da API: um clique direto na opção com nome e CBO."""
+        if self._capture is None:
+            return False
+        capture = self._capture
+        profissional = await capture.wait_for(lambda: capture.professional(self.enfermeiro, CBOS_ENFERMEIRO), timeout=500)
+        if profissional is None:
+            return False
+        option = (
+            page.get_by_role("option")
+            .filter(has_text=selector_registry.regex(re.escape(profissional.nome)))
+            .filter(has_text=selector_registry.regex(re.escape(profissional.cbo)))
+        )
+        if not await option.count():
+            return False
+        await autocomplete_cache.remember(
+            "agenda.profissional", self.enfermeiro, self.unidade, option.first, cbo=profissional.cbo, id=profissional.id
+        )
+        await option.first.click()
+        self.profissional_id = profissional.id
+        logger.info("Profissional %s (%s) selecionado pelos dados da API", profissional.nome, profissional.cbo)
+        return True
+
+    async def _select_from_options(self, page):
+        """Procura entre as opções do autocomplete o profissional com CBO compatível (ESF antes de ENFERMEIRO)."""
+        logger.info("Procurando profissional: %s com CBO 'ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA'", self.enfermeiro)
+        try:
+            variante, option = await selector_registry.resolve(
+                page, "agenda.opcao_profissional", timeout=3000, enfermeiro=self.enfermeiro
+            )
+        except TimeoutError:
+            return False
+        logger.info("Profissional encontrado com CBO compatível (%s): %s", variante, await option.inner_text())
+        await autocomplete_cache.remember(
+            "agenda.profissional", self.enfermeiro, self.unidade, option,
+            cbo=CBOS_ENFERMEIRO[0] if variante == "cbo_esf" else CBOS_ENFERMEIRO[1],
+        )
+        await option.click()
+        return True
+
+    async def _next_view(self, page, view):
+        """Avança o calendário para o próximo dia/semana e aguarda a nova grade."""
+        self._mark_agenda()
+        await page.get_by_role("button", name=NEXT_VIEW_BUTTON).first.click()
+        await wait_for_calendar(page, "agenda.proxima_visao", previous_view=view)
+        self.views_advanced += 1
+
+    @traced("agendamento.busca_horario")
+    async def _find_slot(self, page):
+        """Percorre as visões do calendário até achar um horário que atenda à política configurada."""
+        policy, target = self.slot_policy
+        if settings.AGENDA_VIEW:
+            view = await read_view(page)
+            self._mark_agenda()
+            await page.get_by_role("button", name=settings.AGENDA_VIEW, exact=True).click()
+            await wait_for_calendar(page, "agenda.visao", previous_view=view)
+
+        for tentativa in range(max(1, settings.AGENDA_SEARCH_VIEWS)):
+            if tentativa:
+                await self._next_view(page, view)
+            view = await read_view(page)
+            if self.full_days.is_full(self.enfermeiro, view):
+                logger.info("Visão %s já conhecida como lotada para %s, pulando", view['label'], self.enfermeiro)
+                continue
+
+            # Uma única leitura por visão alimenta a escolha e o registro de dias lotados
+            async for slot_index in self._slot_indexes(page, view):
+                self.full_days.add(self.enfermeiro, slot_index.full_days())
+                candidatos = slot_index.candidates(policy, target)
+                for candidato in candidatos:
+                    if slot_index.source == "api" and not await matches_dom(page, candidato):
+                        # O total de grupos bateu, mas a posição deduzida da API não é este horário na tela
+                        logger.info("Grade da API não corresponde à tela em %s (%s), lendo a grade pelo DOM", candidato['time'], candidato['day_key'])
+                        break
+                    slot = page.locator(".rbc-timeslot-group").nth(candidato["index"]).locator(".rbc-time-slot")
+                    add_button = slot.locator(".rbc-time-slot-hover button", has_text="Adicionar agendamento")
+                    await slot.hover()
+                    if await wait_for_visible(add_button, "agenda.botao_adicionar", timeout=2000, raise_on_timeout=False):
+                        logger.info("Horário disponível encontrado (%s): %s em %s", policy, candidato['time'], candidato['day_key'])
+                        return add_button, candidato
+                    logger.info("Botão 'Adicionar agendamento' não apareceu no slot %s, tentando o próximo", candidato['index'])
+                if not candidatos:
+                    break
+            logger.info("Nenhum horário disponível na visão %s", view['label'])
+        return None, None
+
+    def _mark_agenda(self):
+        """Marca a captura antes de uma ação que recarrega a agenda, para não usar a resposta anterior."""
+        if self._capture is not None:
+            self._agenda_mark = self._capture.mark()
+
+    async def _api_slot_index(self, page, view):
+        """Grade da visão montada a partir da agenda capturada da API, ou None se não corresponder à tela."""
+        if self._capture is None:
+            return None
+        agenda = await self._capture.wait_agenda(self._agenda_mark, timeout=500)
+        if agenda is None or len(agenda["dias"]) != max(1, len(view.get("headers") or [])):
+            return None
+        if self.profissional_id is not None and agenda["profissional_id"] not in (None, self.profissional_id):
+            return None
+        slots, grupos = agenda_slots(agenda)
+        # A posição de cada horário no DOM é deduzida da resposta; confere o total de grupos antes de usá-la
+        if await page.locator(".rbc-timeslot-group").count() != grupos:
+            return None
+        index = SlotIndex(slots, view, source="api")
+        logger.info("Grade lida da API (%s): %s horários, %s disponíveis", view['label'], len(index.slots), len(index.available))
+        return index
+
+    async def _slot_indexes(self, page, view):
+        """Grades da visão, da mais barata à mais fiel: a agenda capturada da API e, se preciso, o DOM."""
+        index = await self._api_slot_index(page, view)
+        if index is not None:
+            yield index
         else:
-            logger.warning(f"Nenhum agendamento encontrado para {self.paciente}")
-            raise Exception("Nenhum agendamento encontrado para remoção")
+            logger.info("Agenda da API indisponível para a visão %s, lendo a grade pelo DOM", view['label'])
+        yield await snapshot_slots(page)
+
+    async def _avancar_visoes(self, page, atual, destino, etapa):
+        """Avança a agenda aberta da visão atual até a de destino; retorna a visão alcançada."""
+        while atual < destino:
+            view = await read_view(page)
+            await page.get_by_role("button", name=NEXT_VIEW_BUTTON).first.click()
+            await wait_for_calendar(page, f"{etapa}.proxima_visao", previous_view=view)
+            atual += 1
+        return atual
+
+    @traced("agendamento.confirmacao")
+    async def confirmar_agendamento(self, page):
+        """Depois de uma falha, confere na grade se o agendamento foi salvo mesmo assim.
+
+        Retorna o agendamento registrado (como em _record_appointment) ou None se a tentativa não chegou
+        a salvar ou o cidadão não aparece no horário escolhido.
+        """
+        if not self.submitted or self.appointment is not None:
+            return self.appointment
+        agendamento = {
+            "id": None,
+            "paciente": self.paciente,
+            "enfermeiro": self.enfermeiro,
+            "dia": self.selected_slot["day_key"],
+            "horario": self.selected_slot["time"],
+            "views_advanced": self.views_advanced,
+        }
+        await self._open_agenda(page, "confirmacao")
+        await self._avancar_visoes(page, 0, self.views_advanced, "confirmacao")
+        eventos = await page.evaluate(EVENTS_JS)
+        indice = match_event(eventos, agendamento)
+        if indice is None:
+            logger.info("Agendamento de %s às %s não consta na agenda; a etapa pode ser repetida", self.paciente, agendamento["horario"])
+            return None
+        agendamento["id"] = eventos[indice].get("id")
+        logger.info("Agendamento de %s às %s encontrado na agenda após a falha", self.paciente, agendamento["horario"])
+        return agendamento
+
+    @traced("agendamento.remocao")
+    async def remover_agenda(self, page, agendamento=None):
+        """Remove o agendamento registrado na criação (por padrão, o último feito por esta instância)."""
+        agendamento = agendamento or self.appointment
+        if agendamento is None:
+            raise Exception(f"Nenhum agendamento registrado para {self.paciente}")
+        resultado = await self.cancelar_agendamentos(page, [agendamento])
+        if not resultado["removidos"]:
+            raise Exception(f"Agendamento de {agendamento['paciente']} não removido: {resultado['pendentes'][0]['motivo']}")
+        return resultado
+
+    @traced("agendamento.remocao_lote")
+    async def cancelar_agendamentos(self, page, agendamentos):
+        """Cancela os agendamentos dados (do profissional desta instância) em uma única passada pela agenda.
 
-        logger.info("Aguardando confirmação da remoção")
-        await page.wait_for_timeout(2000)
-        logger.info("Remoção concluída")
\ No newline at end of file
+        A agenda é aberta uma vez e percorrida para frente, visão a visão, na ordem em que os agendamentos
+        foram criados; em cada visão, os eventos são lidos de uma vez e casados pelo ID (ou horário e
+        cidadão) registrados na criação. Ao final de cada visão a grade é relida para conferir a remoção.
+        Retorna {"removidos": [agendamento, ...], "pendentes": [{"agendamento", "motivo"}, ...]}.
+        """
+        logger.info("Iniciando a remoção de %s agendamentos de %s", len(agendamentos), self.enfermeiro)
+        removidos, pendentes = [], []
+        if not agendamentos:
+            return {"removidos": removidos, "pendentes": pendentes}
+        await self._open_agenda(page, "remocao")
+
+        por_visao = {}
+        for agendamento in agendamentos:
+            por_visao.setdefault(agendamento.get("views_advanced") or 0, []).append(agendamento)
+        visao_atual = 0
+        for visao in sorted(por_visao):
+            # Volta à visão onde os agendamentos foram criados, sem refazer a busca do profissional
+            visao_atual = await self._avancar_visoes(page, visao_atual, visao, "remocao")
+
+            eventos = await page.evaluate(EVENTS_JS)
+            cancelados = []
+            for agendamento in por_visao[visao]:
+                indice = match_event(eventos, agendamento)
+                if indice is None:
+                    logger.warning("Agendamento de %s às %s não encontrado na agenda", agendamento["paciente"], agendamento.get("horario"))
+                    pendentes.append({"agendamento": agendamento, "motivo": "não encontrado na agenda"})
+                    continue
+                # Uma falha num evento não interrompe os demais; a conferência abaixo decide se ele saiu da grade
+                erro = None
+                try:
+                    await self._cancel_event(page, eventos[indice], agendamento)
+                except Exception as e:
+                    logger.warning("Falha ao cancelar o agendamento de %s às %s: %s", agendamento["paciente"], agendamento.get("horario"), str(e))
+                    erro = f"falha ao cancelar: {e}"
+                    try:
+                        await page.keyboard.press("Escape")
+                    except Exception:
+                        pass
+                cancelados.append((agendamento, erro))
+
+            # Conferência: os cancelados não podem continuar na grade
+            eventos = await page.evaluate(EVENTS_JS)
+            for agendamento, erro in cancelados:
+                if match_event(eventos, agendamento) is None:
+                    removidos.append(agendamento)
+                else:
+                    pendentes.append({"agendamento": agendamento, "motivo": erro or "continua na agenda após o cancelamento"})
+
+        logger.info("Remoção concluída: %s de %s agendamentos removidos", len(removidos), len(agendamentos))
+        return {"removidos": removidos, "pendentes": pendentes}
+
+    async def _cancel_event(self, page, evento, agendamento):
+        """Cancela um evento da grade pelo menu de opções e aguarda a grade recarregar sem ele."""
+        if evento.get("id"):
+            locator = page.locator(f'.rbc-event[data-id="{evento["id"]}"]')
+        else:
+            locator = page.locator(".rbc-event").filter(has_text=selector_registry.regex(re.escape(agendamento["paciente"])))
+            if agendamento.get("horario") and agendamento["horario"] in (evento.get("title") or ""):
+                locator = page.locator(f'.rbc-event[title*="{agendamento["horario"]}"]').filter(
+                    has_text=selector_registry.regex(re.escape(agendamento["paciente"]))
+                )
+        locator = locator.first
+        await locator.hover()
+        await locator.locator("button[aria-haspopup='true']").first.click()
+        await page.get_by_role("menuitem", name="Cancelar").click()
+        await page.get_by_role("button", name="Excluir").click()
+        await wait_for_dialog_closed(page, "remocao.excluir")
+        await locator.wait_for(state="detached", timeout=15000)
+        await wait_for_calendar(page, "remocao.grade_atualizada")
+        logger.info("Agendamento de %s às %s cancelado", agendamento["paciente"], agendamento.get("horario"))
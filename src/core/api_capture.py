@@ -0,0 +1,286 @@
+# src/core/api_capture.py
+import asyncio
+import re
+import time
+import weakref
+from dataclasses import dataclass
+from src.config.settings import settings
+from src.utils.logger import logger
+
+# Nomes aceitos para cada campo nas respostas da API; o primeiro presente no objeto é usado
+ALIASES = {
+    "id": ("id", "uuid"),
+    "nome": ("nome", "name", "nomeSocial"),
+    "cbo": ("cbo", "ocupacao", "cboNome"),
+    "data": ("data", "dia", "date"),
+    "horario": ("horario", "hora", "horarioInicial", "time"),
+    "disponivel": ("disponivel", "livre", "available"),
+    "cidadao": ("cidadao", "paciente"),
+    "profissional": ("profissional", "lotacao"),
+    "profissional_id": ("profissionalId", "lotacaoId"),
+    "status": ("status", "statusAtendimento", "situacao"),
+    "tipo": ("tipo", "tipoServico"),
+}
+
+
+@dataclass(frozen=True)
+class Professional:
+    id: object
+    nome: str
+    cbo: str
+
+
+@dataclass(frozen=True)
+class Slot:
+    data: str
+    horario: str
+    disponivel: bool
+    profissional_id: object = None
+
+
+@dataclass(frozen=True)
+class Appointment:
+    id: object
+    data: str
+    horario: str
+    cidadao: str
+    profissional_id: object = None
+
+
+@dataclass(frozen=True)
+class QueueEntry:
+    id: object
+    cidadao: str
+    profissional: str
+    status: str
+    tipo: str = None
+
+
+def _field(obj, campo):
+    for chave in ALIASES[campo]:
+        if chave in obj:
+            return obj[chave]
+    return None
+
+
+def _has(obj, *campos):
+    return all(_field(obj, campo) is not None for campo in campos)
+
+
+def _text(value):
+    """Texto de um campo que pode vir como string ou como objeto aninhado ({nome: ...})."""
+    if isinstance(value, dict):
+        return _text(_field(value, "nome"))
+    return str(value).strip() if value is not None else None
+
+
+def _walk(node, data=None):
+    """Percorre o payload devolvendo cada objeto com a data (dia da agenda) herdada do objeto pai."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item, data)
+    elif isinstance(node, dict):
+        valor = _field(node, "data")
+        if isinstance(valor, str):
+            data = valor
+        yield node, data
+        for valor in node.values():
+            if isinstance(valor, (list, dict)):
+                yield from _walk(valor, data)
+
+
+def parse_payload(payload, variables=None):
+    """Converte a resposta da API nos objetos conhecidos, reconhecidos pelo formato de cada item."""
+    variables = variables or {}
+    profissional_id = _field(variables, "profissional_id")
+    encontrados = {"professionals": [], "slots": [], "appointments": [], "queue": []}
+    for obj, data in _walk(payload.get("data") if isinstance(payload, dict) else payload):
+        if _has(obj, "horario", "disponivel"):
+            encontrados["slots"].append(Slot(
+                data=data, horario=_text(_field(obj, "horario")), disponivel=bool(_field(obj, "disponivel")),
+                profissional_id=_field(obj, "profissional_id") or profissional_id,
+            ))
+        elif _has(obj, "id", "horario", "cidadao"):
+            encontrados["appointments"].append(Appointment(
+                id=_field(obj, "id"), data=data, horario=_text(_field(obj, "horario")),
+                cidadao=_text(_field(obj, "cidadao")), profissional_id=_field(obj, "profissional_id") or profissional_id,
+            ))
+        elif _has(obj, "id", "cidadao", "status"):
+            encontrados["queue"].append(QueueEntry(
+                id=_field(obj, "id"), cidadao=_text(_field(obj, "cidadao")),
+                profissional=_text(_field(obj, "profissional")), status=_text(_field(obj, "status")),
+                tipo=_text(_field(obj, "tipo")),
+            ))
+        elif _has(obj, "nome", "cbo"):
+            encontrados["professionals"].append(Professional(
+                id=_field(obj, "id"), nome=_text(_field(obj, "nome")), cbo=_text(_field(obj, "cbo")),
+            ))
+    return encontrados
+
+
+def _matches(nome, busca):
+    return bool(nome) and busca.strip().lower() in nome.lower()
+
+
+class ApiCapture:
+    """Captura as respostas da API do e-SUS no contexto do navegador e guarda os dados já tipados.
+
+    A agenda e a lista de atendimentos chegam inteiras nas respostas GraphQL; lê-las daqui evita
+    varrer o DOM. Quem consulta deve recorrer ao DOM quando o dado ainda não foi capturado.
+    """
+
+    def __init__(self, url_pattern=None):
+        self.url_re = re.compile(url_pattern or settings.API_URL_PATTERN, re.IGNORECASE)
+        self.professionals = {}
+        self.agenda = None  # Última agenda: {"seq", "profissional_id", "dias": [(data, [Slot, ...])]}
+        self.appointments = {}
+        self.queue = None  # Última lista de atendimentos completa, na ordem da tela
+        self.seq = 0
+        self.stats = {"respostas": 0, "ignoradas": 0, "erros": 0}
+        self._changed = None
+
+    def attach(self, target):
+        """Passa a ouvir as respostas da página ou do contexto."""
+        target.on("response", self._on_response)
+        return self
+
+    def mark(self):
+        """Marca o momento atual; wait_agenda(marca) só aceita agendas recebidas depois dele."""
+        return self.seq
+
+    async def _on_response(self, response):
+        if response.request.method != "POST" or not self.url_re.search(response.url):
+            return
+        try:
+            variables = (response.request.post_data_json or {}).get("variables")
+            payload = await response.json()
+        except Exception as e:
+            # Corpo indisponível (navegação, resposta não JSON): o fluxo segue pelo DOM
+            self.stats["erros"] += 1
+            logger.debug("Resposta da API não capturada (%s): %s", response.url, str(e))
+            return
+        self.ingest(payload, variables)
+
+    def ingest(self, payload, variables=None):
+        """Incorpora uma resposta da API; retorna os objetos reconhecidos nela."""
+        encontrados = parse_payload(payload, variables)
+        if not any(encontrados.values()):
+            self.stats["ignoradas"] += 1
+            return encontrados
+        self.stats["respostas"] += 1
+        self.seq += 1
+        for profissional in encontrados["professionals"]:
+            self.professionals[profissional.id or profissional.nome] = profissional
+        if encontrados["slots"]:
+            self._ingest_agenda(encontrados["slots"])
+        for agendamento in encontrados["appointments"]:
+            self.appointments[agendamento.id] = agendamento
+        if encontrados["queue"]:
+            self._ingest_queue(payload, encontrados["queue"])
+        if self._changed is not None:
+            self._changed.set()
+        return encontrados
+
+    def _ingest_agenda(self, slots):
+        dias = {}
+        for slot in slots:
+            dias.setdefault(slot.data, []).append(slot)
+        profissional_id = slots[0].profissional_id
+        # A agenda recarregada substitui os agendamentos conhecidos daqueles dias
+        for chave, agendamento in list(self.appointments.items()):
+            if agendamento.data in dias and agendamento.profissional_id == profissional_id:
+                del self.appointments[chave]
+        self.agenda = {"seq": self.seq, "profissional_id": profissional_id, "dias": list(dias.items())}
+
+    def _ingest_queue(self, payload, itens):
+        resultado = next(iter((payload.get("data") or {}).values()), None) if isinstance(payload, dict) else None
+        if isinstance(resultado, list) or self.queue is None:
+            # Consulta da lista inteira: substitui a fila conhecida
+            self.queue = list(itens) if isinstance(resultado, list) else None
+            return
+        # Mutação de um item (adicionar/atualizar): atualiza a fila sem perder a ordem
+        por_id = {item.id: item for item in itens}
+        self.queue = [por_id.pop(item.id, item) for item in self.queue] + list(por_id.values())
+
+    async def wait_for(self, predicate, timeout=2000):
+        """Aguarda até predicate() devolver algo diferente de None; retorna None se o tempo acabar."""
+        limite = time.monotonic() + timeout / 1000
+        while True:
+            valor = predicate()
+            restante = limite - time.monotonic()
+            if valor is not None or restante <= 0:
+                return valor
+            self._changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._changed.wait(), restante)
+            except asyncio.TimeoutError:
+                pass
+
+    # Consultas usadas pelos fluxos
+
+    def professional(self, nome, cbos=()):
+        """Profissional capturado com o nome e, na ordem de preferência, um dos CBOs dados."""
+        candidatos = [p for p in self.professionals.values() if _matches(p.nome, nome)]
+        for cbo in cbos:
+            for profissional in candidatos:
+                if _matches(profissional.cbo, cbo):
+                    return profissional
+        return None if cbos else next(iter(candidatos), None)
+
+    async def wait_agenda(self, marca, timeout=2000):
+        """Agenda recebida depois da marca, ou None se não chegar a tempo."""
+        return await self.wait_for(lambda: self.agenda if self.agenda and self.agenda["seq"] > marca else None, timeout)
+
+    def queue_position(self, paciente):
+        """Posição do paciente (última ocorrência ainda não finalizada) na lista de atendimentos capturada."""
+        if self.queue is None:
+            return None
+        posicao = None
+        for i, item in enumerate(self.queue):
+            if _matches(item.cidadao, paciente) and (item.status or "").upper() != "FINALIZADO":
+                posicao = i
+        return posicao
+
+    def appointments_for(self, paciente, profissional_id=None):
+        return [
+            a for a in self.appointments.values()
+            if _matches(a.cidadao, paciente) and (profissional_id is None or a.profissional_id == profissional_id)
+        ]
+
+
+def agenda_slots(agenda):
+    """Converte a agenda capturada no formato da grade (SlotIndex), com o índice do grupo no DOM.
+
+    Na grade do react-big-calendar vêm primeiro os grupos da coluna de horários e depois os de cada
+    dia, na ordem da resposta.
+    """
+    dias = agenda["dias"]
+    linhas = max((len(slots) for _, slots in dias), default=0)
+    resultado = []
+    for day, (_, slots) in enumerate(dias):
+        for row, slot in enumerate(slots):
+            resultado.append({
+                "index": linhas + day * linhas + row,
+                "day": day,
+                "row": row,
+                "label": None,
+                "time": slot.horario,
+                "header": slot.data,
+                "classes": "",
+                "available": slot.disponivel,
+            })
+    return resultado, linhas * (len(dias) + 1)
+
+
+# Uma captura por contexto do navegador, criada na primeira consulta
+_captures = weakref.WeakKeyDictionary()
+
+
+def capture_for(target):
+    """Captura associada ao contexto (ou página) dado; None quando desativada em API_CAPTURE."""
+    if not settings.API_CAPTURE:
+        return None
+    capture = _captures.get(target)
+    if capture is None:
+        capture = _captures[target] = ApiCapture().attach(target)
+    return capture
@@ -1,71 +1,60 @@
 # src/core/atendimento.py
 from datetime import datetime
-import re
 import asyncio
-from aiogram import Bot
+import logging
+from playwright.async_api import TimeoutError
 from src.utils.logger import logger
 from src.config.settings import settings
+from src.core.api_capture import capture_for
+from src.core.notifier import get_notifier
+from src.core.soap_templates import load_plan
+from src.utils.autocomplete_cache import autocomplete_cache
+from src.utils.tracing import traced, tracer
+from src.utils.readiness import wait_for_dialog_closed, wait_for_options, wait_for_visible
+from src.utils.selector_registry import selector_registry
+
+# Variantes dos elementos que mudam entre implantações do e-SUS, em ordem de preferência
+selector_registry.register(
+    "lista.campo_cidadao",
+    ("nome_completo", lambda page: page.get_by_role("textbox", name="Digite o nome completo do")),
+    ("rotulo_nome", lambda page: page.locator("label").filter(has_text="Nome").locator("span").first),
+    ("cidadao", lambda page: page.get_by_role("textbox", name="Cidadão*")),
+)
+selector_registry.register(
+    "lista.atender",
+    ("titulo", lambda page: page.locator("button[title='Atender']").first),
+    ("sem_texto", lambda page: page.get_by_role("button").filter(has_text=selector_registry.regex(r"^$", 0)).first),
+)
 
 class AttendanceList:
-    def __init__(self):
-        """Inicializa com variáveis do .env."""
+    def __init__(self, paciente=None, enfermeiro=None, unidade=None):
+        """Inicializa com variáveis do .env, permitindo sobrescrever paciente, enfermeiro e unidade."""
         self.url = settings.WEBSITE_URL
-        self.unidade = settings.UNIDADE
-        self.enfermeiro = settings.ENFERMEIRO
-        self.paciente = settings.PACIENTE
-        self.bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+        self.unidade = unidade or settings.UNIDADE
+        self.enfermeiro = enfermeiro or settings.ENFERMEIRO
+        self.paciente = paciente or settings.PACIENTE
         self.chat_id = settings.TELEGRAM_BOT_CHAT_ID
         self.group_chat_id = settings.TELEGRAM_GROUP_CHAT_ID
-
-    async def SOAP_A03(self, page):
-        """Preenche o formulário SOAP com o código A03 (Febre)."""
-        logger.info("Iniciando preenchimento do formulário SOAP com código A03")
-        await page.get_by_role("tab", name="SOAP").click()
-        await page.get_by_role("textbox", name="Motivo da consulta (CIAP 2)").click()
-        await page.get_by_role("textbox", name="Motivo da consulta (CIAP 2)").fill("a03")
-        await page.get_by_role("option", name="FEBRE Código A03 Inclui:").click()
-        await page.get_by_test_id("ProblemasCondicoesForm.ciap").click()
-        await page.wait_for_timeout(2000)
-        await page.get_by_test_id("ProblemasCondicoesForm.ciap").fill("a03")
-        await page.get_by_role("option", name="FEBRE Código A03 Inclui:").click()
-        await page.wait_for_timeout(2000)
-        try:
-            element = page.get_by_test_id("ProblemasCondicoesFormFooterButtons.adicionar")
-            await element.wait_for(state="visible")
-            logger.info("Elemento encontrado e visível")
-            await element.click()
-            logger.info("Botão 'Adicionar' clicado com sucesso")
-        except Exception as e:
-            logger.error(f"Erro ao clicar no botão 'Adicionar': {str(e)}")
-            await page.pause()
-        await page.wait_for_timeout(2000)
-        await page.locator("label").filter(has_text="Alta do episódio").locator("span").first.click()
-        try:
-            element = page.get_by_test_id("AtendimentoIndividualFooter.finalizar")
-            await element.wait_for(state="visible")
-            logger.info("Elemento encontrado e visível Finalizar")
-            await element.click()
-            logger.info("Botão 'Finalizar' clicado com sucesso")
-        except Exception as e:
-            logger.error(f"Erro ao clicar no botão 'Finalizar': {str(e)}")
-            await page.pause()
-        logger.info("Formulário SOAP A03 preenchido e finalizado com sucesso")
-
+        # Verdadeiro a partir do clique em "Adicionar": uma falha depois dele pode ter incluído o cidadão
+        self.submitted = False
+
+    @traced("atendimento.soap")
+    async def preencher_soap(self, page, modelo=None):
+        """Preenche e finaliza o SOAP com o plano compilado do modelo (padrão: SOAP_TEMPLATE)."""
+        plano = load_plan(modelo)
+        logger.info("Iniciando preenchimento do SOAP com o modelo %s para %s", plano.nome, self.paciente)
+        await plano.run(page)
+        logger.info("Formulário SOAP %s preenchido e finalizado com sucesso", plano.nome)
+
+    @traced("notificacao.enfileirar")
     async def notify_telegram_bot(self):
-        """Envia uma mensagem diretamente ao grupo do Telegram."""
-        try:
-            # Monta a mensagem com unidade, URL e horário
-            horario = datetime.now().strftime("%H:%M:%S %d/%m/%Y")
-            notificacao = f"Notificação recebida: Automação concluída com sucesso em {self.unidade} e {self.url} às {horario}"
-            logger.info(f"Tentando enviar mensagem ao grupo {self.group_chat_id}")
-            await self.bot.send_message(chat_id=self.group_chat_id, text=notificacao)
-            logger.info(f"Mensagem enviada ao grupo do Telegram: {notificacao}")
-        except Exception as e:
-            logger.error(f"Erro ao enviar mensagem ao grupo do Telegram {self.group_chat_id}: {str(e)}")
-        finally:
-            await self.bot.session.close()
-            logger.info("Sessão do bot encerrada com sucesso")
+        """Enfileira a notificação de conclusão no notificador compartilhado do processo."""
+        horario = datetime.now().strftime("%H:%M:%S %d/%m/%Y")
+        notificacao = f"Notificação recebida: Automação concluída com sucesso em {self.unidade} e {self.url} às {horario}"
+        get_notifier().notify(notificacao)
+        logger.info("Notificação enfileirada para o grupo %s", self.group_chat_id)
 
+    @traced("atendimento")
     async def lista_atendimento(self, page):
         """Acessa a lista de atendimento."""
         logger.info("Iniciando processo de acesso à lista de atendimento")
@@ -76,99 +65,125 @@ class AttendanceList:
         logger.info("Lista de atendimento carregada com sucesso 1")
 
         await page.get_by_test_id("adicionarCidadaoAtendimento").click()
-        # Começa clicando no label "Nome" antes de tentar o campo "Digite o nome completo do"
-        # Verifica se o label "Nome" está disponível antes de clicar
-        try:
-            nome_label = page.locator("label").filter(has_text="Nome").locator("span").first
-            await nome_label.wait_for(timeout=5000, state="visible")  # Aguarda 5 segundos
-            await nome_label.click()
+        # O campo do cidadão varia com a implantação: "Digite o nome completo do" (exibido pelo rádio
+        # "Nome") ou "Cidadão*"; as variantes são aguardadas juntas em vez de uma após o timeout da outra
+        variante, cidadao_field = await selector_registry.resolve(page, "lista.campo_cidadao")
+        if variante == "rotulo_nome":
+            await cidadao_field.click()
             logger.info("Clicado no label 'Nome' para exibir o campo do cidadão")
-        except Exception as e:
-            logger.info(f"Label 'Nome' não encontrado ou não visível: {str(e)}. Prosseguindo sem clicar")
-
-        # Tenta o campo "Digite o nome completo do" primeiro, fallback para "Cidadão*"
-        try:
             cidadao_field = page.get_by_role("textbox", name="Digite o nome completo do")
             await cidadao_field.wait_for(timeout=15000, state="visible")
-            logger.info("Campo 'Digite o nome completo do' encontrado")
-        except Exception as e:
-            logger.info(f"Campo 'Digite o nome completo do' não encontrado após clique em 'Nome': {str(e)}. Tentando 'Cidadão*' sem clique adicional")
-            cidadao_field = page.get_by_role("textbox", name="Cidadão*")
-            await cidadao_field.wait_for(timeout=15000, state="visible")
-            logger.info("Campo 'Cidadão*' encontrado")
+        logger.info("Campo do cidadão encontrado (%s)", variante)
 
-        await cidadao_field.fill(self.paciente.lower())
-        await page.wait_for_timeout(2000)
-        await page.get_by_role("option", name=self.paciente).click()
+        with tracer.span("autocomplete.lista.cidadao"):
+            await cidadao_field.fill(self.paciente.lower())
+            selecionado = await autocomplete_cache.pick(page, "lista.cidadao", self.paciente, self.unidade)
+            if selecionado is None:
+                await wait_for_options(page, self.paciente, "lista.cidadao")
+        if selecionado is None:
+            opcao = page.get_by_role("option", name=self.paciente).first
+            await autocomplete_cache.remember("lista.cidadao", self.paciente, self.unidade, opcao)
+            await opcao.click()
 
-        logger.info(f"Paciente {self.paciente} selecionado")
+        logger.info("Paciente %s selecionado", self.paciente)
 
         profissional_field = page.get_by_role("textbox", name="Profissional")
         await profissional_field.wait_for(timeout=15000, state="visible")
-        await profissional_field.fill(self.enfermeiro.lower())
-        await page.wait_for_timeout(2000)
-
-        options = page.get_by_role("option").filter(has_text=re.compile(self.enfermeiro, re.IGNORECASE))
-        logger.info(f"Opções encontradas para {self.enfermeiro}: {await options.count()}")
-        await page.wait_for_timeout(2000)
-        if await options.count() > 0:  # Usa await para contar as opções
+        with tracer.span("autocomplete.lista.profissional"):
+            await profissional_field.fill(self.enfermeiro.lower())
+            selecionado = await autocomplete_cache.pick(page, "lista.profissional", self.enfermeiro, self.unidade)
+            if selecionado is None:
+                await wait_for_options(page, self.enfermeiro, "lista.profissional", raise_on_timeout=False)
+
+        if selecionado is None:
+            options = page.get_by_role("option").filter(has_text=selector_registry.regex(self.enfermeiro))
             count = await options.count()
-            for i in range(min(count, 3)):
-                logger.info(f"Opção {i}: {await options.nth(i).inner_text()}")
-            selected_option = options.first
-            logger.info(f"Selecionando opção: {await selected_option.inner_text()}")
-            await selected_option.click()
-            logger.info(f"Profissional {self.enfermeiro} selecionado")
-        else:
-            logger.error(f"Nenhuma opção encontrada para {self.enfermeiro}")
-            raise Exception(f"Nenhuma opção encontrada para {self.enfermeiro}")
+            logger.info("Opções encontradas para %s: %s", self.enfermeiro, count)
+            if count > 0:
+                await autocomplete_cache.remember("lista.profissional", self.enfermeiro, self.unidade, options.first)
+                await options.first.click()
+                logger.info("Profissional %s selecionado", self.enfermeiro)
+            else:
+                logger.error("Nenhuma opção encontrada para %s", self.enfermeiro)
+                raise Exception(f"Nenhuma opção encontrada para {self.enfermeiro}")
 
-        logger.info(f"Verificando atendimentos para {self.paciente}")
+        logger.info("Verificando atendimentos para %s", self.paciente)
         await page.locator("label").filter(has_text="DEMANDA ESPONTÂNEA").locator("span").first.click()
+        self.submitted = True
         await page.get_by_test_id("adicionarAtendimento").click()
-        await page.wait_for_timeout(2000)
+        await wait_for_dialog_closed(page, "lista.adicionar")
 
         # await page.get_by_role("navigation").filter(has_text="AcompanhamentosAgendaBusca").click()
         logger.info("Lista de atendimento carregada com sucesso")
+        logger.info("Paciente %s adicionado à lista de atendimentos", self.paciente)
+
+    async def _abrir_lista(self, page):
+        """Abre a lista de atendimentos, se ainda não estiver na tela."""
+        if not await page.get_by_test_id("adicionarCidadaoAtendimento").is_visible():
+            await page.get_by_role("navigation").filter(has_text="AcompanhamentosAgendaBusca").click()
+            await page.get_by_role("link", name="Lista de atendimentos").click()
+            await wait_for_visible(page.get_by_test_id("adicionarCidadaoAtendimento"), "lista.abrir")
+
+    @traced("atendimento.confirmacao")
+    async def confirmar_na_lista(self, page):
+        """Depois de uma falha, confere se o cidadão entrou na lista mesmo assim (True) ou se a etapa pode ser repetida."""
+        if not self.submitted:
+            return False
+        await self._abrir_lista(page)
+        capture = capture_for(page.context)
+        if capture is not None and await capture.wait_for(lambda: capture.queue_position(self.paciente), timeout=500) is not None:
+            presente = True
+        else:
+            presente = await page.get_by_text(selector_registry.regex(self.paciente)).count() > 0
+        logger.info("Paciente %s %s na lista de atendimentos após a falha", self.paciente, "encontrado" if presente else "ausente")
+        return presente
+
+    async def _atender_pela_api(self, page, capture):
+        """Clica em 'Atender' na linha do paciente, localizada pela lista de atendimentos capturada da API."""
+        if capture is None:
+            return False
+        posicao = await capture.wait_for(lambda: capture.queue_position(self.paciente), timeout=500)
+        if posicao is None:
+            return False
+        atender_button = page.locator("button[title='Atender']").nth(posicao)
+        # Confere que a linha da tela é a do paciente antes de clicar
+        if not await atender_button.is_visible():
+            return False
+        linha = await atender_button.locator("xpath=..").inner_text()
+        if self.paciente.lower() not in linha.lower():
+            logger.info("Lista da API não corresponde à tela (posição %s), procurando %s pelo DOM", posicao, self.paciente)
+            return False
+        await atender_button.click()
+        logger.info("Botão 'Atender' clicado para %s (posição %s na lista da API)", self.paciente, posicao)
+        return True
+
+    @traced("atendimento.abrir")
+    async def abrir_atendimento(self, page):
+        """Localiza o paciente na lista de atendimentos e abre o atendimento (botão 'Atender')."""
+        # Retomada: a etapa anterior terminou em outra execução, então a lista pode ainda não estar aberta
+        await self._abrir_lista(page)
         await page.mouse.move(0, 0)
 
+        if await self._atender_pela_api(page, capture_for(page.context)):
+            logger.info("Atendimento aberto para %s", self.paciente)
+            return
+
         logger.info("Verificando a lista de atendimentos para encontrar o paciente")
-        paciente_span = page.get_by_text(re.compile(self.paciente, re.IGNORECASE))
+        paciente_span = page.get_by_text(selector_registry.regex(self.paciente))
         if await paciente_span.count() > 0:  # Usa await para contar os elementos
-            logger.info(f"Paciente encontrado: {await paciente_span.inner_text()}")
-            atender_button = page.locator("button[title='Atender']").first
-            logger.info(f"Botões 'Atender' com title encontrados: {await page.locator('button[title=\"Atender\"]').count()}")
-            if not await atender_button.is_visible():
-                logger.info("Botão 'Atender' com title não encontrado ou não visível, tentando abordagem alternativa")
-                buttons_no_text = page.get_by_role("button").filter(has_text=re.compile(r"^$", re.IGNORECASE))
-                logger.info(f"Botões sem texto encontrados: {await buttons_no_text.count()}")
-                count = await buttons_no_text.count()
-                for i in range(min(count, 5)):
-                    logger.info(f"Botão {i} sem texto: {await buttons_no_text.nth(i).get_attribute('title') or 'Sem title'}")
-                atender_button = buttons_no_text.first
-
-            if await atender_button.is_visible():
-                await atender_button.scroll_into_view_if_needed()
-                await atender_button.wait_for(timeout=5000, state="visible")
-                await atender_button.click()
-                logger.info(f"Botão 'Atender' clicado para {self.paciente}")
-            else:
-                logger.warning(f"Botão 'Atender' não visível para {self.paciente}")
-                context_texts = paciente_span.locator("xpath=ancestor::div").locator(":scope *").filter(has_text=re.compile(".*", re.IGNORECASE))
-                logger.info(f"Textos no contexto do paciente: {await context_texts.count()}")
-                count = await context_texts.count()
-                for i in range(min(count, 5)):
-                    logger.info(f"Texto {i} no contexto: {await context_texts.nth(i).inner_text()}")
+            logger.info("Paciente %s encontrado na lista", self.paciente)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Texto do paciente na lista: %s", await paciente_span.first.inner_text())
+            try:
+                variante, atender_button = await selector_registry.resolve(page, "lista.atender", timeout=5000)
+            except TimeoutError:
+                logger.warning("Botão 'Atender' não visível para %s", self.paciente)
                 raise Exception(f"Botão 'Atender' não encontrado ou não visível para {self.paciente}")
+            await atender_button.scroll_into_view_if_needed()
+            await atender_button.click()
+            logger.info("Botão 'Atender' clicado para %s (%s)", self.paciente, variante)
         else:
-            all_texts = page.locator(":scope *").filter(has_text=re.compile(".*", re.IGNORECASE))
-            logger.info(f"Paciente {self.paciente} não encontrado. Textos disponíveis na página: {await all_texts.count()}")
-            count = await all_texts.count()
-            for i in range(min(count, 10)):
-                logger.info(f"Texto {i}: {await all_texts.nth(i).inner_text()}")
+            logger.warning("Paciente %s não encontrado na lista de atendimentos", self.paciente)
             raise Exception(f"Paciente {self.paciente} não encontrado na lista de atendimentos")
 
-        logger.info("Processo de lista de atendimento concluído")
-        await self.SOAP_A03(page)
-        logger.info("SOAP A03 concluído após atendimento")
-        await self.notify_telegram_bot()
\ No newline at end of file
+        logger.info("Atendimento aberto para %s", self.paciente)
\ No newline at end of file
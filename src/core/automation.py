@@ -1,48 +1,98 @@
 # src/core/automation.py
+import logging
 import re
+import time
 from playwright.async_api import async_playwright, TimeoutError
 from src.config.settings import settings
 from src.utils.logger import logger
+from src.utils.diagnostics import diagnostics
+from src.utils.readiness import wait_for_network_idle, wait_for_visible, wait_stats
+from src.utils.autocomplete_cache import autocomplete_cache
+from src.utils.selector_registry import selector_registry
+from src.utils.tracing import traced, tracer
+from src.core.api_capture import capture_for
+from src.core.browser_profile import BrowserProfile
+from src.core.checkpoints import CheckpointStore, patient_key, run_key
+from src.core.context_pool import ContextPool
+from src.core.har_replay import HarSession
+from src.core.notifier import close_notifier
 from src.core.agendamento import ScheduleAppointment
-from src.core.atendimento import AttendanceList
+from src.core.pipeline import BATCH_STEPS, REPLAY_STEPS, STEPS, PatientPipeline
+from src.core.session_cache import SessionCache, cache_path_for
+from src.core.slot_scanner import FullDayCache
+
+# Campos do formulário de login
+USERNAME_INPUT = '//*[@id="root"]/div/div[3]/div[1]/div/div[2]/div/form/div/div[1]/div/div[1]/div/div/input'
+PASSWORD_INPUT = '//*[@id="root"]/div/div[3]/div[1]/div/div[2]/div/form/div/div[2]/div/div/div/div[1]/div/div/input'
+
+CBO_ESF = re.compile("Enfermeiro da estratégia de saúde da família", re.IGNORECASE)
+
+# Lista todas as unidades (<h3>) com os CBOs do div irmão em uma única avaliação no navegador
+UNITS_SNAPSHOT_JS = """
+() => Array.from(document.querySelectorAll('h3')).map((h3, index) => {
+    const spans = document.evaluate(
+        'ancestor::div/following-sibling::div[1]//span', h3, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    const cbos = [];
+    for (let i = 0; i < spans.snapshotLength; i++) {
+        const text = spans.snapshotItem(i).innerText.trim();
+        if (text && !cbos.includes(text)) cbos.push(text);
+    }
+    return {index, name: h3.innerText.trim(), cbos};
+})
+"""
 
 class WebsiteAutomation:
-    def __init__(self):
-        """Inicializa a automação com as configurações do .env."""
-        settings.validate()
+    def __init__(self, unidade=None):
+        """Inicializa a automação com as configurações do .env, permitindo sobrescrever a unidade."""
         self.url = settings.WEBSITE_URL
         self.username = settings.USERNAME
         self.password = settings.PASSWORD
-        self.unidade = settings.UNIDADE
-        logger.info(f"Usuário carregado: {self.username}")
-        logger.info(f"Senha carregada: {self.password}")
+        self.unidade = unidade or settings.UNIDADE
+        self.cbo = None
+        self.full_days = FullDayCache()
+        # Gravação/replay do tráfego em HAR: a sessão em cache pularia o login gravado e o replay não
+        # deve marcar checkpoints da execução real
+        self.har = HarSession() if settings.HAR_MODE else None
+        self.session_cache = (
+            SessionCache(path=cache_path_for(self.unidade)) if settings.SESSION_CACHE and not self.har else None
+        )
+        self.browser_profile = BrowserProfile()
+        self.checkpoints = CheckpointStore() if settings.CHECKPOINTS and not (self.har and self.har.replay) else None
+        self.pipeline = PatientPipeline(self, self.checkpoints)
+        self.run_id = None
+        logger.info("Usuário carregado: %s", self.username)
 
+    @traced("login")
     async def login(self, page):
         """Realiza o login no site e retorna a página logada."""
-        logger.info(f"Acessando o site: {self.url}")
+        logger.info("Acessando o site: %s", self.url)
         await page.goto(self.url)
 
         logger.info("Aceitando cookies")
         await page.get_by_role("button", name="Aceitar todos").click()
-        await page.wait_for_selector('//*[@id="root"]/div/div[3]/div[1]/div/div[2]/div/form/div/div[1]/div/div[1]/div/div/input', timeout=10000)
+        await page.wait_for_selector(USERNAME_INPUT, timeout=10000)
 
         logger.info("Preenchendo o campo de usuário")
-        await page.locator('//*[@id="root"]/div/div[3]/div[1]/div/div[2]/div/form/div/div[1]/div/div[1]/div/div/input').fill(self.username)
+        await page.locator(USERNAME_INPUT).fill(self.username)
 
         logger.info("Preenchendo o campo de senha")
-        await page.locator('//*[@id="root"]/div/div[3]/div[1]/div/div[2]/div/form/div/div[2]/div/div/div/div[1]/div/div/input').fill(self.password)
+        await page.locator(PASSWORD_INPUT).fill(self.password)
 
         logger.info("Clicando no botão de login")
         await page.click("button[type='submit']")
 
         logger.info("Verificando diálogo de sessão existente")
         try:
-            await page.wait_for_timeout(2000)
+            # Aguarda o que surgir primeiro: o diálogo de sessão existente ou a lista de unidades
+            pos_login = page.locator("xpath=//button[contains(., 'Continuar')]").or_(page.locator("h3")).or_(page.locator("iframe"))
+            await wait_for_visible(pos_login.first, "login.pos_envio", raise_on_timeout=False)
             iframes = page.locator("iframe")
             count = await iframes.count()  # Usa await para obter o número de iframes
             for i in range(count):
                 frame = iframes.nth(i)
-                logger.info(f"Verificando iframe {i}: {await frame.get_attribute('src')}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Verificando iframe %s: %s", i, await frame.get_attribute('src'))
                 continue_button = frame.locator("xpath=//button[contains(., 'Continuar')]")
                 if await continue_button.is_visible(timeout=3000):
                     await continue_button.click()
@@ -62,74 +112,310 @@ class WebsiteAutomation:
         # await page.pause()
         # await page.wait_for_selector("text=Centro de Referencia Municipal de Saude", timeout=10000)
         # Verifica a unidade específica do .env e o CBO
-        await page.wait_for_timeout(2000)  # Aguarda extra para garantir carregamento completo
+        await wait_for_visible(page.locator("h3").first, "login.unidades")
 
         # Verifica a unidade específica do .env e o CBO
-        logger.info(f"Procurando unidade: {self.unidade} com CBO 'Enfermeiro da estratégia de saúde da família'")
-        unidades = page.locator("h3").filter(has_text=re.compile(self.unidade, re.IGNORECASE))
-        count = await unidades.count()
-        logger.info(f"Unidades encontradas com texto '{self.unidade}': {count}")
+        logger.info("Procurando unidade: %s com CBO 'Enfermeiro da estratégia de saúde da família'", self.unidade)
+        unidades = await page.evaluate(UNITS_SNAPSHOT_JS)
+        unidade_pattern = selector_registry.regex(re.escape(self.unidade))
+        candidatas = [u for u in unidades if unidade_pattern.search(u["name"])]
+        logger.info("Unidades encontradas com texto '%s': %s de %s", self.unidade, len(candidatas), len(unidades))
 
         unidade_encontrada = False
-        for i in range(count):
-            unidade = unidades.nth(i)
-            unidade_text = await unidade.inner_text()
-            logger.info(f"Verificando unidade {i}: {unidade_text}")
-            # Busca o CBO apenas no div irmão direto
-            cbo_element = unidade.locator("xpath=ancestor::div/following-sibling::div[1]//span[contains(., 'Enfermeiro da estratégia de saúde da família')]")
-            cbo_count = await cbo_element.count()
-            logger.info(f"CBOs encontrados para unidade {unidade_text}: {cbo_count}")
-            if cbo_count > 0:
-                cbo_text = await cbo_element.first.inner_text()  # Usa .first para evitar modo estrito
-                logger.info(f"Unidade {unidade_text} encontrada com CBO compatível: {cbo_text}")
-                await unidade.click()  # Clica na unidade correta
+        for unidade in candidatas:
+            cbo_text = next((cbo for cbo in unidade["cbos"] if CBO_ESF.search(cbo)), None)
+            if cbo_text:
+                self.cbo = cbo_text
+                logger.info("Unidade %s encontrada com CBO compatível: %s", unidade['name'], cbo_text)
+                await page.locator("h3").nth(unidade["index"]).click()  # Clica na unidade correta
                 unidade_encontrada = True
                 break
-            else:
-                logger.info(f"Unidade {unidade_text} (índice {i}) não possui CBO 'Enfermeiro da estratégia de saúde da família'")
+            logger.info("Unidade %s (índice %s) não possui CBO 'Enfermeiro da estratégia de saúde da família'", unidade['name'], unidade['index'])
 
         if not unidade_encontrada:
-            # Loga todas as unidades <h3> e seus CBOs para depuração
-            todas_unidades = page.locator("h3")
-            todas_count = await todas_unidades.count()
-            logger.info(f"Total de unidades <h3> na página: {todas_count}")
-            for i in range(todas_count):
-                unidade = todas_unidades.nth(i)
-                unidade_text = await unidade.inner_text()
-                cbo_element = unidade.locator("xpath=ancestor::div/following-sibling::div[1]//span[contains(., 'Enfermeiro')]")
-                cbo_text = await cbo_element.first.inner_text() if await cbo_element.count() > 0 else "Nenhum CBO encontrado"
-                logger.info(f"Unidade {i}: {unidade_text} | CBO: {cbo_text}")
-            logger.error(f"Nenhuma unidade {self.unidade} encontrada com CBO 'Enfermeiro da estratégia de saúde da família'")
-            raise Exception(f"Unidade {self.unidade} não encontrada com CBO compatível")
-
-        logger.info(f"Login bem-sucedido para o usuário: {self.username}")
-
-    async def run(self):
+            logger.error("Nenhuma unidade %s encontrada com CBO 'Enfermeiro da estratégia de saúde da família'", self.unidade)
+            erro = Exception(f"Unidade {self.unidade} não encontrada com CBO compatível")
+            await diagnostics.capture(page, "login.unidade", erro=erro, unidades=unidades)
+            raise erro
+
+        logger.info("Login bem-sucedido para o usuário: %s", self.username)
+
+    async def session_is_valid(self, page):
+        """Abre o site com a sessão restaurada e verifica se já está autenticado."""
+        await page.goto(self.url)
+        navegacao = page.get_by_role("navigation").filter(has_text="AcompanhamentosAgendaBusca")
+        login_form = page.locator(USERNAME_INPUT)
+        try:
+            await navegacao.or_(login_form).first.wait_for(state="visible", timeout=10000)
+        except TimeoutError:
+            return False
+        return await navegacao.is_visible()
+
+    async def new_context(self, browser, **kwargs):
+        """Cria um contexto do navegador com as opções e bloqueios do perfil configurado."""
+        if self.har:
+            kwargs = {**self.har.context_options(), **kwargs}
+        context = await self.browser_profile.new_context(browser, **kwargs)
+        if self.har:
+            await self.har.attach(context)
+        # Captura as respostas da API desde a primeira página do contexto
+        capture_for(context)
+        await diagnostics.start_tracing(context)
+        return context
+
+    async def open_session(self, browser, use_cache=True):
+        """Abre um contexto autenticado, reutilizando a sessão em cache quando ainda válida."""
+        inicio = time.perf_counter()
+        payload = None
+        if use_cache and self.session_cache:
+            payload = self.session_cache.load(self.url, self.username, self.unidade)
+        if payload:
+            context = await self.new_context(browser, storage_state=payload["storage_state"])
+            try:
+                page = await context.new_page()
+                with tracer.span("login.validacao_cache"):
+                    valida = await self.session_is_valid(page)
+            except Exception:
+                # O chamador não recebe o contexto: fechá-lo aqui evita um contexto órfão a cada tentativa
+                await context.close()
+                raise
+            if valida:
+                self.cbo = payload.get("cbo")
+                quente = time.perf_counter() - inicio
+                frio = payload.get("login_seconds")
+                ganho = f", a frio: {frio:.2f}s, ganho: {frio - quente:.2f}s" if frio else ""
+                logger.info("Login a quente (sessão em cache) em %.2fs%s", quente, ganho)
+                return context, page
+            logger.info("Sessão em cache inválida, realizando login completo")
+            await context.close()
+            self.session_cache.clear()
+
+        inicio = time.perf_counter()
+        context = await self.new_context(browser)
+        try:
+            page = await context.new_page()
+            await self.login(page)
+        except Exception:
+            await context.close()
+            raise
+        frio = time.perf_counter() - inicio
+        logger.info("Login a frio em %.2fs", frio)
+        if self.session_cache:
+            self.session_cache.save(
+                await context.storage_state(), self.url, self.username, self.unidade,
+                cbo=self.cbo, login_seconds=round(frio, 3),
+            )
+        return context, page
+
+    async def is_logged_out(self, page):
+        """Indica se a página voltou ao formulário de login (sessão expirada)."""
+        try:
+            return await page.locator(USERNAME_INPUT).is_visible()
+        except Exception:
+            return True
+
+    def pending(self, entries, run_id=None, fresh=False):
+        """Define a execução atual e separa os pacientes ainda não concluídos nela."""
+        self.run_id = run_id or run_key(entries, self.unidade)
+        if not self.checkpoints:
+            return list(entries)
+        if fresh:
+            # Só os pacientes desta lista: shards com o mesmo --run-id não apagam o progresso uns dos outros
+            self.checkpoints.clear(self.run_id, [patient_key(entry, self.unidade) for entry in entries])
+        concluidos = self.checkpoints.completed(self.run_id, STEPS)
+        pendentes = [entry for entry in entries if patient_key(entry, self.unidade) not in concluidos]
+        if len(pendentes) < len(entries):
+            logger.info(
+                "Retomando a execução %s: %s de %s pacientes já concluídos",
+                self.run_id, len(entries) - len(pendentes), len(entries),
+            )
+        return pendentes
+
+    async def run(self, run_id=None, fresh=False):
         """Ponto de entrada para executar a automação."""
+        entry = {"paciente": settings.PACIENTE}
+        if not self.pending([entry], run_id, fresh):
+            logger.info("Paciente %s já concluído na execução %s; use --fresh para refazer", settings.PACIENTE, self.run_id)
+            return
         try:
             async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=False)
-                page = await browser.new_page()
+                browser = await self.browser_profile.launch(p)
 
                 logger.info("Iniciando a automação do site Agendamento")
-                await self.login(page)  # Agora assíncrono
-                scheduler = ScheduleAppointment()
-                await scheduler.schedule_appointment(page)
-                
-                logger.info("Chamando a função de lista de atendimento")
-                attendance = AttendanceList()
-                await attendance.lista_atendimento(page)
+                context, page = await self.open_session(browser)
+                if self.har and self.har.replay:
+                    # Offline: a notificação iria ao Telegram de verdade
+                    entry = {**entry, "etapas": REPLAY_STEPS}
+                resultado = await self.process_patient(page, entry)
+                if resultado["status"] != "sucesso":
+                    raise Exception(resultado["erro"])
                 logger.info("Automação de lista de atendimento concluída")
 
-                logger.info(f"Automação concluída com sucesso: {self.unidade} / {self.url}")
-                await page.wait_for_timeout(5000)
+                logger.info("Automação concluída com sucesso: %s / %s", self.unidade, self.url)
+                await wait_for_network_idle(page, "run.final")
+                wait_stats.log_summary()
+                autocomplete_cache.log_summary()
+                self.browser_profile.log_report()
+                # O HAR da gravação é escrito no fechamento do contexto
+                await context.close()
+                if self.har:
+                    self.har.log_report()
                 await browser.close()
+                await close_notifier()
         except TimeoutError:
             logger.error("Tempo de espera excedido. Verifique os seletores ou a conexão.")
             raise
         except Exception as e:
-            logger.error(f"Erro durante a automação: {str(e)}")
+            logger.error("Erro durante a automação: %s", str(e))
             raise
+        finally:
+            await diagnostics.flush()
+            tracer.export()
+            selector_registry.save()
+            autocomplete_cache.save()
+
+    async def process_patient(self, page, entry):
+        """Executa as etapas pendentes do paciente (checkpoint por etapa), retornando o resultado individual."""
+        paciente = entry["paciente"]
+        enfermeiro = entry.get("enfermeiro") or settings.ENFERMEIRO
+        inicio = time.perf_counter()
+        resultado = {"paciente": paciente, "enfermeiro": enfermeiro, "status": "sucesso", "erro": None}
+        try:
+            if entry.get("unidade") and entry["unidade"].lower() != self.unidade.lower():
+                raise Exception(f"Unidade {entry['unidade']} difere da unidade da sessão ({self.unidade})")
+            await diagnostics.new_chunk(page.context)
+            with tracer.attributes(paciente=paciente, unidade=self.unidade), tracer.span("paciente"):
+                retomadas = await self.pipeline.run(page, {**entry, "enfermeiro": enfermeiro}, self.run_id)
+            if retomadas:
+                resultado["retomadas"] = retomadas
+        except Exception as e:
+            logger.error("Falha ao processar o paciente %s: %s", paciente, str(e))
+            resultado["status"] = "falha"
+            resultado["erro"] = str(e)
+            # Fecha diálogos abertos para que o próximo paciente comece de um estado limpo
+            try:
+                await page.keyboard.press("Escape")
+            except Exception:
+                pass
+        resultado["duracao"] = round(time.perf_counter() - inicio, 3)
+        logger.info("Paciente %s: %s em %ss", paciente, resultado['status'], resultado['duracao'])
+        return resultado
+
+    async def run_batch(self, entries, pool_size=None, run_id=None, fresh=False):
+        """Processa uma fila de pacientes em uma única sessão autenticada, com contextos paralelos."""
+        if self.har and not self.har.replay:
+            raise ValueError("A gravação em HAR é feita na execução de um paciente (main.py sem --worklist)")
+        resultados = []
+        self.full_days.clear()
+        pendentes = self.pending(entries, run_id, fresh)
+        if not pendentes:
+            logger.info("Todos os %s pacientes já foram concluídos na execução %s", len(entries), self.run_id)
+            return [self._resumed_result(entry) for entry in entries]
+        try:
+            async with async_playwright() as p:
+                browser = await self.browser_profile.launch(p)
+
+                pool = ContextPool(browser, self, size=pool_size, launch=lambda: self.browser_profile.launch(p))
+                logger.info("Iniciando a automação em lote para %s pacientes com %s contextos", len(pendentes), pool.size)
+                await pool.start()
+                try:
+                    etapas = BATCH_STEPS if settings.BULK_CANCEL else STEPS
+                    if self.har and self.har.replay:
+                        etapas = tuple(step for step in etapas if step in REPLAY_STEPS)
+                    resultados = await pool.run([{**entry, "etapas": etapas} for entry in pendentes])
+                    if settings.BULK_CANCEL:
+                        # Os workers estão livres: o primeiro contexto faz a remoção de todo o lote
+                        _, page = pool.contexts[0]
+                        await self.cancel_appointments(page, pendentes, resultados)
+                finally:
+                    await pool.close()
+                    await close_notifier()
+                if self.har:
+                    self.har.log_report()
+
+                # O pool pode ter relançado o navegador
+                await pool.browser.close()
+        except TimeoutError:
+            logger.error("Tempo de espera excedido. Verifique os seletores ou a conexão.")
+            raise
+        except Exception as e:
+            logger.error("Erro durante a automação em lote: %s", str(e))
+            raise
+        finally:
+            await diagnostics.flush()
+            tracer.export()
+            selector_registry.save()
+            autocomplete_cache.save()
+
+        wait_stats.log_summary()
+        autocomplete_cache.log_summary()
+        self.browser_profile.log_report()
+        # Recompõe a lista completa, na ordem original, com os pacientes concluídos em execuções anteriores
+        por_paciente = {patient_key(entry, self.unidade): r for entry, r in zip(pendentes, resultados)}
+        resultados = [por_paciente.get(patient_key(entry, self.unidade)) or self._resumed_result(entry) for entry in entries]
+        sucessos = sum(1 for r in resultados if r["status"] == "sucesso")
+        logger.info("Lote concluído: %s/%s pacientes processados com sucesso", sucessos, len(resultados))
+        return resultados
+
+    async def cancel_appointments(self, page, entries, resultados):
+        """Remove, numa passada pela agenda de cada enfermeiro, os agendamentos criados para os pacientes do lote.
+
+        Pacientes cujo agendamento não sai da agenda passam a falha; os removidos têm a etapa de
+        remoção registrada no checkpoint.
+        """
+        por_enfermeiro = {}
+        for entry, resultado in zip(entries, resultados):
+            key = patient_key(entry, self.unidade)
+            agendamento = self.pipeline.created.get(key)
+            if not agendamento:
+                continue
+            if self.checkpoints and self.checkpoints.steps(self.run_id, key).get("remocao", {}).get("status") == "concluida":
+                # Removido numa execução anterior: não está mais na agenda e não pode virar falha
+                self.pipeline.created.pop(key, None)
+                continue
+            por_enfermeiro.setdefault(resultado["enfermeiro"], []).append((key, resultado, agendamento))
+
+        total = removidos = 0
+        for enfermeiro, itens in por_enfermeiro.items():
+            total += len(itens)
+            scheduler = ScheduleAppointment(enfermeiro=enfermeiro, full_days=self.full_days, unidade=self.unidade)
+            try:
+                # Falhas por evento já voltam como pendentes; aqui só chegam as anteriores à passada (abrir a agenda)
+                relatorio = await scheduler.cancelar_agendamentos(page, [agendamento for _, _, agendamento in itens])
+            except Exception as e:
+                logger.error("Falha na remoção em lote dos agendamentos de %s: %s", enfermeiro, str(e))
+                await diagnostics.capture(page, "remocao_lote", erro=e, enfermeiro=enfermeiro, agendamentos=len(itens))
+                relatorio = {"removidos": [], "pendentes": [{"agendamento": a, "motivo": str(e)} for _, _, a in itens]}
+                try:
+                    await page.keyboard.press("Escape")
+                except Exception:
+                    pass
+            motivos = {id(p["agendamento"]): p["motivo"] for p in relatorio["pendentes"]}
+            removidos_ids = {id(a) for a in relatorio["removidos"]}
+            for key, resultado, agendamento in itens:
+                if id(agendamento) in removidos_ids:
+                    removidos += 1
+                    self.pipeline.created.pop(key, None)
+                    if self.checkpoints:
+                        self.checkpoints.mark(self.run_id, key, "remocao", "concluida", {"agendamento": agendamento.get("id")})
+                    continue
+                erro = f"Agendamento não removido: {motivos.get(id(agendamento), 'motivo desconhecido')}"
+                if self.checkpoints:
+                    self.checkpoints.mark(self.run_id, key, "remocao", "falha", erro=erro)
+                resultado["status"] = "falha"
+                resultado["erro"] = resultado["erro"] or erro
+        logger.info("Remoção em lote: %s de %s agendamentos removidos", removidos, total)
+        return removidos
+
+    def _resumed_result(self, entry):
+        return {
+            "paciente": entry["paciente"],
+            "enfermeiro": entry.get("enfermeiro") or settings.ENFERMEIRO,
+            "status": "sucesso",
+            "erro": None,
+            "duracao": 0.0,
+            "retomadas": list(STEPS),
+        }
 
     def extract_data(self):
         """Exemplo de função para extrair dados após o login."""
@@ -145,10 +431,10 @@ class WebsiteAutomation:
 
                 logger.info("Extraindo dados da página")
                 data = page.inner_text("h1")
-                logger.info(f"Dado extraído: {data}")
+                logger.info("Dado extraído: %s", data)
 
                 browser.close()
                 return data
         except Exception as e:
-            logger.error(f"Erro ao extrair dados: {str(e)}")
+            logger.error("Erro ao extrair dados: %s", str(e))
             raise
\ No newline at end of file
@@ -0,0 +1,151 @@
+# src/core/browser_profile.py
+import json
+import re
+from src.config.settings import settings
+from src.utils.logger import logger
+
+PROFILES = ("normal", "fast")
+
+# Argumentos do Chromium para vários fluxos na mesma VM: sem GPU, sem tarefas de fundo e sem
+# throttling de abas em segundo plano (os contextos do pool ficam ocultos uns atrás dos outros)
+FAST_ARGS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-dev-shm-usage",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+# Extensões dos tipos bloqueáveis: só essas URLs passam pelo handler em Python, o resto (documento,
+# XHR/GraphQL) segue direto pelo navegador sem o custo da interceptação
+BLOCKABLE_EXTENSIONS = {
+    "image": "png|jpe?g|gif|svg|webp|ico|bmp|avif",
+    "font": "woff2?|ttf|otf|eot",
+    "media": "mp4|webm|mp3|ogg|wav",
+    "stylesheet": "css",
+}
+
+# Tamanho médio (bytes) por tipo; a requisição abortada não chega a informar o tamanho real
+ESTIMATED_BYTES = {"image": 25_000, "font": 45_000, "media": 400_000, "stylesheet": 30_000, "script": 60_000}
+DEFAULT_ESTIMATE = 5_000
+
+# Zera animações e transições para que os elementos fiquem estáveis assim que aparecem
+DISABLE_ANIMATIONS_CSS = (
+    "*, *::before, *::after { animation-duration: 0s !important; animation-delay: 0s !important; "
+    "transition-duration: 0s !important; transition-delay: 0s !important; scroll-behavior: auto !important; }"
+)
+DISABLE_ANIMATIONS_JS = f"""
+(() => {{
+    const add = () => {{
+        const style = document.createElement('style');
+        style.textContent = {json.dumps(DISABLE_ANIMATIONS_CSS)};
+        (document.head || document.documentElement).appendChild(style);
+    }};
+    if (document.readyState === 'loading') document.addEventListener('DOMContentLoaded', add);
+    else add();
+}})()
+"""
+
+
+def _split(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+class BrowserProfile:
+    """Perfil do navegador: normal (janela visível, tudo carregado) ou fast (headless e com bloqueio de recursos)."""
+
+    def __init__(self, name=None, headless=None, block_types=None, block_patterns=None):
+        self.name = (name or settings.BROWSER_PROFILE).lower()
+        if self.name not in PROFILES:
+            raise ValueError(f"Perfil de navegador inválido: {self.name} (use {', '.join(PROFILES)})")
+        self.fast = self.name == "fast"
+        if headless is None:
+            headless = settings.HEADLESS if settings.HEADLESS is not None else self.fast
+        self.headless = headless
+        self.block_types = set(block_types if block_types is not None else _split(settings.BLOCK_RESOURCE_TYPES))
+        self.block_patterns = list(block_patterns if block_patterns is not None else _split(settings.BLOCK_URL_PATTERNS))
+        self._pattern_re = (
+            re.compile("|".join(re.escape(p) for p in self.block_patterns), re.IGNORECASE) if self.block_patterns else None
+        )
+        self.blocked = {}
+        self.bytes_saved = 0
+
+    @property
+    def args(self):
+        return FAST_ARGS if self.fast else []
+
+    def route_pattern(self):
+        """Regex das URLs interceptadas: extensões dos tipos bloqueados e os padrões configurados."""
+        partes = [BLOCKABLE_EXTENSIONS[t] for t in sorted(self.block_types) if t in BLOCKABLE_EXTENSIONS]
+        alternativas = []
+        if partes:
+            alternativas.append(rf"\.(?:{'|'.join(partes)})(?:[?#].*)?$")
+        if self._pattern_re:
+            alternativas.append(self._pattern_re.pattern)
+        return re.compile("|".join(alternativas), re.IGNORECASE) if alternativas else None
+
+    def context_options(self):
+        if not self.fast:
+            return {}
+        return {
+            "reduced_motion": "reduce",
+            "viewport": {"width": 1280, "height": 800},
+            # Service workers desviariam as requisições do roteamento do contexto
+            "service_workers": "block",
+        }
+
+    async def launch(self, playwright):
+        """Inicia o Chromium com as opções do perfil."""
+        logger.info("Iniciando o navegador (perfil %s, headless=%s)", self.name, self.headless)
+        return await playwright.chromium.launch(headless=self.headless, args=self.args)
+
+    async def new_context(self, browser, **kwargs):
+        """Cria um contexto com as opções do perfil e, no perfil fast, o bloqueio de recursos."""
+        context = await browser.new_context(**{**self.context_options(), **kwargs})
+        if self.fast:
+            await context.add_init_script(DISABLE_ANIMATIONS_JS)
+            pattern = self.route_pattern()
+            if pattern is not None:
+                await context.route(pattern, self._route)
+        return context
+
+    def block_reason(self, url, resource_type):
+        """Motivo do bloqueio (tipo ou padrão de URL), ou None se a requisição deve seguir."""
+        if resource_type in self.block_types:
+            return resource_type
+        if self._pattern_re and self._pattern_re.search(url):
+            return "padrao"
+        return None
+
+    async def _route(self, route):
+        request = route.request
+        motivo = self.block_reason(request.url, request.resource_type)
+        if motivo is None:
+            await route.fallback()
+            return
+        self.blocked[motivo] = self.blocked.get(motivo, 0) + 1
+        self.bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATE)
+        await route.abort("blockedbyclient")
+
+    def report(self):
+        """Requisições bloqueadas por motivo e bytes economizados (estimativa por tipo)."""
+        return {
+            "perfil": self.name,
+            "bloqueadas": sum(self.blocked.values()),
+            "por_motivo": dict(sorted(self.blocked.items())),
+            "bytes_economizados_estimados": self.bytes_saved,
+        }
+
+    def log_report(self):
+        if not self.fast:
+            return
+        relatorio = self.report()
+        logger.info(
+            "Recursos bloqueados: %s %s, ~%.1f MB economizados (estimativa)",
+            relatorio["bloqueadas"], relatorio["por_motivo"], relatorio["bytes_economizados_estimados"] / 1_000_000,
+        )
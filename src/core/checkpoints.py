@@ -0,0 +1,99 @@
+# src/core/checkpoints.py
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import date
+from src.config.settings import settings
+from src.utils.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id TEXT NOT NULL,
+    paciente TEXT NOT NULL,
+    etapa TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    dados TEXT,
+    erro TEXT,
+    atualizado REAL NOT NULL,
+    PRIMARY KEY (run_id, paciente, etapa)
+)
+"""
+
+
+def patient_key(entry, unidade=None):
+    """Identifica o paciente na execução: paciente, enfermeiro e unidade, sem diferenciar maiúsculas."""
+    partes = (
+        entry["paciente"],
+        entry.get("enfermeiro") or settings.ENFERMEIRO,
+        entry.get("unidade") or unidade or settings.UNIDADE,
+    )
+    return "|".join((parte or "").strip().lower() for parte in partes)
+
+
+def run_key(entries, unidade=None):
+    """Identificador da execução: a mesma lista no mesmo dia retoma de onde parou."""
+    chaves = [patient_key(entry, unidade) for entry in entries]
+    digest = hashlib.sha256(json.dumps(chaves).encode("utf-8")).hexdigest()[:12]
+    return f"{date.today().isoformat()}-{digest}"
+
+
+class CheckpointStore:
+    """Guarda em SQLite o estado de cada etapa por paciente, para retomar execuções interrompidas."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.CHECKPOINT_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # WAL e timeout permitem que processos paralelos (shards) usem o mesmo arquivo
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+
+    def steps(self, run_id, paciente):
+        """Estado das etapas já registradas do paciente: {etapa: {status, tentativas, dados, erro}}."""
+        linhas = self.conn.execute(
+            "SELECT etapa, status, tentativas, dados, erro FROM checkpoints WHERE run_id = ? AND paciente = ?",
+            (run_id, paciente),
+        )
+        return {
+            etapa: {"status": status, "tentativas": tentativas, "dados": json.loads(dados) if dados else {}, "erro": erro}
+            for etapa, status, tentativas, dados, erro in linhas
+        }
+
+    def mark(self, run_id, paciente, etapa, status, dados=None, erro=None):
+        """Registra o resultado de uma tentativa da etapa (status 'concluida' ou 'falha')."""
+        self.conn.execute(
+            """INSERT INTO checkpoints (run_id, paciente, etapa, status, tentativas, dados, erro, atualizado)
+               VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+               ON CONFLICT (run_id, paciente, etapa) DO UPDATE SET
+                   status = excluded.status, tentativas = tentativas + 1,
+                   dados = COALESCE(excluded.dados, dados), erro = excluded.erro, atualizado = excluded.atualizado""",
+            (run_id, paciente, etapa, status, json.dumps(dados, ensure_ascii=False) if dados is not None else None,
+             erro, time.time()),
+        )
+
+    def completed(self, run_id, steps):
+        """Pacientes com todas as etapas concluídas na execução."""
+        linhas = self.conn.execute(
+            "SELECT paciente FROM checkpoints WHERE run_id = ? AND status = 'concluida' GROUP BY paciente "
+            "HAVING COUNT(DISTINCT etapa) = ?",
+            (run_id, len(steps)),
+        )
+        return {paciente for (paciente,) in linhas}
+
+    def clear(self, run_id=None, pacientes=None):
+        """Remove os checkpoints de uma execução (ou de todas), opcionalmente só dos pacientes dados."""
+        if run_id and pacientes is not None:
+            self.conn.executemany(
+                "DELETE FROM checkpoints WHERE run_id = ? AND paciente = ?", [(run_id, p) for p in pacientes]
+            )
+        elif run_id:
+            self.conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+        else:
+            self.conn.execute("DELETE FROM checkpoints")
+        logger.info("Checkpoints removidos (%s)", run_id or "todas as execuções")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,215 @@
+# src/core/context_pool.py
+import asyncio
+import time
+from src.config.settings import settings
+from src.core.adaptive_limiter import AdaptiveLimiter
+from src.core.resource_governor import ResourceGovernor
+from src.utils.logger import logger
+from src.utils.tracing import tracer
+
+
+class ContextPool:
+    """Pool de BrowserContexts isolados que compartilham uma única sessão autenticada.
+
+    Com o governador de recursos, cada contexto é trocado por um novo entre dois pacientes ao passar dos
+    limites de memória ou de fluxos; com launch (fábrica do navegador), um navegador que cai é relançado
+    e o paciente em andamento é repetido nos contextos recriados. Com o limitador adaptativo, os
+    workers só iniciam um paciente quando há vaga no limite de fluxos simultâneos vigente.
+    """
+
+    def __init__(self, browser, automation, size=None, launch=None, governor=None, limiter=None):
+        self.browser = browser
+        self.automation = automation
+        self.launch = launch
+        if governor is None and settings.GOVERNOR:
+            governor = ResourceGovernor()
+        self.governor = governor or None
+        self.size = max(1, size or settings.POOL_SIZE)
+        if limiter is None and settings.ADAPTIVE_CONCURRENCY:
+            limiter = AdaptiveLimiter(maximum=self.size)
+        self.limiter = limiter or None
+        self.storage_state = None
+        self.queue = asyncio.Queue()
+        self.contexts = [None] * self.size
+        self.workers = []
+        self.busy = 0
+        self.processed = 0
+        self.replaced = 0
+        self.recycled = 0
+        self.restarts = 0
+        self.busy_time = 0.0
+        self.started_at = None
+        self._login_lock = asyncio.Lock()
+        self._session_version = 0
+        self._browser_version = 0
+
+    async def authenticate(self, use_cache=True):
+        """Abre um contexto autenticado e salva o storage_state para os demais."""
+        context, page = await self.automation.open_session(self.browser, use_cache=use_cache)
+        if self.limiter:
+            self.limiter.attach(context)
+        self.storage_state = await context.storage_state()
+        self._session_version += 1
+        logger.info("Sessão autenticada salva para o pool (versão %s)", self._session_version)
+        return context, page
+
+    async def _new_context(self):
+        """Cria um contexto a partir da sessão salva."""
+        context = await self.automation.new_context(self.browser, storage_state=self.storage_state)
+        if self.limiter:
+            self.limiter.attach(context)
+        page = await context.new_page()
+        await page.goto(self.automation.url)
+        return context, page
+
+    async def start(self):
+        """Autentica uma vez e inicia os contextos e workers do pool."""
+        self.started_at = time.perf_counter()
+        # O contexto usado no login já está na unidade correta e vira o primeiro do pool
+        self.contexts[0] = await self.authenticate()
+        for slot in range(1, self.size):
+            self.contexts[slot] = await self._new_context()
+        self.workers = [asyncio.create_task(self._worker(slot)) for slot in range(self.size)]
+        logger.info("Pool de contextos iniciado com %s contextos", self.size)
+
+    async def _replace_context(self, slot, version):
+        """Substitui um contexto cuja sessão expirou, renovando o login se necessário."""
+        async with self._login_lock:
+            old_context, _ = self.contexts[slot]
+            # O contexto antigo só é fechado depois que o novo está pronto: se o login falhar, o slot
+            # continua com ele e o próximo paciente do worker tenta renovar a sessão de novo
+            if version == self._session_version:
+                # Nenhum outro worker renovou a sessão desde que este contexto foi criado
+                self.contexts[slot] = await self.authenticate(use_cache=False)
+            else:
+                self.contexts[slot] = await self._new_context()
+            try:
+                await old_context.close()
+            except Exception as e:
+                logger.warning("Falha ao fechar o contexto expirado %s: %s", slot, str(e))
+            self.replaced += 1
+            logger.info("Contexto %s substituído após expiração da sessão", slot)
+
+    async def _recover_browser(self, version):
+        """Relança o navegador se ele caiu durante o fluxo; True se os contextos foram recriados."""
+        if self.launch is None or (version == self._browser_version and self.browser.is_connected()):
+            return False
+        async with self._login_lock:
+            if version == self._browser_version:
+                if self.restarts >= settings.GOVERNOR_MAX_RESTARTS:
+                    logger.error("Navegador desconectado e limite de %s relançamentos atingido", settings.GOVERNOR_MAX_RESTARTS)
+                    return False
+                logger.warning("Navegador desconectado; relançando e recriando %s contextos", self.size)
+                with tracer.span("pool.relancamento"):
+                    self.browser = await self.launch()
+                    self._browser_version += 1
+                    self.restarts += 1
+                    for slot in range(self.size):
+                        self.contexts[slot] = await self._new_context()
+                if self.governor:
+                    self.governor.reset()
+                tracer.gauge("healthsync_browser_restarts_total", self.restarts)
+        return True
+
+    async def _govern(self, slot):
+        """Após cada paciente, amostra o contexto e o troca por um novo se passou dos limites."""
+        old_context, page = self.contexts[slot]
+        try:
+            motivo = await self.governor.check(slot, page)
+            if motivo is None:
+                return
+            # O slot só é usado por este worker: nenhum fluxo está em andamento no contexto aposentado
+            with tracer.span("pool.reciclagem", motivo=motivo):
+                self.contexts[slot] = await self._new_context()
+                await old_context.close()
+        except Exception as e:
+            logger.warning("Governador: falha ao verificar o contexto %s: %s", slot, str(e))
+            return
+        self.governor.retire(slot, motivo)
+        self.recycled += 1
+        logger.info("Contexto %s reciclado por %s: %s", slot, motivo, self.governor.last.get(slot))
+
+    async def _worker(self, slot):
+        with tracer.lane(f"contexto-{slot}"):
+            await self._serve(slot)
+
+    async def _serve(self, slot):
+        while True:
+            entry, future = await self.queue.get()
+            if self.limiter:
+                await self.limiter.acquire()
+            self.busy += 1
+            inicio = time.perf_counter()
+            resultado = None
+            try:
+                version = self._session_version
+                browser_version = self._browser_version
+                _, page = self.contexts[slot]
+                resultado = await self.automation.process_patient(page, entry)
+                if resultado["status"] == "falha" and await self._recover_browser(browser_version):
+                    logger.info("Repetindo %s no contexto %s após relançar o navegador", entry['paciente'], slot)
+                    _, page = self.contexts[slot]
+                    resultado = await self.automation.process_patient(page, entry)
+                elif resultado["status"] == "falha" and await self.automation.is_logged_out(page):
+                    logger.info("Sessão expirada no contexto %s; repetindo %s", slot, entry['paciente'])
+                    await self._replace_context(slot, version)
+                    _, page = self.contexts[slot]
+                    resultado = await self.automation.process_patient(page, entry)
+                future.set_result(resultado)
+            except Exception as e:
+                # Falha de infraestrutura (login, novo contexto): vira o resultado do paciente, como em
+                # process_patient, para não derrubar o lote inteiro
+                logger.error("Falha no contexto %s ao processar %s: %s", slot, entry['paciente'], str(e))
+                resultado = {"paciente": entry["paciente"], "enfermeiro": entry.get("enfermeiro"),
+                             "status": "falha", "erro": str(e), "duracao": round(time.perf_counter() - inicio, 3)}
+                future.set_result(resultado)
+            finally:
+                self.busy -= 1
+                self.busy_time += time.perf_counter() - inicio
+                self.processed += 1
+                self.queue.task_done()
+                if self.limiter:
+                    await self.limiter.release(resultado)
+                logger.info("Pool: fila=%s ocupados=%s/%s processados=%s", self.queue.qsize(), self.busy, self.size, self.processed)
+            # O resultado já foi entregue: a troca do contexto não atrasa o paciente
+            if self.governor:
+                await self._govern(slot)
+
+    def submit(self, entry):
+        """Enfileira um paciente e retorna um future com o seu resultado."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((entry, future))
+        return future
+
+    async def run(self, entries):
+        """Processa todas as entradas no pool, preservando a ordem dos resultados."""
+        return await asyncio.gather(*(self.submit(entry) for entry in entries))
+
+    def stats(self):
+        """Profundidade da fila e utilização do pool."""
+        decorrido = time.perf_counter() - self.started_at if self.started_at else 0.0
+        vazao = round(self.processed * 60 / decorrido, 2) if decorrido else 0.0
+        tracer.gauge("healthsync_pool_flows_per_minute", vazao)
+        return {
+            "tamanho": self.size,
+            "fila": self.queue.qsize(),
+            "ocupados": self.busy,
+            "processados": self.processed,
+            "substituidos": self.replaced,
+            "reciclados": self.recycled,
+            "relancamentos": self.restarts,
+            "fluxos_por_minuto": vazao,
+            "utilizacao": round(self.busy_time / (self.size * decorrido), 3) if decorrido else 0.0,
+            "governador": self.governor.stats() if self.governor else None,
+            "concorrencia": self.limiter.stats() if self.limiter else None,
+        }
+
+    async def close(self):
+        """Encerra os workers e fecha todos os contextos."""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        for item in self.contexts:
+            if item:
+                await item[0].close()
+        logger.info("Pool de contextos encerrado: %s", self.stats())
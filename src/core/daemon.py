@@ -0,0 +1,227 @@
+# src/core/daemon.py
+import asyncio
+import itertools
+import time
+from aiohttp import web
+from playwright.async_api import async_playwright
+from src.config.settings import settings
+from src.core.context_pool import ContextPool
+from src.core.slot_scanner import FullDayCache
+from src.utils.autocomplete_cache import autocomplete_cache
+from src.utils.logger import logger
+
+# Etapas executadas por tipo de job; "fluxo" é o fluxo completo do main.py
+JOB_STEPS = {
+    "agendar": ("agendamento",),
+    "atender": ("atendimento", "soap"),
+    "fluxo": None,
+}
+
+
+class Job:
+    """Pedido de execução para um paciente, com o estado exibido nas respostas do bot."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, tipo, paciente, enfermeiro=None, reply=None):
+        if tipo not in JOB_STEPS:
+            raise ValueError(f"Tipo de job desconhecido: {tipo} (use {', '.join(JOB_STEPS)})")
+        self.id = next(self._ids)
+        self.tipo = tipo
+        self.paciente = paciente
+        self.enfermeiro = enfermeiro
+        self.reply = reply
+        self.status = "na_fila"
+        self.resultado = None
+        self.criado = time.time()
+        self.duracao = None
+
+    def entry(self):
+        entry = {"paciente": self.paciente, "etapas": JOB_STEPS[self.tipo]}
+        if self.enfermeiro:
+            entry["enfermeiro"] = self.enfermeiro
+        return entry
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "paciente": self.paciente,
+            "enfermeiro": self.enfermeiro,
+            "status": self.status,
+            "erro": (self.resultado or {}).get("erro"),
+            "duracao": self.duracao,
+        }
+
+
+class AutomationDaemon:
+    """Mantém o navegador aberto e a sessão autenticada, executando os jobs recebidos pelo bot ou pela API local.
+
+    Cada job usa um contexto do pool já logado: o custo de abrir o Chromium e fazer login fica só na
+    inicialização (e numa eventual renovação de sessão), não em cada pedido.
+    """
+
+    def __init__(self, automation=None, concurrency=None, max_queue=None, browser=None):
+        if automation is None:
+            from src.core.automation import WebsiteAutomation
+            automation = WebsiteAutomation()
+        self.automation = automation
+        # O daemon fica no ar por dias: os dias lotados precisam expirar (cancelamentos, virada do mês)
+        automation.full_days = FullDayCache(ttl=settings.DAEMON_FULL_DAYS_TTL)
+        self.concurrency = max(1, concurrency or settings.DAEMON_CONCURRENCY)
+        self.max_queue = max_queue if max_queue is not None else settings.DAEMON_MAX_QUEUE
+        self.browser = browser
+        self.pool = None
+        self.jobs = {}
+        self.tasks = set()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._playwright = None
+        self._http = None
+
+    async def start(self):
+        """Abre o navegador e autentica os contextos do pool uma única vez."""
+        inicio = time.perf_counter()
+        launch = None
+        if self.browser is None:
+            self._playwright = await async_playwright().start()
+            # Também usada pelo pool para relançar o navegador se ele cair
+            launch = lambda: self.automation.browser_profile.launch(self._playwright)
+            self.browser = await launch()
+        self.pool = ContextPool(self.browser, self.automation, size=self.concurrency, launch=launch)
+        await self.pool.start()
+        logger.info("Daemon pronto em %.2fs: %s contextos autenticados", time.perf_counter() - inicio, self.concurrency)
+
+    # Jobs
+
+    def waiting(self):
+        return [job for job in self.jobs.values() if job.status == "na_fila"]
+
+    def running(self):
+        return [job for job in self.jobs.values() if job.status == "executando"]
+
+    def queued(self):
+        """Jobs que ainda não têm contexto livre (os demais começam assim que a tarefa rodar)."""
+        return max(0, len(self.waiting()) - (self.concurrency - len(self.running())))
+
+    async def submit(self, tipo, paciente, enfermeiro=None, reply=None):
+        """Enfileira um job e responde com a posição na fila; recusa quando a fila está cheia."""
+        job = Job(tipo, paciente, enfermeiro, reply)
+        if self.queued() >= self.max_queue:
+            job.status = "recusado"
+            await self._reply(job, f"Fila cheia ({self.max_queue} pedidos aguardando). Tente novamente em instantes.")
+            return job
+        self.jobs[job.id] = job
+        posicao = self.queued()
+        if posicao == 0:
+            aviso = f"Job #{job.id} ({tipo} {paciente}) recebido."
+        else:
+            aviso = f"Job #{job.id} ({tipo} {paciente}) na fila: posição {posicao}, {self.concurrency} em execução."
+        await self._reply(job, aviso)
+        tarefa = asyncio.create_task(self._run(job))
+        self.tasks.add(tarefa)
+        tarefa.add_done_callback(self.tasks.discard)
+        return job
+
+    async def _run(self, job):
+        async with self._slots:
+            job.status = "executando"
+            await self._reply(job, f"Job #{job.id}: executando {job.tipo} para {job.paciente}.")
+            inicio = time.perf_counter()
+            try:
+                job.resultado = await self.pool.submit(job.entry())
+            except Exception as e:
+                job.resultado = {"status": "falha", "erro": str(e)}
+            job.duracao = round(time.perf_counter() - inicio, 3)
+        if job.resultado.get("status") == "sucesso":
+            job.status = "concluido"
+            await self._reply(job, f"Job #{job.id}: {job.tipo} de {job.paciente} concluído em {job.duracao:.1f}s.")
+        else:
+            job.status = "falha"
+            await self._reply(job, f"Job #{job.id}: {job.tipo} de {job.paciente} falhou: {job.resultado.get('erro')}")
+        logger.info("Job %s (%s %s): %s em %ss", job.id, job.tipo, job.paciente, job.status, job.duracao)
+
+    async def _reply(self, job, texto):
+        if job.reply is None:
+            return
+        try:
+            await job.reply(texto)
+        except Exception as e:
+            logger.error("Erro ao responder sobre o job %s: %s", job.id, str(e))
+
+    def status(self):
+        """Resumo dos jobs e do pool."""
+        contagem = {}
+        for job in self.jobs.values():
+            contagem[job.status] = contagem.get(job.status, 0) + 1
+        return {
+            "jobs": contagem,
+            "pool": self.pool.stats() if self.pool else None,
+            "autocomplete": autocomplete_cache.stats(),
+        }
+
+    # API local (127.0.0.1) para enfileirar jobs sem o Telegram
+
+    async def _http_submit(self, request):
+        corpo = await request.json()
+        try:
+            job = await self.submit(corpo.get("tipo", "fluxo"), corpo["paciente"], corpo.get("enfermeiro"))
+        except (KeyError, ValueError) as e:
+            return web.json_response({"erro": f"Pedido inválido: {e}"}, status=400)
+        return web.json_response(job.as_dict(), status=429 if job.status == "recusado" else 202)
+
+    async def _http_job(self, request):
+        job = self.jobs.get(int(request.match_info["id"]))
+        if job is None:
+            return web.json_response({"erro": "Job não encontrado"}, status=404)
+        return web.json_response(job.as_dict())
+
+    async def _http_status(self, request):
+        return web.json_response(self.status())
+
+    async def serve_http(self, host="127.0.0.1", port=None):
+        app = web.Application()
+        app.router.add_post("/jobs", self._http_submit)
+        app.router.add_get("/jobs/{id}", self._http_job)
+        app.router.add_get("/status", self._http_status)
+        self._http = web.AppRunner(app)
+        await self._http.setup()
+        site = web.TCPSite(self._http, host, settings.DAEMON_PORT if port is None else port)
+        await site.start()
+        porta = site._server.sockets[0].getsockname()[1]
+        logger.info("API local de jobs em http://%s:%s", host, porta)
+        return porta
+
+    async def close(self):
+        """Aguarda os jobs em andamento e fecha pool, navegador e API local."""
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self._http:
+            await self._http.cleanup()
+        if self.pool:
+            await self.pool.close()
+            # O pool pode ter relançado o navegador
+            self.browser = self.pool.browser
+        autocomplete_cache.save()
+        if self._playwright:
+            await self.browser.close()
+            await self._playwright.stop()
+        logger.info("Daemon encerrado: %s", self.status())
+
+
+async def run_daemon():
+    """Sobe o daemon, a API local e o bot do Telegram até o processo ser interrompido."""
+    from src.core.notifier import close_notifier
+    from src.core.telegram_bot import start_bot
+
+    daemon = AutomationDaemon()
+    await daemon.start()
+    await daemon.serve_http()
+    try:
+        await start_bot(daemon)
+    finally:
+        await daemon.close()
+        await close_notifier()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_daemon())
@@ -0,0 +1,154 @@
+# src/core/har_replay.py
+import asyncio
+import base64
+import json
+import os
+from collections import deque
+from datetime import datetime
+from src.config.settings import settings
+from src.utils.logger import logger
+
+MODES = ("record", "replay")
+TIMINGS = ("original", "zero")
+
+# Cabeçalhos que descrevem o corpo original na rede; o corpo servido no replay já vem decodificado
+SKIP_HEADERS = {"content-length", "content-encoding", "transfer-encoding"}
+
+
+def _post_key(post_data):
+    """Corpo da requisição normalizado: JSON com as chaves ordenadas, para não depender da serialização."""
+    if not post_data:
+        return ""
+    try:
+        return json.dumps(json.loads(post_data), sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return post_data
+
+
+def request_key(method, url, post_data=None):
+    return method.upper(), url.split("#", 1)[0], _post_key(post_data)
+
+
+def load_har(path):
+    """Entradas do HAR agrupadas por requisição (método, URL e corpo), na ordem gravada, e o início da sessão."""
+    with open(path, encoding="utf-8") as arquivo:
+        log = json.load(arquivo)["log"]
+    entradas = {}
+    for entry in log.get("entries", []):
+        request = entry["request"]
+        chave = request_key(request["method"], request["url"], (request.get("postData") or {}).get("text"))
+        entradas.setdefault(chave, deque()).append(entry)
+    paginas = log.get("pages") or []
+    inicio = paginas[0]["startedDateTime"] if paginas else next(
+        (entry["startedDateTime"] for entry in log.get("entries", [])), None
+    )
+    return entradas, inicio
+
+
+def response_from(entry):
+    """Status, cabeçalhos e corpo (bytes) da resposta gravada."""
+    response = entry["response"]
+    content = response.get("content") or {}
+    texto = content.get("text") or ""
+    corpo = base64.b64decode(texto) if content.get("encoding") == "base64" else texto.encode("utf-8")
+    headers = {}
+    for header in response.get("headers", []):
+        nome = header["name"].lower()
+        if nome in SKIP_HEADERS:
+            continue
+        # Cabeçalhos repetidos viram um só; os Set-Cookie ficam um por linha, como o fulfill espera
+        separador = "\n" if nome == "set-cookie" else ", "
+        headers[nome] = f"{headers[nome]}{separador}{header['value']}" if nome in headers else header["value"]
+    return response["status"], headers, corpo
+
+
+class HarSession:
+    """Grava o tráfego de rede de um contexto em HAR ou serve um HAR gravado, sem acesso ao e-SUS.
+
+    No replay, cada requisição recebe a próxima resposta gravada para o mesmo método, URL e corpo
+    (a agenda antes e depois de salvar um agendamento, por exemplo, são respostas diferentes); a
+    última se repete se a página pedir mais vezes. Requisições não gravadas são abortadas, como se a
+    rede estivesse desligada. Com HAR_TIMING=original cada resposta espera o tempo medido na gravação;
+    com zero, é servida na hora. O relógio da página volta ao início da gravação, para que as datas
+    pedidas pela agenda sejam as mesmas.
+    """
+
+    def __init__(self, mode=None, path=None, timing=None):
+        self.mode = (mode or settings.HAR_MODE or "").lower()
+        if self.mode not in MODES:
+            raise ValueError(f"Modo de HAR inválido: {self.mode} (use {', '.join(MODES)})")
+        self.path = path or settings.HAR_PATH
+        self.timing = (timing or settings.HAR_TIMING).lower()
+        if self.timing not in TIMINGS:
+            raise ValueError(f"HAR_TIMING inválido: {self.timing} (use {', '.join(TIMINGS)})")
+        self.replay = self.mode == "replay"
+        self.entries = None
+        self.started = None
+        self.served = 0
+        self.missed = []
+        self.delay = 0.0
+        if self.replay:
+            if not os.path.exists(self.path):
+                raise ValueError(f"Arquivo HAR não encontrado para o replay: {self.path}")
+            self.entries, self.started = load_har(self.path)
+            logger.info("Replay do HAR %s: %s requisições gravadas (tempos %s)", self.path, len(self.entries), self.timing)
+
+    def context_options(self):
+        """Opções de new_context para a gravação (o HAR é escrito quando o contexto é fechado)."""
+        if self.replay:
+            return {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        return {"record_har_path": self.path, "record_har_content": "embed", "record_har_mode": "full"}
+
+    async def attach(self, context):
+        """No replay, passa a servir todas as requisições do contexto pelo HAR."""
+        if not self.replay:
+            logger.info("Gravando o tráfego do contexto em %s", self.path)
+            return
+        if self.started:
+            await context.clock.install(time=datetime.fromisoformat(self.started.replace("Z", "+00:00")))
+        # Cada contexto percorre as respostas gravadas desde o início
+        entradas = {chave: deque(fila) for chave, fila in self.entries.items()}
+
+        async def route(route):
+            await self._serve(route, entradas)
+
+        await context.route("**/*", route)
+
+    async def _serve(self, route, entradas):
+        request = route.request
+        fila = entradas.get(request_key(request.method, request.url, request.post_data))
+        if not fila:
+            self.missed.append(f"{request.method} {request.url}")
+            logger.debug("Requisição fora do HAR abortada: %s %s", request.method, request.url)
+            await route.abort("internetdisconnected")
+            return
+        entry = fila.popleft() if len(fila) > 1 else fila[0]
+        if self.timing == "original" and entry.get("time"):
+            espera = entry["time"] / 1000
+            self.delay += espera
+            await asyncio.sleep(espera)
+        status, headers, corpo = response_from(entry)
+        self.served += 1
+        await route.fulfill(status=status, headers=headers, body=corpo)
+
+    def report(self):
+        return {
+            "modo": self.mode,
+            "arquivo": self.path,
+            "servidas": self.served,
+            "nao_encontradas": len(self.missed),
+            "espera_segundos": round(self.delay, 3),
+        }
+
+    def log_report(self):
+        if not self.replay:
+            logger.info("Tráfego gravado em %s", self.path)
+            return
+        relatorio = self.report()
+        logger.info(
+            "Replay do HAR: %s respostas servidas, %s requisições fora do HAR, %.2fs de espera (%s)",
+            relatorio["servidas"], relatorio["nao_encontradas"], relatorio["espera_segundos"], self.timing,
+        )
+        if self.missed:
+            logger.warning("Requisições fora do HAR (a sessão gravada não cobre este fluxo?): %s", self.missed[:10])
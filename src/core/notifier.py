@@ -0,0 +1,141 @@
+# src/core/notifier.py
+import asyncio
+import time
+from src.config.settings import settings
+from src.utils.logger import logger
+from src.utils.tracing import tracer
+
+# Marca na fila que força o envio imediato do resumo pendente
+_FLUSH = object()
+
+
+class TelegramNotifier:
+    """Serviço de notificação do processo: uma sessão HTTP, fila interna e mensagens resumo."""
+
+    def __init__(self, token=None, chat_id=None, api_url=None, batch_size=None, interval=None, min_interval=None):
+        # O aiogram só é importado quando há o que notificar
+        from aiogram import Bot
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+
+        api_url = api_url or settings.TELEGRAM_API_URL
+        session = AiohttpSession(api=TelegramAPIServer.from_base(api_url)) if api_url else None
+        self.bot = Bot(token=token or settings.TELEGRAM_BOT_TOKEN, session=session)
+        self.chat_id = chat_id or settings.TELEGRAM_GROUP_CHAT_ID
+        self.batch_size = batch_size or settings.NOTIFY_BATCH_SIZE
+        self.interval = interval if interval is not None else settings.NOTIFY_INTERVAL
+        self.min_interval = min_interval if min_interval is not None else settings.NOTIFY_MIN_INTERVAL
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self._last_send = 0.0
+
+    def notify(self, text):
+        """Enfileira uma notificação sem bloquear o fluxo da automação."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        self.queue.put_nowait(text)
+
+    async def _collect(self):
+        """Agrupa notificações até atingir batch_size, passar interval ou receber um flush."""
+        itens = []
+        primeiro = await self.queue.get()
+        if primeiro is _FLUSH:
+            return itens, 1
+        itens.append(primeiro)
+        retirados = 1
+        limite = time.monotonic() + self.interval
+        while len(itens) < self.batch_size:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), restante)
+            except asyncio.TimeoutError:
+                break
+            retirados += 1
+            if item is _FLUSH:
+                break
+            itens.append(item)
+        return itens, retirados
+
+    async def _run(self):
+        while True:
+            itens, retirados = await self._collect()
+            try:
+                if itens:
+                    await self._send(self._digest(itens))
+            finally:
+                for _ in range(retirados):
+                    self.queue.task_done()
+
+    @staticmethod
+    def _digest(itens):
+        if len(itens) == 1:
+            return itens[0]
+        linhas = "\n".join(f"- {item}" for item in itens)
+        return f"Resumo: {len(itens)} notificações\n{linhas}"
+
+    async def _send(self, text, attempts=3):
+        """Envia respeitando o intervalo mínimo por chat e o retry_after do Telegram."""
+        from aiogram.exceptions import TelegramRetryAfter
+
+        for tentativa in range(1, attempts + 1):
+            espera = self._last_send + self.min_interval - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            try:
+                with tracer.span("notificacao.envio", tentativa=tentativa):
+                    await self.bot.send_message(chat_id=self.chat_id, text=text)
+                self._last_send = time.monotonic()
+                self.sent += 1
+                logger.info("Mensagem enviada ao grupo do Telegram %s", self.chat_id)
+                return True
+            except TelegramRetryAfter as e:
+                self.retries += 1
+                logger.warning("Limite do Telegram atingido, aguardando %ss", e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                self.retries += 1
+                logger.error("Erro ao enviar mensagem ao grupo do Telegram %s (tentativa %s): %s", self.chat_id, tentativa, str(e))
+                await asyncio.sleep(min(2 ** tentativa, 30))
+        self.failed += 1
+        return False
+
+    async def flush(self):
+        """Envia imediatamente o que estiver pendente e aguarda a fila esvaziar."""
+        if self.task is None or self.task.done():
+            return
+        self.queue.put_nowait(_FLUSH)
+        await self.queue.join()
+
+    async def close(self):
+        """Esvazia a fila e encerra a sessão HTTP do bot."""
+        await self.flush()
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.bot.session.close()
+        logger.info("Notificador encerrado: %s enviadas, %s falhas, %s novas tentativas", self.sent, self.failed, self.retries)
+
+
+_notifier = None
+
+
+def get_notifier():
+    """Retorna o notificador compartilhado pelo processo."""
+    global _notifier
+    if _notifier is None:
+        _notifier = TelegramNotifier()
+    return _notifier
+
+
+async def close_notifier():
+    """Encerra o notificador compartilhado, se tiver sido criado."""
+    global _notifier
+    if _notifier is not None:
+        await _notifier.close()
+        _notifier = None
@@ -0,0 +1,210 @@
+# src/core/pipeline.py
+import asyncio
+from src.config.settings import settings
+from src.core.agendamento import ScheduleAppointment
+from src.core.atendimento import AttendanceList
+from src.core.checkpoints import patient_key
+from src.utils.diagnostics import diagnostics
+from src.utils.logger import logger
+
+# Etapas do fluxo de cada paciente, na ordem de execução
+STEPS = ("agendamento", "remocao", "atendimento", "soap", "notificacao")
+
+# No lote com remoção em lote, a remoção sai do fluxo de cada paciente e roda uma vez ao final
+BATCH_STEPS = tuple(step for step in STEPS if step != "remocao")
+
+# No replay de um HAR a execução fica offline: sem a notificação ao Telegram
+REPLAY_STEPS = tuple(step for step in STEPS if step != "notificacao")
+
+# Etapas que gravam registros no e-SUS: uma falha depois do Salvar aceito (ex.: timeout na confirmação)
+# não pode ser repetida às cegas, senão cria um segundo agendamento ou uma segunda entrada na lista
+NON_IDEMPOTENT = ("agendamento", "atendimento")
+
+
+def parse_backoff(value):
+    """Lê 'etapa=segundos,...' (ou só 'segundos' para todas) no dicionário de espera base por etapa."""
+    backoff = {}
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        etapa, _, segundos = item.rpartition("=")
+        backoff[etapa.strip() or "padrao"] = float(segundos)
+    return backoff
+
+
+def appointment_from(entry, dados):
+    """Agendamento registrado na etapa de agendamento (checkpoints antigos só têm a visão e o horário)."""
+    dados = dados or {}
+    if dados.get("agendamento"):
+        return dados["agendamento"]
+    horario = dados.get("horario") or {}
+    return {
+        "id": None,
+        "paciente": entry["paciente"],
+        "enfermeiro": entry.get("enfermeiro"),
+        "dia": horario.get("day_key"),
+        "horario": horario.get("time"),
+        "views_advanced": dados.get("views_advanced", 0),
+    }
+
+
+class PatientPipeline:
+    """Executa as etapas de um paciente com checkpoint por etapa, novas tentativas e backoff exponencial."""
+
+    def __init__(self, automation, store=None, steps=None, retries=None, backoff=None, verify=None):
+        self.automation = automation
+        self.store = store
+        self.retries = settings.STEP_RETRIES if retries is None else retries
+        self.backoff = backoff if backoff is not None else parse_backoff(settings.STEP_BACKOFF)
+        self.steps = steps or {
+            "agendamento": self._agendamento,
+            "remocao": self._remocao,
+            "atendimento": self._atendimento,
+            "soap": self._soap,
+            "notificacao": self._notificacao,
+        }
+        # Conferência das etapas de NON_IDEMPOTENT antes de repeti-las: os dados da etapa se a tentativa
+        # que falhou gravou o registro, None se não gravou; sem conferência, a etapa não é repetida
+        if verify is None:
+            verify = {} if steps else {"agendamento": self._agendamento_salvo, "atendimento": self._atendimento_salvo}
+        self.verify = verify
+        # Agendamentos criados (ou retomados de um checkpoint), por paciente, para a remoção em lote
+        self.created = {}
+        # Última tentativa de cada etapa em andamento (paciente, etapa), usada na conferência
+        self.attempts = {}
+
+    def delay(self, step, tentativa):
+        """Espera antes da próxima tentativa: base da etapa dobrando a cada falha, com teto."""
+        base = self.backoff.get(step, self.backoff.get("padrao", 2.0))
+        return min(base * 2 ** (tentativa - 1), settings.STEP_BACKOFF_MAX)
+
+    async def run(self, page, entry, run_id=None):
+        """Executa as etapas pendentes do paciente (todas ou as de entry["etapas"]); retorna as retomadas."""
+        key = patient_key(entry, self.automation.unidade)
+        estado = self.store.steps(run_id, key) if self.store and run_id else {}
+        concluidas = {step: info["dados"] for step, info in estado.items() if info["status"] == "concluida"}
+        retomadas = [step for step in STEPS if step in concluidas]
+        if retomadas:
+            logger.info("Paciente %s: retomando após as etapas concluídas %s", entry["paciente"], retomadas)
+
+        # Jobs do daemon podem pedir só parte do fluxo (ex.: apenas o agendamento)
+        etapas = entry.get("etapas") or STEPS
+        for step in STEPS:
+            if step not in concluidas and step in etapas:
+                concluidas[step] = await self._run_step(page, entry, step, concluidas, run_id, key)
+            if step == "agendamento" and step in concluidas and "remocao" not in concluidas:
+                self.created[key] = appointment_from(entry, concluidas[step])
+        if "remocao" in concluidas:
+            # Já removido (nesta execução ou numa anterior): a remoção em lote não deve procurá-lo de novo
+            self.created.pop(key, None)
+        return retomadas
+
+    async def _run_step(self, page, entry, step, concluidas, run_id, key):
+        tentativas = self.retries + 1
+        for tentativa in range(1, tentativas + 1):
+            try:
+                dados = await self.steps[step](page, entry, concluidas) or {}
+            except Exception as e:
+                if self.store and run_id:
+                    self.store.mark(run_id, key, step, "falha", erro=str(e))
+                # Sessão expirada não se resolve aqui: o pool troca o contexto e repete o paciente
+                if await self.automation.is_logged_out(page):
+                    raise
+                repetir = tentativa < tentativas and (step not in NON_IDEMPOTENT or step in self.verify)
+                if not repetir:
+                    # Um único pacote (HTML, resumo, screenshot) com o estado da tela no momento da falha
+                    await diagnostics.capture(page, step, erro=e, paciente=entry["paciente"], tentativas=tentativa)
+                    self.attempts.pop((key, step), None)
+                    raise
+                try:
+                    await page.keyboard.press("Escape")
+                except Exception:
+                    pass
+                if step in NON_IDEMPOTENT:
+                    salvo = await self._verify(page, entry, step, key, e)
+                    if salvo is not None:
+                        dados = salvo
+                        break
+                espera = self.delay(step, tentativa)
+                logger.warning(
+                    "Etapa %s falhou para %s (tentativa %s/%s): %s; nova tentativa em %.1fs",
+                    step, entry["paciente"], tentativa, tentativas, str(e), espera,
+                )
+                await asyncio.sleep(espera)
+                continue
+            break
+        self.attempts.pop((key, step), None)
+        if self.store and run_id:
+            self.store.mark(run_id, key, step, "concluida", dados)
+        logger.info("Etapa %s concluída para %s", step, entry["paciente"])
+        return dados
+
+    async def _verify(self, page, entry, step, key, erro):
+        """Confere se a tentativa que falhou gravou o registro: os dados da etapa, ou None para repeti-la.
+
+        Se a conferência também falhar não há como saber o que foi gravado, e o erro original é propagado
+        sem nova tentativa.
+        """
+        try:
+            salvo = await self.verify[step](page, entry, self.attempts.get((key, step)))
+        except Exception as falha:
+            logger.error("Etapa %s de %s não repetida: não foi possível conferir o que a tentativa gravou (%s)",
+                         step, entry["paciente"], str(falha))
+            await diagnostics.capture(page, step, erro=erro, paciente=entry["paciente"])
+            self.attempts.pop((key, step), None)
+            raise erro
+        if salvo is not None:
+            logger.warning("Etapa %s de %s falhou (%s), mas o registro foi gravado; não será repetida",
+                           step, entry["paciente"], str(erro))
+        return salvo
+
+    # Etapas
+
+    def _scheduler(self, entry):
+        return ScheduleAppointment(
+            paciente=entry["paciente"], enfermeiro=entry.get("enfermeiro"),
+            full_days=self.automation.full_days, unidade=self.automation.unidade,
+        )
+
+    def _attendance(self, entry):
+        return AttendanceList(paciente=entry["paciente"], enfermeiro=entry.get("enfermeiro"), unidade=self.automation.unidade)
+
+    def _attempt(self, entry, step, etapa):
+        self.attempts[(patient_key(entry, self.automation.unidade), step)] = etapa
+        return etapa
+
+    async def _agendamento(self, page, entry, concluidas):
+        scheduler = self._attempt(entry, "agendamento", self._scheduler(entry))
+        await scheduler.schedule_appointment(page)
+        return {
+            "views_advanced": scheduler.views_advanced,
+            "horario": scheduler.selected_slot,
+            "agendamento": scheduler.appointment,
+        }
+
+    async def _agendamento_salvo(self, page, entry, scheduler):
+        agendamento = await scheduler.confirmar_agendamento(page) if scheduler else None
+        if agendamento is None:
+            return None
+        return {"views_advanced": scheduler.views_advanced, "horario": scheduler.selected_slot, "agendamento": agendamento}
+
+    async def _remocao(self, page, entry, concluidas):
+        agendamento = appointment_from(entry, concluidas["agendamento"])
+        await self._scheduler(entry).remover_agenda(page, agendamento)
+        return {"agendamento": agendamento.get("id")}
+
+    async def _atendimento(self, page, entry, concluidas):
+        await self._attempt(entry, "atendimento", self._attendance(entry)).lista_atendimento(page)
+
+    async def _atendimento_salvo(self, page, entry, attendance):
+        if attendance and await attendance.confirmar_na_lista(page):
+            return {}
+        return None
+
+    async def _soap(self, page, entry, concluidas):
+        attendance = self._attendance(entry)
+        await attendance.abrir_atendimento(page)
+        await attendance.preencher_soap(page, entry.get("soap"))
+
+    async def _notificacao(self, page, entry, concluidas):
+        await self._attendance(entry).notify_telegram_bot()
@@ -0,0 +1,99 @@
+# src/core/resource_governor.py
+from playwright.async_api import Error as PlaywrightError
+from src.config.settings import settings
+from src.utils.logger import logger
+from src.utils.tracing import tracer
+
+MB = 1024 * 1024
+
+# Métricas do domínio Performance do CDP usadas pelo governador
+CDP_METRICS = {"JSHeapUsedSize": "heap_bytes", "Nodes": "nodes", "JSEventListeners": "listeners"}
+
+
+class ResourceGovernor:
+    """Acompanha a memória (métricas CDP) e os fluxos atendidos por contexto e decide quando aposentá-lo.
+
+    O SPA do e-SUS acumula caches e listeners no renderer a cada paciente; um contexto que passa de
+    GOVERNOR_MAX_FLOWS fluxos, GOVERNOR_MAX_HEAP_MB de heap JS ou GOVERNOR_MAX_NODES nós de DOM é
+    trocado por um novo entre dois pacientes, sem interromper o fluxo em andamento. Limites em 0 ficam
+    desligados. As amostras viram métricas (heap, nós, fluxos e contextos aposentados por motivo) para
+    comparar o pico de memória com a vazão obtida em cada configuração.
+    """
+
+    def __init__(self, max_flows=None, max_heap_mb=None, max_nodes=None):
+        self.max_flows = settings.GOVERNOR_MAX_FLOWS if max_flows is None else max_flows
+        self.max_heap_mb = settings.GOVERNOR_MAX_HEAP_MB if max_heap_mb is None else max_heap_mb
+        self.max_nodes = settings.GOVERNOR_MAX_NODES if max_nodes is None else max_nodes
+        self.flows = {}
+        self.last = {}
+        self.peak_heap_mb = 0.0
+        self.retired = {}
+        self.flows_at_retirement = []
+        self._sessions = {}
+        self._cdp_available = True
+
+    async def sample(self, slot, page):
+        """Heap JS, nós de DOM e listeners do contexto pelo CDP; None fora do Chromium."""
+        if not self._cdp_available:
+            return None
+        try:
+            sessao = self._sessions.get(slot)
+            if sessao is None or sessao[0] is not page:
+                cdp = await page.context.new_cdp_session(page)
+                await cdp.send("Performance.enable")
+                sessao = self._sessions[slot] = (page, cdp)
+            resposta = await sessao[1].send("Performance.getMetrics")
+        except PlaywrightError as e:
+            if "chromium" in str(e).lower():
+                # Firefox/WebKit: sem CDP, o governador passa a contar só os fluxos
+                self._cdp_available = False
+                logger.info("Métricas CDP indisponíveis neste navegador; reciclagem apenas por número de fluxos")
+            self._sessions.pop(slot, None)
+            return None
+        valores = {item["name"]: item["value"] for item in resposta.get("metrics", [])}
+        metricas = {chave: valores.get(nome, 0) for nome, chave in CDP_METRICS.items()}
+        metricas["heap_mb"] = round(metricas.pop("heap_bytes") / MB, 1)
+        return metricas
+
+    async def check(self, slot, page):
+        """Conta o fluxo concluído no contexto e retorna o motivo para aposentá-lo (ou None)."""
+        self.flows[slot] = self.flows.get(slot, 0) + 1
+        metricas = await self.sample(slot, page) or {}
+        self.last[slot] = {"fluxos": self.flows[slot], **metricas}
+        self._export(slot)
+        if metricas:
+            self.peak_heap_mb = max(self.peak_heap_mb, metricas["heap_mb"])
+        if self.max_heap_mb and metricas.get("heap_mb", 0) >= self.max_heap_mb:
+            return "heap"
+        if self.max_nodes and metricas.get("nodes", 0) >= self.max_nodes:
+            return "nos"
+        if self.max_flows and self.flows[slot] >= self.max_flows:
+            return "fluxos"
+        return None
+
+    def retire(self, slot, motivo):
+        """Registra a aposentadoria do contexto do slot; o substituto começa do zero."""
+        self.retired[motivo] = self.retired.get(motivo, 0) + 1
+        self.flows_at_retirement.append(self.flows.get(slot, 0))
+        self.flows[slot] = 0
+        self._sessions.pop(slot, None)
+        tracer.gauge("healthsync_context_retired_total", self.retired[motivo], motivo=motivo)
+
+    def reset(self):
+        """Todos os contextos foram recriados (ex.: navegador relançado)."""
+        self.flows.clear()
+        self.last.clear()
+        self._sessions.clear()
+
+    def _export(self, slot):
+        for nome, valor in self.last[slot].items():
+            tracer.gauge(f"healthsync_context_{nome}", valor, contexto=slot)
+
+    def stats(self):
+        aposentados = self.flows_at_retirement
+        return {
+            "contextos": self.last,
+            "heap_mb_pico": self.peak_heap_mb,
+            "aposentados": self.retired,
+            "fluxos_por_contexto": round(sum(aposentados) / len(aposentados), 1) if aposentados else None,
+        }
@@ -0,0 +1,78 @@
+# src/core/session_cache.py
+import base64
+import hashlib
+import json
+import os
+import re
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from src.config.settings import settings
+from src.utils.logger import logger
+
+
+def cache_path_for(unidade=None):
+    """Arquivo de cache da unidade; a unidade do .env usa SESSION_CACHE_PATH sem sufixo."""
+    if not unidade or unidade == settings.UNIDADE:
+        return settings.SESSION_CACHE_PATH
+    base, extensao = os.path.splitext(settings.SESSION_CACHE_PATH)
+    slug = re.sub(r"[^a-z0-9]+", "-", unidade.lower()).strip("-")
+    return f"{base}.{slug}{extensao}"
+
+
+class SessionCache:
+    """Guarda o storage_state autenticado e a unidade/CBO escolhidos, criptografados e com TTL."""
+
+    def __init__(self, path=None, ttl=None, key=None):
+        self.path = path or settings.SESSION_CACHE_PATH
+        self.ttl = ttl or settings.SESSION_CACHE_TTL
+        self.fernet = Fernet(key or settings.SESSION_CACHE_KEY or self._derive_key())
+
+    @staticmethod
+    def _derive_key():
+        """Deriva a chave das credenciais quando SESSION_CACHE_KEY não está definida."""
+        material = f"{settings.USERNAME}:{settings.PASSWORD}".encode("utf-8")
+        salt = f"healthsync:{settings.WEBSITE_URL}".encode("utf-8")
+        digest = hashlib.pbkdf2_hmac("sha256", material, salt, 200_000)
+        return base64.urlsafe_b64encode(digest)
+
+    def load(self, url, username, unidade):
+        """Retorna a sessão salva se ainda for válida para este site, usuário e unidade."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as arquivo:
+                payload = json.loads(self.fernet.decrypt(arquivo.read(), ttl=self.ttl))
+        except InvalidToken:
+            logger.info("Sessão em cache expirada ou ilegível, descartando")
+            self.clear()
+            return None
+        if (payload.get("url"), payload.get("username"), payload.get("unidade")) != (url, username, unidade):
+            logger.info("Sessão em cache pertence a outro site, usuário ou unidade, ignorando")
+            return None
+        return payload
+
+    def save(self, storage_state, url, username, unidade, cbo=None, login_seconds=None):
+        """Criptografa e grava a sessão autenticada em disco."""
+        payload = {
+            "created": time.time(),
+            "url": url,
+            "username": username,
+            "unidade": unidade,
+            "cbo": cbo,
+            "login_seconds": login_seconds,
+            "storage_state": storage_state,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        token = self.fernet.encrypt(json.dumps(payload).encode("utf-8"))
+        # Grava em arquivo temporário e troca de uma vez: processos paralelos nunca leem um cache pela metade
+        temporario = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(token)
+        os.chmod(temporario, 0o600)
+        os.replace(temporario, self.path)
+        logger.info("Sessão autenticada salva em cache (%s, TTL %ss)", self.path, self.ttl)
+
+    def clear(self):
+        """Remove a sessão salva."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,149 @@
+# src/core/sharding.py
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.config.settings import settings
+from src.utils.logger import attach_to_queue, logger
+from src.utils.readiness import wait_stats
+from src.utils.tracing import tracer
+
+# Fila de logs e diretório de traces dos processos filhos (definidos pelo initializer do executor)
+_log_queue = None
+_trace_dir = None
+
+# Configurações que a linha de comando altera no coordenador (ex.: --replay-har); os filhos são criados
+# por spawn e releriam só o .env, então recebem esses valores pelo initializer
+INHERITED = ("HAR_MODE", "HAR_PATH", "HAR_TIMING")
+
+
+def shard_worklist(entries):
+    """Agrupa a lista de trabalho por (unidade, enfermeiro), guardando a posição original de cada entrada."""
+    shards = {}
+    for indice, entry in enumerate(entries):
+        unidade = entry.get("unidade") or settings.UNIDADE
+        enfermeiro = entry.get("enfermeiro") or settings.ENFERMEIRO
+        chave = (unidade.lower(), enfermeiro.lower())
+        if chave not in shards:
+            shards[chave] = {"id": len(shards), "unidade": unidade, "enfermeiro": enfermeiro, "entradas": []}
+        shards[chave]["entradas"].append((indice, {**entry, "unidade": unidade, "enfermeiro": enfermeiro}))
+    return list(shards.values())
+
+
+def _init_worker(log_queue, overrides=None):
+    global _log_queue, _trace_dir
+    _log_queue = log_queue
+    for campo, valor in (overrides or {}).items():
+        setattr(settings, campo, valor)
+    _trace_dir = settings.TRACE_DIR
+
+
+def run_batch_for(unidade, entradas, pool_size=None, run_id=None, fresh=False):
+    """Processa as entradas com navegador e sessão próprios para a unidade."""
+    from src.core.automation import WebsiteAutomation
+
+    automation = WebsiteAutomation(unidade=unidade)
+    return asyncio.run(automation.run_batch(entradas, pool_size=pool_size, run_id=run_id, fresh=fresh))
+
+
+def run_shard(shard, pool_size=None, runner=run_batch_for, run_id=None, fresh=False):
+    """Executa um shard no processo filho, com os logs encaminhados ao coordenador."""
+    if _log_queue is not None:
+        attach_to_queue(_log_queue, f"shard-{shard['id']}")
+    # Cada shard grava o próprio trace para não sobrescrever o dos outros processos; um processo
+    # reaproveitado pelo executor começa o shard seguinte com trace e estatísticas zerados
+    settings.TRACE_DIR = os.path.join(_trace_dir or settings.TRACE_DIR, f"shard-{shard['id']}")
+    tracer.reset()
+    wait_stats.reset()
+    logger.info(
+        "Shard %s (pid %s): %s pacientes de %s / %s",
+        shard["id"], os.getpid(), len(shard["entradas"]), shard["unidade"], shard["enfermeiro"],
+    )
+    entradas = [entry for _, entry in shard["entradas"]]
+    resultados = runner(shard["unidade"], entradas, pool_size, run_id, fresh)
+    return [{**resultado, "indice": indice} for (indice, _), resultado in zip(shard["entradas"], resultados)]
+
+
+class _Forward(logging.Handler):
+    """Reenvia ao logger do coordenador os registros recebidos dos processos filhos."""
+
+    def emit(self, record):
+        logger.handle(record)
+
+
+def merge_results(shards, resultados_por_shard, duracoes):
+    """Junta os resultados dos shards na ordem original da lista e monta o relatório consolidado."""
+    resultados = []
+    por_shard = []
+    for shard in shards:
+        itens = resultados_por_shard[shard["id"]]
+        for item in itens:
+            item["shard"] = shard["id"]
+        resultados.extend(itens)
+        por_shard.append({
+            "shard": shard["id"],
+            "unidade": shard["unidade"],
+            "enfermeiro": shard["enfermeiro"],
+            "pacientes": len(itens),
+            "sucessos": sum(1 for r in itens if r["status"] == "sucesso"),
+            "duracao": duracoes.get(shard["id"]),
+        })
+    resultados.sort(key=lambda r: r["indice"])
+    for resultado in resultados:
+        del resultado["indice"]
+    relatorio = {
+        "pacientes": len(resultados),
+        "sucessos": sum(1 for r in resultados if r["status"] == "sucesso"),
+        "falhas": sum(1 for r in resultados if r["status"] != "sucesso"),
+        "shards": por_shard,
+    }
+    return resultados, relatorio
+
+
+async def run_sharded(entries, workers=None, pool_size=None, runner=run_batch_for, run_id=None, fresh=False):
+    """Distribui a lista por (unidade, enfermeiro) entre processos e consolida resultados e logs."""
+    shards = shard_worklist(entries)
+    workers = max(1, min(workers or settings.SHARD_WORKERS, len(shards)))
+    logger.info("Lista dividida em %s shards, executados por %s processos", len(shards), workers)
+
+    contexto = multiprocessing.get_context("spawn")
+    log_queue = contexto.Queue()
+    listener = logging.handlers.QueueListener(log_queue, _Forward())
+    listener.start()
+    resultados_por_shard = {}
+    duracoes = {}
+    inicio = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=contexto, initializer=_init_worker,
+            initargs=(log_queue, {campo: getattr(settings, campo) for campo in INHERITED}),
+        ) as executor:
+            loop = asyncio.get_running_loop()
+
+            async def executar(shard):
+                inicio_shard = time.perf_counter()
+                try:
+                    resultados_por_shard[shard["id"]] = await loop.run_in_executor(
+                        executor, run_shard, shard, pool_size, runner, run_id, fresh
+                    )
+                except Exception as e:
+                    logger.error("Shard %s (%s / %s) falhou: %s", shard["id"], shard["unidade"], shard["enfermeiro"], str(e))
+                    resultados_por_shard[shard["id"]] = [
+                        {"paciente": entry["paciente"], "enfermeiro": entry["enfermeiro"], "status": "falha",
+                         "erro": f"Shard interrompido: {e}", "duracao": None, "indice": indice}
+                        for indice, entry in shard["entradas"]
+                    ]
+                duracoes[shard["id"]] = round(time.perf_counter() - inicio_shard, 3)
+
+            await asyncio.gather(*(executar(shard) for shard in shards))
+    finally:
+        listener.stop()
+
+    resultados, relatorio = merge_results(shards, resultados_por_shard, duracoes)
+    relatorio["processos"] = workers
+    relatorio["duracao"] = round(time.perf_counter() - inicio, 3)
+    logger.info("Lote em shards concluído: %s", relatorio)
+    return resultados, relatorio
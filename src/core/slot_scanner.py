@@ -0,0 +1,208 @@
+# src/core/slot_scanner.py
+import re
+import time
+from src.config.settings import settings
+from src.utils.logger import logger
+from src.utils.readiness import CALENDAR_VIEW_JS
+from src.utils.tracing import tracer
+
+POLICIES = ("earliest", "closest", "after")
+
+# Lê toda a grade do react-big-calendar em uma única ida ao navegador.
+# O índice de cada grupo corresponde a page.locator(".rbc-timeslot-group").nth(index).
+SNAPSHOT_JS = """
+() => {
+    const text = el => (el ? el.innerText.trim() : null);
+    const gutterLabels = Array.from(document.querySelectorAll('.rbc-time-gutter .rbc-timeslot-group'))
+        .map(g => text(g.querySelector('.rbc-label')));
+    const headers = Array.from(document.querySelectorAll('.rbc-time-header-content .rbc-header')).map(text);
+    const days = Array.from(document.querySelectorAll('.rbc-time-content .rbc-day-slot'));
+    const toolbar = document.querySelector('.rbc-toolbar-label');
+    const view = {label: text(toolbar), headers};
+    const slots = Array.from(document.querySelectorAll('.rbc-timeslot-group')).map((group, index) => {
+        const column = group.parentElement;
+        const day = days.indexOf(column);
+        const row = Array.from(column.children)
+            .filter(el => el.classList.contains('rbc-timeslot-group'))
+            .indexOf(group);
+        const slot = group.querySelector('.rbc-time-slot');
+        const label = text(group.querySelector('.rbc-label'));
+        return {
+            index,
+            day,
+            row,
+            label,
+            time: label || gutterLabels[row] || null,
+            header: day >= 0 ? headers[day] || null : null,
+            classes: slot ? slot.className : '',
+            available: !!slot && slot.classList.contains('rbc-time-slot-available'),
+        };
+    });
+    return {view, slots};
+}
+"""
+
+# Coluna, linha e horário de um único grupo da grade, para conferir um índice deduzido da API
+SLOT_AT_JS = """
+(index) => {
+    const group = document.querySelectorAll('.rbc-timeslot-group')[index];
+    if (!group) return null;
+    const column = group.parentElement;
+    const days = Array.from(document.querySelectorAll('.rbc-time-content .rbc-day-slot'));
+    const row = Array.from(column.children)
+        .filter(el => el.classList.contains('rbc-timeslot-group'))
+        .indexOf(group);
+    const gutter = document.querySelectorAll('.rbc-time-gutter .rbc-timeslot-group')[row];
+    const label = el => (el ? el.innerText.trim() : null);
+    return {
+        day: days.indexOf(column),
+        row,
+        time: label(group.querySelector('.rbc-label')) || label(gutter && gutter.querySelector('.rbc-label')),
+    };
+}
+"""
+
+_TIME_RE = re.compile(r"(\d{1,2})\s*(?:[:h]\s*(\d{2}))?\s*(am|pm)?", re.IGNORECASE)
+
+
+def to_minutes(value):
+    """Converte rótulos como '07:30', '7h30' ou '7:30 PM' em minutos desde a meia-noite."""
+    if not value:
+        return None
+    match = _TIME_RE.search(value)
+    if not match:
+        return None
+    hora, minuto, periodo = int(match.group(1)), int(match.group(2) or 0), (match.group(3) or "").lower()
+    if periodo == "pm" and hora < 12:
+        hora += 12
+    elif periodo == "am" and hora == 12:
+        hora = 0
+    return hora * 60 + minuto
+
+
+class SlotIndex:
+    """Índice em memória da grade de horários, com as políticas de escolha de slot."""
+
+    def __init__(self, slots, view=None, source="dom"):
+        self.slots = slots
+        self.view = view or {"label": None, "headers": []}
+        # "api" quando os índices do DOM foram deduzidos da resposta da agenda, e não lidos da tela
+        self.source = source
+        for slot in self.slots:
+            slot["minutes"] = to_minutes(slot.get("time"))
+            slot["day_key"] = day_key(self.view, slot.get("day", -1))
+
+    def full_days(self):
+        """Dias da visão (colunas da grade) sem nenhum horário disponível."""
+        dias = {slot["day_key"] for slot in self.slots if slot.get("day", -1) >= 0}
+        com_vaga = {slot["day_key"] for slot in self.available}
+        return dias - com_vaga
+
+    @property
+    def available(self):
+        return [slot for slot in self.slots if slot["available"]]
+
+    def candidates(self, policy="earliest", target=None):
+        """Slots disponíveis ordenados pela política: earliest, closest (a target) ou after (target)."""
+        if policy not in POLICIES:
+            raise ValueError(f"Política de horário desconhecida: {policy}")
+        alvo = to_minutes(target) if target else None
+        if policy != "earliest" and alvo is None:
+            raise ValueError(f"A política '{policy}' exige um horário alvo (ex.: 08:00)")
+
+        # Slots sem horário legível ficam no fim, na ordem da grade
+        def ordem(slot):
+            minutos = slot["minutes"]
+            sem_horario = minutos is None
+            if policy == "closest" and not sem_horario:
+                return (sem_horario, abs(minutos - alvo), slot["day"], minutos, slot["index"])
+            return (sem_horario, slot["day"], minutos or 0, slot["index"])
+
+        disponiveis = self.available
+        if policy == "after":
+            disponiveis = [s for s in disponiveis if s["minutes"] is not None and s["minutes"] >= alvo]
+        return sorted(disponiveis, key=ordem)
+
+    def pick(self, policy="earliest", target=None):
+        candidatos = self.candidates(policy, target)
+        return candidatos[0] if candidatos else None
+
+
+def day_key(view, day):
+    """Chave estável de um dia: o cabeçalho da coluna ou, na visão diária, o rótulo da barra."""
+    headers = view.get("headers") or []
+    if 0 <= day < len(headers) and headers[day]:
+        return headers[day]
+    return f"{view.get('label')}#{day}" if len(headers) > 1 else view.get("label")
+
+
+def view_days(view):
+    """Chaves de todos os dias exibidos em uma visão."""
+    total = max(1, len(view.get("headers") or []))
+    return {day_key(view, day) for day in range(total)}
+
+
+class FullDayCache:
+    """Dias já encontrados lotados por profissional, compartilhados entre os pacientes de um lote.
+
+    Com ttl (segundos), um dia registrado deixa de valer depois desse tempo: no daemon o cache vive por
+    dias, e um dia lotado pode ganhar vagas com cancelamentos ou, na virada do mês, o mesmo cabeçalho
+    ("seg 20") passa a ser outra data.
+    """
+
+    def __init__(self, ttl=None, clock=None):
+        self.ttl = ttl
+        self.clock = clock or time.monotonic
+        self.days = {}
+
+    def _validos(self, profissional):
+        registrados = self.days.get(profissional.lower(), {})
+        if self.ttl:
+            agora = self.clock()
+            for dia in [dia for dia, quando in registrados.items() if agora - quando >= self.ttl]:
+                del registrados[dia]
+        return registrados
+
+    def add(self, profissional, dias):
+        registrados = self._validos(profissional)
+        novos = set(dias) - set(registrados)
+        agora = self.clock()
+        self.days.setdefault(profissional.lower(), registrados).update({dia: agora for dia in novos})
+        if novos:
+            logger.info("Dias lotados registrados para %s: %s", profissional, sorted(novos))
+
+    def is_full(self, profissional, view):
+        """Indica se todos os dias da visão já são conhecidos como lotados."""
+        conhecidos = set(self._validos(profissional))
+        return bool(conhecidos) and view_days(view) <= conhecidos
+
+    def clear(self):
+        self.days.clear()
+
+
+async def snapshot_slots(page):
+    """Captura a grade inteira com um único page.evaluate."""
+    with tracer.span("agendamento.captura_grade"):
+        snapshot = await page.evaluate(SNAPSHOT_JS)
+    index = SlotIndex(snapshot["slots"], snapshot["view"])
+    logger.info("Grade capturada (%s): %s grupos, %s disponíveis", index.view['label'], len(index.slots), len(index.available))
+    return index
+
+
+async def matches_dom(page, slot):
+    """Confere que o grupo do DOM no índice do slot é o mesmo dia e horário; False se não der para confirmar."""
+    dom = await page.evaluate(SLOT_AT_JS, slot["index"])
+    if not dom:
+        return False
+    minutos = to_minutes(dom.get("time"))
+    return dom["day"] == slot.get("day") and minutos is not None and minutos == slot.get("minutes")
+
+
+async def read_view(page):
+    """Lê apenas o rótulo e os cabeçalhos da visão atual, sem capturar a grade."""
+    return await page.evaluate(CALENDAR_VIEW_JS)
+
+
+def default_policy():
+    """Política e horário alvo configurados no .env."""
+    return settings.SLOT_POLICY, settings.SLOT_TIME
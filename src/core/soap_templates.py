@@ -0,0 +1,188 @@
+# src/core/soap_templates.py
+import json
+import os
+import re
+from playwright.async_api import TimeoutError
+from src.config.settings import settings
+from src.utils.autocomplete_cache import autocomplete_cache
+from src.utils.logger import logger
+from src.utils.readiness import wait_for_network_idle, wait_for_options, wait_for_visible
+from src.utils.selector_registry import selector_registry
+from src.utils.tracing import tracer
+
+# Campos aceitos em um modelo de SOAP
+CAMPOS_MODELO = {"nome", "descricao", "campos", "motivo", "problemas", "finalizar"}
+CAMPOS_PROBLEMA = {"ciap", "alta"}
+CODIGO_CIAP = re.compile(r"^[A-Z]\d{2}$")
+EXTENSOES = (".yaml", ".yml", ".json")
+
+# Campos de CIAP do formulário: textbox do motivo da consulta e autocomplete de problemas/condições
+CAMPO_MOTIVO = "motivo"
+CAMPO_PROBLEMA = "problema"
+
+# Campo do cache de autocomplete com o rótulo da opção de cada código CIAP (o mesmo nos dois campos)
+CAMPO_CACHE = "soap.ciap"
+
+
+def _ler(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        if caminho.endswith(".json"):
+            return json.load(arquivo)
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"Modelo {caminho} em YAML requer o pacote PyYAML (pip install PyYAML) ou use JSON")
+        return yaml.safe_load(arquivo)
+
+
+def template_path(nome=None):
+    """Caminho do modelo: um arquivo existente ou um nome procurado em SOAP_TEMPLATES_DIR."""
+    nome = nome or settings.SOAP_TEMPLATE
+    if os.path.isfile(nome):
+        return nome
+    for extensao in ("",) + EXTENSOES:
+        caminho = os.path.join(settings.SOAP_TEMPLATES_DIR, nome + extensao)
+        if os.path.isfile(caminho):
+            return caminho
+    raise ValueError(f"Modelo de SOAP não encontrado: {nome} (procurado em {settings.SOAP_TEMPLATES_DIR})")
+
+
+def _codigo(valor, onde):
+    codigo = str(valor or "").strip().upper()
+    if not CODIGO_CIAP.match(codigo):
+        raise ValueError(f"{onde}: código CIAP inválido '{valor}' (formato esperado: letra e dois dígitos, ex.: A03)")
+    return codigo
+
+
+def validate(dados, origem="modelo"):
+    """Confere o modelo e devolve-o normalizado; erros apontam o campo com problema."""
+    if not isinstance(dados, dict):
+        raise ValueError(f"{origem}: o modelo deve ser um objeto com os campos {sorted(CAMPOS_MODELO)}")
+    desconhecidos = set(dados) - CAMPOS_MODELO
+    if desconhecidos:
+        raise ValueError(f"{origem}: campos desconhecidos {sorted(desconhecidos)}")
+    motivo = dados.get("motivo")
+    motivos = motivo if isinstance(motivo, list) else [motivo] if motivo else []
+    if not motivos:
+        raise ValueError(f"{origem}: 'motivo' (código CIAP do motivo da consulta) é obrigatório")
+    campos = dados.get("campos") or {}
+    if not isinstance(campos, dict) or not all(isinstance(v, str) for v in campos.values()):
+        raise ValueError(f"{origem}: 'campos' deve mapear o rótulo de cada campo de texto do SOAP ao texto")
+    problemas = []
+    for i, problema in enumerate(dados.get("problemas") or [], start=1):
+        if isinstance(problema, str):
+            problema = {"ciap": problema}
+        if not isinstance(problema, dict) or set(problema) - CAMPOS_PROBLEMA:
+            raise ValueError(f"{origem}: problema {i} deve ter apenas {sorted(CAMPOS_PROBLEMA)}")
+        problemas.append({"ciap": _codigo(problema.get("ciap"), f"{origem}, problema {i}"), "alta": bool(problema.get("alta"))})
+    return {
+        "nome": dados.get("nome") or origem,
+        "descricao": dados.get("descricao"),
+        "campos": campos,
+        "motivo": [_codigo(codigo, f"{origem}, motivo") for codigo in motivos],
+        "problemas": problemas,
+        "finalizar": dados.get("finalizar", True) is not False,
+    }
+
+
+def compile_template(dados, origem="modelo"):
+    """Valida o modelo e o converte no plano de passos executado para cada paciente."""
+    modelo = validate(dados, origem)
+    passos = [("aba", "SOAP")]
+    passos += [("texto", rotulo, texto) for rotulo, texto in modelo["campos"].items()]
+    passos += [("ciap", CAMPO_MOTIVO, codigo) for codigo in modelo["motivo"]]
+    for problema in modelo["problemas"]:
+        passos += [("ciap", CAMPO_PROBLEMA, problema["ciap"]), ("adicionar_problema",)]
+    # A alta é marcada na linha de cada problema, depois que todos foram adicionados
+    passos += [("alta", i) for i, problema in enumerate(modelo["problemas"]) if problema["alta"]]
+    if modelo["finalizar"]:
+        passos.append(("finalizar",))
+    return SoapPlan(modelo["nome"], passos, modelo)
+
+
+# Modelos já compilados por caminho (e data de modificação): o lote compila cada modelo uma vez
+_compilados = {}
+
+
+def load_plan(nome=None):
+    """Plano compilado do modelo dado (ou de SOAP_TEMPLATE)."""
+    caminho = template_path(nome)
+    chave = (os.path.abspath(caminho), os.path.getmtime(caminho))
+    plano = _compilados.get(chave)
+    if plano is None:
+        plano = _compilados[chave] = compile_template(_ler(caminho), os.path.basename(caminho))
+        logger.info("Modelo de SOAP %s compilado: %s passos", plano.nome, len(plano.passos))
+    return plano
+
+
+class SoapPlan:
+    """Passos compilados de um modelo de SOAP; run(page) preenche e finaliza o atendimento aberto."""
+
+    def __init__(self, nome, passos, modelo):
+        self.nome = nome
+        self.passos = passos
+        self.modelo = modelo
+
+    async def run(self, page, labels=None):
+        labels = labels or autocomplete_cache
+        for passo in self.passos:
+            acao, argumentos = passo[0], passo[1:]
+            await getattr(self, f"_{acao}")(page, labels, *argumentos)
+        logger.info("SOAP %s preenchido (%s)", self.nome, ", ".join(self.modelo["motivo"]))
+
+    async def _aba(self, page, labels, nome):
+        await page.get_by_role("tab", name=nome).click()
+
+    async def _texto(self, page, labels, rotulo, texto):
+        await page.get_by_role("textbox", name=rotulo).fill(texto)
+
+    def _campo(self, page, campo):
+        if campo == CAMPO_MOTIVO:
+            return page.get_by_role("textbox", name="Motivo da consulta (CIAP 2)")
+        return page.get_by_test_id("ProblemasCondicoesForm.ciap")
+
+    async def _ciap(self, page, labels, campo, codigo):
+        """Seleciona o código no autocomplete; com o rótulo já resolvido, clica direto na opção."""
+        entrada = self._campo(page, campo)
+        await wait_for_visible(entrada, f"soap.{campo}")
+        await entrada.click()
+        entrada_cache = labels.get(CAMPO_CACHE, codigo)
+        label = entrada_cache["label"] if entrada_cache else None
+        with tracer.span(f"autocomplete.soap.{campo}"):
+            await entrada.fill(codigo.lower())
+            if label is not None:
+                try:
+                    await self._opcao(page, label).click(timeout=settings.AUTOCOMPLETE_CACHE_WAIT_MS)
+                    return
+                except TimeoutError:
+                    # Rótulo mudou ou deixou de existir: descarta a entrada e refaz a busca pelo código
+                    logger.info("Rótulo em cache do CIAP %s não apareceu (%s), refazendo a busca", codigo, label)
+                    labels.invalidate(CAMPO_CACHE, codigo)
+            padrao = selector_registry.regex(rf"Código {codigo}\b")
+            await wait_for_options(page, padrao, f"soap.{campo}")
+            opcao = page.get_by_role("option").filter(has_text=padrao).first
+            # O rótulo é o texto da opção até "Inclui:", o mesmo usado como nome acessível
+            label = (await opcao.inner_text()).split("Inclui:")[0].split("\n")[0].strip()
+            labels.put(CAMPO_CACHE, codigo, label=label)
+            logger.info("Rótulo do CIAP %s resolvido: %s", codigo, label)
+        await self._opcao(page, label).click()
+
+    def _opcao(self, page, label):
+        # Nome exato: "Código A03" não pode casar com a opção de outro código que contenha o rótulo
+        return page.get_by_role("option", name=label, exact=True).first
+
+    async def _adicionar_problema(self, page, labels):
+        botao = page.get_by_test_id("ProblemasCondicoesFormFooterButtons.adicionar")
+        await botao.wait_for(state="visible")
+        await botao.click()
+        await wait_for_network_idle(page, "soap.adicionar")
+
+    async def _alta(self, page, labels, indice):
+        # Um rótulo "Alta do episódio" por problema: escolhe o rótulo do problema e só então o seu span
+        await page.locator("label").filter(has_text="Alta do episódio").nth(indice).locator("span").first.click()
+
+    async def _finalizar(self, page, labels):
+        botao = page.get_by_test_id("AtendimentoIndividualFooter.finalizar")
+        await botao.wait_for(state="visible")
+        await botao.click()
+        logger.info("Botão 'Finalizar' clicado com sucesso")
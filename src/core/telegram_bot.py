@@ -3,7 +3,9 @@ import asyncio
 import os
 import sys
 from aiogram import Bot, Dispatcher, types
-from aiogram.filters import Command
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.filters import Command, CommandObject
 from datetime import datetime
 
 # Adiciona o diretório raiz ao sys.path
@@ -11,39 +13,113 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 from src.utils.logger import logger
 from src.config.settings import settings
 
-bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
 dp = Dispatcher()
 
-# Use o ID correto do grupo conforme o log
-GROUP_CHAT_ID = "-1002296151588"  # Atualizado com base no log
+# Bot criado no primeiro uso (get_bot), não na importação do módulo
+bot = None
+
+# Daemon que executa os jobs pedidos pelos comandos; definido em start_bot
+daemon = None
+
+USO = "Uso: /{comando} <paciente> [; <enfermeiro>]"
+
+
+def get_bot():
+    """Bot do Telegram com o token e o servidor da Bot API configurados."""
+    global bot
+    if bot is None:
+        api_url = settings.TELEGRAM_API_URL
+        session = AiohttpSession(api=TelegramAPIServer.from_base(api_url)) if api_url else None
+        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN, session=session)
+    return bot
+
+
+def authorized(message):
+    """Só o chat privado e o grupo configurados podem pedir jobs."""
+    return str(message.chat.id) in {str(settings.TELEGRAM_BOT_CHAT_ID), str(settings.TELEGRAM_GROUP_CHAT_ID)}
+
+
+def parse_job_args(args):
+    """Lê '<paciente> [; <enfermeiro>]' dos argumentos do comando."""
+    paciente, _, enfermeiro = (args or "").partition(";")
+    return paciente.strip().upper() or None, enfermeiro.strip().upper() or None
+
 
 @dp.message(Command("start"))
 async def start_handler(message: types.Message):
     await message.reply("Bot iniciado! Pronto para receber notificações.")
     logger.info("Comando /start recebido")
 
+
+async def enqueue(message, command, tipo):
+    if not authorized(message):
+        logger.warning("Comando /%s recusado para o chat %s", command.command, message.chat.id)
+        await message.reply("Chat não autorizado a solicitar automações.")
+        return
+    if daemon is None:
+        await message.reply("O daemon da automação não está em execução.")
+        return
+    paciente, enfermeiro = parse_job_args(command.args)
+    if not paciente:
+        await message.reply(USO.format(comando=command.command))
+        return
+    logger.info("Comando /%s recebido no chat %s para %s", command.command, message.chat.id, paciente)
+    await daemon.submit(tipo, paciente, enfermeiro, reply=message.reply)
+
+
+@dp.message(Command("agendar"))
+async def agendar_handler(message: types.Message, command: CommandObject):
+    await enqueue(message, command, "agendar")
+
+
+@dp.message(Command("atender"))
+async def atender_handler(message: types.Message, command: CommandObject):
+    await enqueue(message, command, "atender")
+
+
+@dp.message(Command("fluxo"))
+async def fluxo_handler(message: types.Message, command: CommandObject):
+    await enqueue(message, command, "fluxo")
+
+
+@dp.message(Command("status"))
+async def status_handler(message: types.Message):
+    if daemon is None or not authorized(message):
+        await message.reply("O daemon da automação não está em execução.")
+        return
+    situacao = daemon.status()
+    jobs = ", ".join(f"{status}: {total}" for status, total in sorted(situacao["jobs"].items())) or "nenhum job"
+    pool = situacao["pool"] or {}
+    await message.reply(f"Jobs: {jobs}. Contextos ocupados: {pool.get('ocupados', 0)}/{pool.get('tamanho', 0)}.")
+
+
 @dp.message()
 async def handle_message(message: types.Message):
-    logger.info(f"Mensagem recebida no chat {message.chat.id}: {message.text}")
-    if not message.text.startswith('/'):
+    logger.info("Mensagem recebida no chat %s: %s", message.chat.id, message.text)
+    if message.text and not message.text.startswith('/'):
         unidade = message.text
         horario = datetime.now().strftime("%H:%M:%S %d/%m/%Y")
-        logger.info(f"Automação concluída com sucesso: {unidade}")
+        logger.info("Automação concluída com sucesso: %s", unidade)
         notificacao = f"Notificação recebida: Automação concluída com sucesso em {unidade} às {horario}"
         try:
-            await bot.send_message(chat_id=GROUP_CHAT_ID, text=notificacao)
-            logger.info(f"Notificação enviada ao grupo {GROUP_CHAT_ID}: {notificacao}")
+            await get_bot().send_message(chat_id=settings.TELEGRAM_GROUP_CHAT_ID, text=notificacao)
+            logger.info("Notificação enviada ao grupo %s: %s", settings.TELEGRAM_GROUP_CHAT_ID, notificacao)
         except Exception as e:
-            logger.error(f"Erro ao enviar notificação ao grupo {GROUP_CHAT_ID}: {str(e)}")
+            logger.error("Erro ao enviar notificação ao grupo %s: %s", settings.TELEGRAM_GROUP_CHAT_ID, str(e))
+
 
-async def start_bot():
-    logger.info("Iniciando o bot do Telegram")
+async def start_bot(job_daemon=None):
+    """Inicia o polling do bot; com um daemon, os comandos /agendar, /atender e /fluxo enfileiram jobs."""
+    global daemon
+    daemon = job_daemon
+    logger.info("Iniciando o bot do Telegram%s", " com o daemon de jobs" if daemon else "")
     while True:
         try:
-            await dp.start_polling(bot)
+            await dp.start_polling(get_bot())
+            return
         except Exception as e:
-            logger.error(f"Erro no polling do bot: {str(e)}")
+            logger.error("Erro no polling do bot: %s", str(e))
             await asyncio.sleep(5)
 
 if __name__ == "__main__":
-    asyncio.run(start_bot())
\ No newline at end of file
+    asyncio.run(start_bot())
@@ -0,0 +1,67 @@
+# src/core/worklist.py
+import csv
+import io
+import json
+import os
+import sys
+from src.utils.logger import logger
+
+# Colunas reconhecidas em cada entrada da lista de trabalho
+CAMPOS = ("paciente", "enfermeiro", "unidade")
+# Colunas opcionais, incluídas na entrada só quando preenchidas (soap: modelo de SOAP do paciente)
+OPCIONAIS = ("soap",)
+
+
+def _normalizar(entrada, linha):
+    """Normaliza uma entrada bruta (dict) para o formato usado pelo lote."""
+    dados = {chave.strip().lower(): (valor or "").strip() for chave, valor in entrada.items() if chave}
+    paciente = dados.get("paciente")
+    if not paciente:
+        raise ValueError(f"Linha {linha} da lista de trabalho sem o campo 'paciente'")
+    entrada = {campo: dados.get(campo) or None for campo in CAMPOS}
+    entrada.update({campo: dados[campo] for campo in OPCIONAIS if dados.get(campo)})
+    return entrada
+
+
+def _ler_csv(texto):
+    """Lê CSV com cabeçalho (coluna 'paciente') ou uma coluna simples de nomes."""
+    linhas = [linha for linha in texto.splitlines() if linha.strip()]
+    if not linhas:
+        return []
+    # Cabeçalho só quando alguma coluna da primeira linha é exatamente 'paciente' (um nome como
+    # "Paciente Teste" na primeira linha é dado, não cabeçalho)
+    primeira = next(csv.reader([linhas[0]]), [])
+    if any(coluna.strip().lower() == "paciente" for coluna in primeira):
+        leitor = csv.DictReader(io.StringIO("\n".join(linhas)))
+        return [_normalizar(row, i + 2) for i, row in enumerate(leitor)]
+    leitor = csv.reader(io.StringIO("\n".join(linhas)))
+    return [_normalizar({"paciente": row[0]}, i + 1) for i, row in enumerate(leitor) if row]
+
+
+def _ler_jsonl(texto):
+    """Lê uma entrada JSON por linha; aceita objetos ou strings com o nome do paciente."""
+    entradas = []
+    for i, linha in enumerate(texto.splitlines(), start=1):
+        if not linha.strip():
+            continue
+        valor = json.loads(linha)
+        if isinstance(valor, str):
+            valor = {"paciente": valor}
+        entradas.append(_normalizar(valor, i))
+    return entradas
+
+
+def load_worklist(source):
+    """Carrega a lista de pacientes de um arquivo CSV/JSONL ou da entrada padrão ("-")."""
+    if source == "-":
+        texto = sys.stdin.read()
+        formato = "jsonl" if texto.lstrip().startswith(("{", '"')) else "csv"
+    else:
+        with open(source, encoding="utf-8-sig") as arquivo:
+            texto = arquivo.read()
+        extensao = os.path.splitext(source)[1].lower()
+        formato = "jsonl" if extensao in (".jsonl", ".json") else "csv"
+
+    entradas = _ler_jsonl(texto) if formato == "jsonl" else _ler_csv(texto)
+    logger.info("Lista de trabalho carregada de %s (%s): %s pacientes", source, formato, len(entradas))
+    return entradas
@@ -0,0 +1,177 @@
+# src/utils/autocomplete_cache.py
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from playwright.async_api import TimeoutError
+from src.config.settings import settings
+from src.utils.lazy import LazyObject
+from src.utils.logger import logger
+from src.utils.selector_registry import selector_registry
+
+
+def normalize_label(texto):
+    """Texto da opção com os espaços e quebras de linha reduzidos a um espaço."""
+    return " ".join((texto or "").split())
+
+
+def label_pattern(label):
+    """Regex que casa a opção inteira com o rótulo guardado, tolerando a separação entre nome e CBO."""
+    partes = [re.escape(parte) for parte in label.split()]
+    return selector_registry.regex(r"^\s*" + r"\s*".join(partes) + r"\s*$")
+
+
+class AutocompleteCache:
+    """Opção escolhida em cada autocomplete, por (campo, busca, unidade), com validade, LRU e persistência.
+
+    Na primeira resolução o fluxo filtra as opções como antes e guarda o rótulo (e o CBO, quando houver)
+    da opção vencedora; nas seguintes, inclusive em outras execuções, clica direto nessa opção. Uma opção
+    guardada que não aparece mais é descartada e a busca completa é refeita.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None, enabled=None):
+        self.path = path or settings.AUTOCOMPLETE_CACHE_PATH
+        self.ttl = settings.AUTOCOMPLETE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = settings.AUTOCOMPLETE_CACHE_SIZE if max_entries is None else max_entries
+        self.enabled = settings.AUTOCOMPLETE_CACHE if enabled is None else enabled
+        self.entries = None
+        self.hits = 0
+        self.misses = 0
+        self.por_campo = {}
+        self._removed = set()
+        self._dirty = False
+
+    @staticmethod
+    def key(campo, busca, unidade=None):
+        return "|".join((campo, normalize_label(busca).lower(), normalize_label(unidade).lower()))
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = OrderedDict()
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as arquivo:
+                salvas = json.load(arquivo)
+        except (OSError, ValueError):
+            logger.warning("Cache de autocomplete ilegível em %s, recomeçando vazio", self.path)
+            return
+        # O arquivo guarda as entradas da menos para a mais recentemente usada
+        for chave, entrada in salvas.items():
+            if not self._expired(entrada):
+                self.entries[chave] = entrada
+
+    def _expired(self, entrada):
+        return bool(self.ttl) and time.time() - entrada.get("salvo", 0) > self.ttl
+
+    def _count(self, campo, acerto):
+        contagem = self.por_campo.setdefault(campo, {"acertos": 0, "falhas": 0})
+        if acerto:
+            self.hits += 1
+            contagem["acertos"] += 1
+        else:
+            self.misses += 1
+            contagem["falhas"] += 1
+
+    def get(self, campo, busca, unidade=None):
+        """Entrada guardada ({"label", "cbo", ...}) ou None; conta acerto ou falha por campo."""
+        if not self.enabled:
+            return None
+        self._load()
+        chave = self.key(campo, busca, unidade)
+        entrada = self.entries.get(chave)
+        if entrada is not None and self._expired(entrada):
+            self.invalidate(campo, busca, unidade)
+            entrada = None
+        self._count(campo, entrada is not None)
+        if entrada is not None:
+            self.entries.move_to_end(chave)
+        return entrada
+
+    def put(self, campo, busca, unidade=None, label=None, **extra):
+        """Guarda a opção vencedora, descartando as menos usadas além de AUTOCOMPLETE_CACHE_SIZE."""
+        if not self.enabled or not label:
+            return
+        self._load()
+        chave = self.key(campo, busca, unidade)
+        self.entries[chave] = {"label": normalize_label(label), **extra, "salvo": time.time()}
+        self.entries.move_to_end(chave)
+        self._removed.discard(chave)
+        while len(self.entries) > self.max_entries:
+            antiga, _ = self.entries.popitem(last=False)
+            self._removed.add(antiga)
+        self._dirty = True
+
+    def invalidate(self, campo, busca, unidade=None):
+        self._load()
+        chave = self.key(campo, busca, unidade)
+        if self.entries.pop(chave, None) is not None:
+            self._removed.add(chave)
+            self._dirty = True
+
+    async def pick(self, page, campo, busca, unidade=None, timeout=None):
+        """Clica na opção guardada para a busca já digitada; retorna a entrada ou None para resolver pela lista."""
+        entrada = self.get(campo, busca, unidade)
+        if entrada is None:
+            return None
+        opcao = page.get_by_role("option").filter(has_text=label_pattern(entrada["label"])).first
+        try:
+            await opcao.click(timeout=settings.AUTOCOMPLETE_CACHE_WAIT_MS if timeout is None else timeout)
+        except TimeoutError:
+            logger.info("Opção em cache '%s' não apareceu para %s, refazendo a busca", entrada["label"], campo)
+            self.invalidate(campo, busca, unidade)
+            return None
+        logger.info("Opção de %s selecionada pelo cache: %s", campo, entrada["label"])
+        return entrada
+
+    async def remember(self, campo, busca, unidade, option, **extra):
+        """Guarda o texto da opção escolhida (lido antes do clique, enquanto a lista está aberta)."""
+        if self.enabled:
+            self.put(campo, busca, unidade, await option.inner_text(), **extra)
+
+    def stats(self):
+        return {
+            "acertos": self.hits,
+            "falhas": self.misses,
+            "entradas": len(self.entries or ()),
+            "por_campo": self.por_campo,
+        }
+
+    def log_summary(self):
+        if self.hits or self.misses:
+            logger.info("Cache de autocomplete: %s acertos, %s falhas %s", self.hits, self.misses, self.por_campo)
+
+    def save(self):
+        """Junta as entradas desta execução às do arquivo (vence a mais recente) e grava de forma atômica."""
+        if not self._dirty:
+            return
+        atuais = OrderedDict()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as arquivo:
+                    atuais = OrderedDict(json.load(arquivo))
+            except (OSError, ValueError):
+                atuais = OrderedDict()
+        for chave in self._removed:
+            atuais.pop(chave, None)
+        # As gravadas por outros processos ficam como as menos recentes; as desta execução, no fim
+        for chave, entrada in self.entries.items():
+            anterior = atuais.pop(chave, None)
+            atuais[chave] = anterior if anterior and anterior["salvo"] > entrada["salvo"] else entrada
+        for chave in [c for c, entrada in atuais.items() if self._expired(entrada)]:
+            del atuais[chave]
+        while len(atuais) > self.max_entries:
+            atuais.popitem(last=False)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporario = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(atuais, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.path)
+        self._removed = set()
+        self._dirty = False
+        logger.info("Cache de autocomplete salvo em %s (%s entradas)", self.path, len(atuais))
+
+
+autocomplete_cache = LazyObject(AutocompleteCache)
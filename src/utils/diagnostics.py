@@ -0,0 +1,191 @@
+# Pacotes de diagnóstico gravados quando uma etapa falha: HTML, resumo da tela, screenshot e trace
+# src/utils/diagnostics.py
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+import weakref
+from datetime import datetime
+from src.config.settings import settings
+from src.utils.lazy import LazyObject
+from src.utils.logger import logger
+
+# Resumo da tela em uma única ida ao navegador: títulos, opções, botões, diálogos, alertas e campos
+# visíveis. Valores digitados nos campos não são lidos (podem conter senha ou dados do paciente).
+SUMMARY_JS = """
+() => {
+    const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const label = el => (el.innerText || el.getAttribute('aria-label') || el.title || '').trim().slice(0, 200);
+    const texts = (selector, limit) => Array.from(document.querySelectorAll(selector))
+        .filter(visible).slice(0, limit).map(label);
+    return {
+        url: location.href,
+        title: document.title,
+        headings: texts('h1, h2, h3', 50),
+        options: texts('[role=option]', 50),
+        buttons: texts('button, [role=button]', 100),
+        dialogs: texts('[role=dialog]', 5),
+        alerts: texts('[role=alert]', 10),
+        inputs: Array.from(document.querySelectorAll('input, textarea')).filter(visible).slice(0, 50).map(el => ({
+            name: el.name || null,
+            placeholder: el.placeholder || null,
+            label: el.getAttribute('aria-label'),
+            testid: el.getAttribute('data-testid'),
+        })),
+    };
+}
+"""
+
+
+def _slug(texto):
+    return re.sub(r"[^a-z0-9]+", "-", (texto or "").lower()).strip("-")[:60]
+
+
+def _dir_size(path):
+    total = 0
+    for raiz, _, arquivos in os.walk(path):
+        for nome in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nome))
+            except OSError:
+                pass
+    return total
+
+
+class Diagnostics:
+    """Captura o estado da página em uma falha e grava o pacote em disco fora do loop de eventos.
+
+    Cada pacote tem um limite de tamanho (DIAGNOSTICS_MAX_BUNDLE_MB); o diretório mantém no máximo
+    DIAGNOSTICS_MAX_MB e descarta pacotes mais antigos que DIAGNOSTICS_KEEP_DAYS.
+    """
+
+    def __init__(self, root=None, enabled=None, trace=None, max_bundle_mb=None, max_mb=None, keep_days=None):
+        self.root = root or settings.DIAGNOSTICS_DIR
+        self.enabled = settings.DIAGNOSTICS_ENABLED if enabled is None else enabled
+        self.trace = settings.DIAGNOSTICS_TRACE if trace is None else trace
+        self.max_bundle = int((max_bundle_mb or settings.DIAGNOSTICS_MAX_BUNDLE_MB) * 1024 * 1024)
+        self.max_total = int((max_mb or settings.DIAGNOSTICS_MAX_MB) * 1024 * 1024)
+        self.keep_days = settings.DIAGNOSTICS_KEEP_DAYS if keep_days is None else keep_days
+        self.bundles = []
+        self._pending = set()
+        self._tracing = weakref.WeakSet()
+
+    # Trace do Playwright: um trecho (chunk) por paciente, salvo apenas quando há falha
+
+    async def start_tracing(self, context):
+        if not (self.enabled and self.trace):
+            return
+        await context.tracing.start(screenshots=True, snapshots=True)
+        self._tracing.add(context)
+
+    async def new_chunk(self, context):
+        """Descarta o trecho do paciente anterior e começa um novo."""
+        if context not in self._tracing:
+            return
+        await context.tracing.stop_chunk()
+        await context.tracing.start_chunk()
+
+    # Captura
+
+    async def capture(self, page, motivo, erro=None, **contexto):
+        """Captura HTML, resumo e screenshot da página e agenda a gravação do pacote; retorna o diretório."""
+        if not self.enabled:
+            return None
+        try:
+            destino, meta, conteudos, trace = await self._snapshot(page, motivo, erro, contexto)
+        except Exception as e:
+            # O diagnóstico nunca deve esconder o erro original
+            logger.warning("Diagnóstico de %s não capturado: %s", motivo, str(e))
+            return None
+        tarefa = asyncio.ensure_future(asyncio.to_thread(self._write, destino, meta, conteudos, trace))
+        self._pending.add(tarefa)
+        tarefa.add_done_callback(self._pending.discard)
+        self.bundles.append(destino)
+        logger.error("Falha em %s: diagnóstico salvo em %s", motivo, destino)
+        return destino
+
+    async def _snapshot(self, page, motivo, erro, contexto):
+        carimbo = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        destino = os.path.join(self.root, f"{carimbo}-{_slug(motivo)}")
+        inicio = time.perf_counter()
+        html, resumo, tela = await asyncio.gather(
+            page.content(), page.evaluate(SUMMARY_JS), page.screenshot(full_page=True, type="png"),
+            return_exceptions=True,
+        )
+        trace = None
+        if page.context in self._tracing:
+            os.makedirs(destino, exist_ok=True)
+            trace = os.path.join(destino, "trace.zip")
+            try:
+                await page.context.tracing.stop_chunk(path=trace)
+                await page.context.tracing.start_chunk()
+            except Exception as e:
+                logger.warning("Trace do Playwright não salvo no diagnóstico: %s", str(e))
+                trace = None
+        meta = {
+            "motivo": motivo,
+            "erro": str(erro) if erro else None,
+            "contexto": contexto,
+            "capturado_em": datetime.now().isoformat(timespec="seconds"),
+            "captura_segundos": round(time.perf_counter() - inicio, 3),
+            "tela": resumo if not isinstance(resumo, Exception) else {"erro": str(resumo)},
+        }
+        conteudos = {
+            "page.html": html.encode("utf-8") if isinstance(html, str) else None,
+            "screenshot.png": tela if isinstance(tela, bytes) else None,
+        }
+        return destino, meta, conteudos, trace
+
+    def _write(self, destino, meta, conteudos, trace):
+        os.makedirs(destino, exist_ok=True)
+        restante = self.max_bundle
+        omitidos = []
+        # HTML antes da imagem e da imagem antes do trace: o HTML é o que mais ajuda a corrigir um seletor
+        for nome in ("page.html", "screenshot.png"):
+            dados = conteudos.get(nome)
+            if dados is None:
+                continue
+            if len(dados) > restante and nome == "page.html":
+                dados = dados[:max(0, restante)]
+                omitidos.append(f"{nome} (truncado)")
+            elif len(dados) > restante:
+                omitidos.append(nome)
+                continue
+            with open(os.path.join(destino, nome), "wb") as arquivo:
+                arquivo.write(dados)
+            restante -= len(dados)
+        if trace and os.path.exists(trace) and os.path.getsize(trace) > restante:
+            os.remove(trace)
+            omitidos.append("trace.zip")
+        meta["omitidos"] = omitidos
+        with open(os.path.join(destino, "resumo.json"), "w", encoding="utf-8") as arquivo:
+            json.dump(meta, arquivo, ensure_ascii=False, indent=2)
+        self.prune()
+
+    def prune(self):
+        """Remove pacotes fora do prazo de retenção e, do mais antigo ao mais novo, os que excedem o limite total."""
+        if not os.path.isdir(self.root):
+            return
+        pacotes = sorted(
+            (os.path.join(self.root, nome) for nome in os.listdir(self.root)),
+            key=lambda caminho: os.path.getmtime(caminho),
+        )
+        pacotes = [p for p in pacotes if os.path.isdir(p)]
+        limite_idade = time.time() - self.keep_days * 86400
+        tamanhos = {p: _dir_size(p) for p in pacotes}
+        total = sum(tamanhos.values())
+        for pacote in pacotes[:-1]:  # O pacote mais recente sempre fica
+            if os.path.getmtime(pacote) >= limite_idade and total <= self.max_total:
+                continue
+            shutil.rmtree(pacote, ignore_errors=True)
+            total -= tamanhos[pacote]
+
+    async def flush(self):
+        """Aguarda a gravação dos pacotes pendentes."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+
+diagnostics = LazyObject(Diagnostics)
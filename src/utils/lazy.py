@@ -0,0 +1,34 @@
+# Objetos do processo criados no primeiro uso, e não na importação do módulo
+# src/utils/lazy.py
+
+
+class LazyObject:
+    """Representa um objeto compartilhado (logger, tracer, caches) criado pela fábrica no primeiro acesso.
+
+    Assim importar um módulo não lê o .env, não cria diretórios nem inicia threads, como nas
+    configurações (Settings.__getattr__). Leitura, atribuição e remoção de atributos vão ao objeto real.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def _resolve(self):
+        instancia = object.__getattribute__(self, "_instance")
+        if instancia is None:
+            instancia = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_instance", instancia)
+        return instancia
+
+    def __getattr__(self, nome):
+        return getattr(self._resolve(), nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._resolve(), nome, valor)
+
+    def __delattr__(self, nome):
+        delattr(self._resolve(), nome)
+
+    def __repr__(self):
+        instancia = object.__getattribute__(self, "_instance")
+        return f"<LazyObject {instancia!r}>" if instancia is not None else "<LazyObject (não criado)>"
@@ -1,35 +1,107 @@
 # Configuração do sistema de logs
 #src/utils/logger.py
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+from src.config.settings import settings
+from src.utils.lazy import LazyObject
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON."""
+
+    def format(self, record):
+        dados = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            dados["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False)
+
+
+def _file_handler(log_dir):
+    """Arquivo com rotação por tamanho (LOG_ROTATION=size) ou por tempo (LOG_ROTATION=time)."""
+    path = f"{log_dir}/app.log"
+    if settings.LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
+def build_handlers():
+    """Handlers de saída (arquivo e console) que rodam na thread do QueueListener."""
+    log_dir = "src/logs"
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = _file_handler(log_dir)
+    file_handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(LOG_FORMAT))
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return [file_handler, console_handler]
+
 
 def setup_logger():
+    global _listener
     logger = logging.getLogger("AutomationLogger")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.LOG_LEVEL)
 
     # Evita duplicação de handlers
     if not logger.handlers:
-        # Handler para arquivo
-        log_dir = "src/logs"
-        os.makedirs(log_dir, exist_ok=True)
-        file_handler = logging.FileHandler(f"{log_dir}/app.log")
-        file_handler.setLevel(logging.INFO)
-
-        # Handler para console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-
-        # Formato do log
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
+        # O loop de eventos só enfileira o registro; a escrita em disco/console fica na thread do listener
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *build_handlers(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logger)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    return logger
+
+
+class _OriginFilter(logging.Filter):
+    """Marca os registros de um processo filho com a sua origem (ex.: o shard)."""
+
+    def __init__(self, origem):
+        super().__init__()
+        self.origem = origem
 
-        # Adiciona os handlers ao logger
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    def filter(self, record):
+        record.name = f"{record.name}.{self.origem}"
+        return True
 
+
+def attach_to_queue(log_queue, origem=None):
+    """Em um processo filho, envia os registros para a fila do processo coordenador em vez de gravar localmente."""
+    stop_logger()
+    logger = logging.getLogger("AutomationLogger")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.handlers.QueueHandler(log_queue)
+    if origem:
+        handler.addFilter(_OriginFilter(origem))
+    logger.addHandler(handler)
     return logger
 
-logger = setup_logger()
\ No newline at end of file
+
+def stop_logger():
+    """Esvazia a fila de logs e encerra o listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# Configurado na primeira mensagem: importar um módulo não cria src/logs nem inicia o listener
+logger = LazyObject(setup_logger)
@@ -0,0 +1,129 @@
+# Camada de prontidão: espera por condições reais em vez de pausas fixas
+# src/utils/readiness.py
+import re
+import time
+from playwright.async_api import TimeoutError
+from src.utils.logger import logger
+from src.utils.tracing import tracer
+
+# Tempo máximo esperado (segundos) por tipo de espera; acima disso a espera é registrada como lenta
+BUDGETS = {
+    "opcoes": 3.0,
+    "rede": 5.0,
+    "calendario": 5.0,
+    "dialogo": 5.0,
+    "visivel": 5.0,
+}
+
+
+class WaitStats:
+    """Acumula a duração real de cada espera para comparar execuções e detectar regressões."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, name, seconds, ok=True):
+        self.samples.setdefault(name, []).append((seconds, ok))
+        kind = name.split(":")[0]
+        budget = BUDGETS.get(kind)
+        if budget is not None and seconds > budget:
+            logger.warning("Espera '%s' levou %.2fs (orçamento %.1fs)", name, seconds, budget)
+
+    def summary(self):
+        resumo = {}
+        for name, samples in self.samples.items():
+            tempos = sorted(s for s, _ in samples)
+            resumo[name] = {
+                "n": len(tempos),
+                "total": round(sum(tempos), 3),
+                "media": round(sum(tempos) / len(tempos), 3),
+                "p95": round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+                "max": round(tempos[-1], 3),
+                "timeouts": sum(1 for _, ok in samples if not ok),
+            }
+        return resumo
+
+    def log_summary(self):
+        for name, dados in sorted(self.summary().items()):
+            logger.info("Espera '%s': %s", name, dados)
+
+    def reset(self):
+        self.samples.clear()
+
+
+wait_stats = WaitStats()
+
+
+async def _timed(name, awaitable, raise_on_timeout=True):
+    """Aguarda e registra a duração; em timeout registra a falha e repassa o erro se pedido."""
+    inicio = time.perf_counter()
+    try:
+        with tracer.span(f"espera.{name}"):
+            await awaitable
+    except TimeoutError:
+        wait_stats.record(name, time.perf_counter() - inicio, ok=False)
+        if raise_on_timeout:
+            raise
+        return False
+    wait_stats.record(name, time.perf_counter() - inicio)
+    return True
+
+
+async def wait_for_options(page, pattern=None, name="opcoes", timeout=15000, raise_on_timeout=True):
+    """Aguarda o autocomplete renderizar ao menos uma opção (que case com o padrão, se dado)."""
+    options = page.get_by_role("option")
+    if pattern is not None:
+        if isinstance(pattern, str):
+            pattern = re.compile(re.escape(pattern), re.IGNORECASE)
+        options = options.filter(has_text=pattern)
+    return await _timed(
+        f"opcoes:{name}", options.first.wait_for(state="visible", timeout=timeout), raise_on_timeout=raise_on_timeout
+    )
+
+
+async def wait_for_network_idle(page, name="rede", timeout=10000):
+    """Aguarda não haver requisições pendentes (ex.: a chamada GraphQL após uma ação)."""
+    return await _timed(
+        f"rede:{name}", page.wait_for_load_state("networkidle", timeout=timeout), raise_on_timeout=False
+    )
+
+
+# Identifica a visão atual do calendário (rótulo da barra de ferramentas + cabeçalhos dos dias)
+CALENDAR_VIEW_JS = """
+() => {
+    const label = document.querySelector('.rbc-toolbar-label');
+    const headers = Array.from(document.querySelectorAll('.rbc-time-header-content .rbc-header'))
+        .map(h => h.innerText.trim());
+    return {label: label ? label.innerText.trim() : null, headers};
+}
+"""
+
+
+async def wait_for_calendar(page, name="calendario", timeout=15000, previous_view=None):
+    """Aguarda a grade do react-big-calendar estar populada (e, se dado, diferente da visão anterior)."""
+    return await _timed(
+        f"calendario:{name}",
+        page.wait_for_function(
+            f"""previous => {{
+                const view = ({CALENDAR_VIEW_JS})();
+                const populated = document.querySelectorAll('.rbc-time-content .rbc-timeslot-group').length > 0;
+                return populated && (!previous || JSON.stringify(view) !== JSON.stringify(previous));
+            }}""",
+            arg=previous_view,
+            timeout=timeout,
+        ),
+    )
+
+
+async def wait_for_dialog_closed(page, name="dialogo", timeout=15000):
+    """Aguarda o fechamento de diálogos/modais abertos."""
+    return await _timed(
+        f"dialogo:{name}", page.wait_for_selector("[role='dialog']", state="hidden", timeout=timeout)
+    )
+
+
+async def wait_for_visible(locator, name="visivel", timeout=15000, raise_on_timeout=True):
+    """Aguarda um elemento ficar visível; sem raise_on_timeout retorna False em vez de falhar."""
+    return await _timed(
+        f"visivel:{name}", locator.wait_for(state="visible", timeout=timeout), raise_on_timeout=raise_on_timeout
+    )
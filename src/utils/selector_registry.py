@@ -0,0 +1,200 @@
+# src/utils/selector_registry.py
+import json
+import os
+import re
+import time
+from playwright.async_api import TimeoutError
+from src.config.settings import settings
+from src.utils.logger import logger
+
+STRATEGIES = ("race", "ordered")
+
+
+class SelectorRegistry:
+    """Variantes de seletor por elemento lógico, disputadas em paralelo ou ordenadas pela taxa de acerto.
+
+    No modo race as variantes são combinadas com Locator.or_() e aguardadas em uma única espera: a
+    variante errada para a implantação não custa mais um timeout por paciente. No modo ordered cada
+    variante tem uma espera curta (SELECTOR_PROBE_MS), começando pela que mais acertou. As taxas de
+    acerto ficam em SELECTOR_STATS_PATH e são somadas às de outros processos ao salvar.
+    """
+
+    def __init__(self, path=None, strategy=None, probe_ms=None):
+        # As variantes são registradas na importação dos fluxos; o que não foi passado aqui vem do .env
+        # só no primeiro uso, para que importar um módulo não leia as configurações
+        self._path = path
+        self._strategy = None
+        self._probe_ms = probe_ms
+        if strategy is not None:
+            self.strategy = strategy
+        self.elements = {}
+        self.stats = None
+        self._pending = {}
+        self._regex = {}
+
+    @property
+    def path(self):
+        return self._path or settings.SELECTOR_STATS_PATH
+
+    @path.setter
+    def path(self, path):
+        self._path = path
+
+    @property
+    def strategy(self):
+        if self._strategy is None:
+            self.strategy = settings.SELECTOR_STRATEGY
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, strategy):
+        strategy = strategy.lower()
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Estratégia de seletores inválida: {strategy} (use {', '.join(STRATEGIES)})")
+        self._strategy = strategy
+
+    @property
+    def probe_ms(self):
+        return self._probe_ms if self._probe_ms is not None else settings.SELECTOR_PROBE_MS
+
+    def register(self, name, *candidates):
+        """Registra as variantes (nome, fábrica(page, **params) -> Locator) de um elemento, em ordem de preferência."""
+        self.elements[name] = list(candidates)
+
+    def regex(self, pattern, flags=re.IGNORECASE):
+        """Regex compilada uma única vez por registro."""
+        chave = (pattern, flags)
+        compilada = self._regex.get(chave)
+        if compilada is None:
+            compilada = self._regex[chave] = re.compile(pattern, flags)
+        return compilada
+
+    # Taxas de acerto
+
+    def _load(self):
+        if self.stats is not None:
+            return
+        self.stats = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as arquivo:
+                    self.stats = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                logger.warning("Estatísticas de seletores ilegíveis em %s, recomeçando: %s", self.path, str(e))
+
+    def _record(self, name, vencedora, tentadas):
+        self._load()
+        for variante in tentadas:
+            acerto = int(variante == vencedora)
+            for contagens in (self.stats, self._pending):
+                item = contagens.setdefault(name, {}).setdefault(variante, {"tentativas": 0, "acertos": 0})
+                item["tentativas"] += 1
+                item["acertos"] += acerto
+
+    def hit_rate(self, name, variante):
+        """Taxa de acerto suavizada: variantes nunca tentadas começam em 0,5."""
+        self._load()
+        item = self.stats.get(name, {}).get(variante, {})
+        return (item.get("acertos", 0) + 1) / (item.get("tentativas", 0) + 2)
+
+    def order(self, name):
+        """Variantes do elemento da mais para a menos acertada; empates mantêm a ordem de registro."""
+        candidatos = self.elements[name]
+        return sorted(candidatos, key=lambda c: -self.hit_rate(name, c[0]))
+
+    # Resolução
+
+    async def resolve(self, page, name, timeout=15000, state="visible", **params):
+        """Aguarda a primeira variante do elemento que aparecer; retorna (variante, locator)."""
+        if name not in self.elements:
+            raise ValueError(f"Elemento de seletor não registrado: {name}")
+        candidatos = self.order(name) if self.strategy == "ordered" else self.elements[name]
+        locators = [(variante, fabrica(page, **params)) for variante, fabrica in candidatos]
+        if self.strategy == "ordered":
+            vencedora = await self._ordered(locators, timeout, state)
+        else:
+            vencedora = await self._race(locators, timeout, state)
+        self._record(name, vencedora[0] if vencedora else None, [variante for variante, _ in locators])
+        if vencedora is None:
+            variantes = ", ".join(variante for variante, _ in locators)
+            raise TimeoutError(f"Nenhuma variante de '{name}' apareceu em {timeout} ms ({variantes})")
+        logger.debug("Seletor %s resolvido pela variante %s", name, vencedora[0])
+        return vencedora
+
+    async def _race(self, locators, timeout, state):
+        combinado = locators[0][1]
+        for _, locator in locators[1:]:
+            combinado = combinado.or_(locator)
+        try:
+            await combinado.first.wait_for(state=state, timeout=timeout)
+        except TimeoutError:
+            return None
+        # Com mais de uma variante presente, vale a ordem de preferência do registro
+        for variante, locator in locators:
+            if await self._present(locator, state):
+                return variante, locator
+        return None
+
+    async def _ordered(self, locators, timeout, state):
+        limite = time.monotonic() + timeout / 1000
+        for i, (variante, locator) in enumerate(locators):
+            restante = (limite - time.monotonic()) * 1000
+            if restante < 1:
+                # Orçamento esgotado pelas sondagens anteriores; timeout=0 no Playwright esperaria para sempre
+                return None
+            espera = restante if i == len(locators) - 1 else min(self.probe_ms, restante)
+            try:
+                await locator.wait_for(state=state, timeout=espera)
+                return variante, locator
+            except TimeoutError:
+                continue
+        return None
+
+    @staticmethod
+    async def _present(locator, state):
+        if state == "visible":
+            return await locator.is_visible()
+        if state == "attached":
+            return await locator.count() > 0
+        return False
+
+    # Persistência
+
+    def report(self):
+        """Tentativas, acertos e taxa de cada variante."""
+        self._load()
+        return {
+            name: {
+                variante: {**item, "taxa": round(item["acertos"] / item["tentativas"], 3) if item["tentativas"] else None}
+                for variante, item in variantes.items()
+            }
+            for name, variantes in sorted(self.stats.items())
+        }
+
+    def save(self):
+        """Soma as contagens desta execução às do arquivo e grava de forma atômica."""
+        if not self._pending:
+            return
+        atuais = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as arquivo:
+                    atuais = json.load(arquivo)
+            except (OSError, ValueError):
+                atuais = {}
+        for name, variantes in self._pending.items():
+            for variante, item in variantes.items():
+                destino = atuais.setdefault(name, {}).setdefault(variante, {"tentativas": 0, "acertos": 0})
+                destino["tentativas"] += item["tentativas"]
+                destino["acertos"] += item["acertos"]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporario = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(atuais, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.path)
+        self.stats = atuais
+        self._pending = {}
+        logger.info("Taxas de acerto dos seletores salvas em %s", self.path)
+
+
+selector_registry = SelectorRegistry()
@@ -0,0 +1,170 @@
+# Instrumentação por etapas (spans) com exportação para Chrome trace e métricas Prometheus
+# src/utils/tracing.py
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from src.config.settings import settings
+from src.utils.lazy import LazyObject
+from src.utils.logger import logger
+
+# Limites (segundos) dos buckets do histograma Prometheus
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_attributes = contextvars.ContextVar("trace_attributes", default={})
+_lane = contextvars.ContextVar("trace_lane", default="principal")
+
+
+class Tracer:
+    """Registra spans das etapas da automação e exporta trace (Chrome trace-event) e métricas."""
+
+    def __init__(self, enabled=True, max_events=100_000):
+        self.enabled = enabled
+        self.max_events = max_events
+        self.events = []
+        self.histograms = {}
+        self.gauges = {}
+        self.lanes = {}
+        self.dropped = 0
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def attributes(self, **attrs):
+        """Define atributos (ex.: paciente, unidade) herdados por todos os spans internos."""
+        token = _attributes.set({**_attributes.get(), **attrs})
+        try:
+            yield
+        finally:
+            _attributes.reset(token)
+
+    @contextmanager
+    def lane(self, name):
+        """Agrupa os spans da tarefa atual em uma linha própria do trace (ex.: um contexto do pool)."""
+        token = _lane.set(name)
+        try:
+            yield
+        finally:
+            _lane.reset(token)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        if not self.enabled:
+            yield
+            return
+        inicio = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException as e:
+            status = "error"
+            attrs["erro"] = str(e)[:200]
+            raise
+        finally:
+            self._record(name, inicio, time.perf_counter(), status, {**_attributes.get(), **attrs})
+
+    def gauge(self, name, value, **labels):
+        """Valor atual de uma métrica (ex.: heap de um contexto), exportado junto com os histogramas."""
+        if self.enabled:
+            with self._lock:
+                self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def _record(self, name, inicio, fim, status, attrs):
+        duracao = fim - inicio
+        with self._lock:
+            contagens, soma = self.histograms.get((name, status), ([0] * (len(BUCKETS) + 1), 0.0))
+            for i, limite in enumerate(BUCKETS):
+                if duracao <= limite:
+                    contagens[i] += 1
+            contagens[-1] += 1
+            self.histograms[(name, status)] = (contagens, soma + duracao)
+
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            lane = _lane.get()
+            tid = self.lanes.setdefault(lane, len(self.lanes) + 1)
+            self.events.append({
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": round((inicio - self._origin) * 1_000_000),
+                "dur": round(duracao * 1_000_000),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {**attrs, "status": status},
+            })
+
+    def chrome_trace(self):
+        """Eventos no formato Chrome trace-event (chrome://tracing, Perfetto)."""
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": lane}}
+            for lane, tid in self.lanes.items()
+        ]
+        return {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+
+    def prometheus(self):
+        """Histograma de duração por etapa no formato texto do Prometheus."""
+        linhas = [
+            "# HELP healthsync_span_duration_seconds Duração das etapas da automação",
+            "# TYPE healthsync_span_duration_seconds histogram",
+        ]
+        for (name, status), (contagens, soma) in sorted(self.histograms.items()):
+            labels = f'span="{name}",status="{status}"'
+            for limite, contagem in zip(BUCKETS, contagens):
+                linhas.append(f'healthsync_span_duration_seconds_bucket{{{labels},le="{limite}"}} {contagem}')
+            linhas.append(f'healthsync_span_duration_seconds_bucket{{{labels},le="+Inf"}} {contagens[-1]}')
+            linhas.append(f"healthsync_span_duration_seconds_sum{{{labels}}} {soma:.6f}")
+            linhas.append(f"healthsync_span_duration_seconds_count{{{labels}}} {contagens[-1]}")
+        tipos = set()
+        for (name, labels), valor in sorted(self.gauges.items()):
+            if name not in tipos:
+                tipos.add(name)
+                linhas.append(f"# TYPE {name} gauge")
+            rotulos = ",".join(f'{chave}="{valor_rotulo}"' for chave, valor_rotulo in labels)
+            linhas.append(f"{name}{{{rotulos}}} {valor}" if rotulos else f"{name} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def export(self, directory=None):
+        """Grava o trace da execução e o arquivo de métricas; retorna os caminhos gerados."""
+        if not self.enabled or not self.events:
+            return None
+        directory = directory or settings.TRACE_DIR
+        os.makedirs(directory, exist_ok=True)
+        trace_path = os.path.join(directory, f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        metrics_path = os.path.join(directory, "metrics.prom")
+        with open(trace_path, "w", encoding="utf-8") as arquivo:
+            json.dump(self.chrome_trace(), arquivo, ensure_ascii=False)
+        with open(metrics_path, "w", encoding="utf-8") as arquivo:
+            arquivo.write(self.prometheus())
+        if self.dropped:
+            logger.warning("Trace atingiu o limite de %s eventos; %s spans descartados", self.max_events, self.dropped)
+        logger.info("Trace gravado em %s e métricas em %s", trace_path, metrics_path)
+        return trace_path, metrics_path
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            self.histograms.clear()
+            self.gauges.clear()
+            self.lanes.clear()
+            self.dropped = 0
+            self._origin = time.perf_counter()
+
+
+tracer = LazyObject(lambda: Tracer(enabled=settings.TRACE_ENABLED))
+
+
+def traced(name):
+    """Decora uma corrotina para registrá-la como um span."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
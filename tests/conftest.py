@@ -1,8 +1,22 @@
 # Configurações para pytest
 import pytest
 from playwright.sync_api import sync_playwright
+from src.config.settings import settings
+from src.utils.autocomplete_cache import autocomplete_cache
+from tests.mock_esus import MockEsusServer, settings_for
 
 @pytest.fixture
 def mock_playwright():
     with sync_playwright() as p:
-        yield p
\ No newline at end of file
+        yield p
+
+@pytest.fixture
+def mock_esus(monkeypatch, tmp_path):
+    """Sobe o e-SUS simulado e aponta as configurações para ele durante o teste."""
+    # Opções de autocomplete resolvidas valem só dentro do teste
+    monkeypatch.setattr(autocomplete_cache, "path", str(tmp_path / "autocomplete.json"))
+    monkeypatch.setattr(autocomplete_cache, "entries", None)
+    with MockEsusServer() as server:
+        for chave, valor in settings_for(server).items():
+            monkeypatch.setattr(settings, chave, valor)
+        yield server
@@ -0,0 +1,16 @@
+# e-SUS simulado para testes e benchmarks sem acesso ao sistema real
+from tests.mock_esus.server import CBO_ESF, ENFERMEIRO, PASSWORD, UNIDADE, USERNAME, MockEsus, MockEsusServer, default_config
+
+
+def settings_for(server, paciente="PACIENTE MOCK 001"):
+    """Valores de settings que apontam a automação (e o notificador) para o servidor simulado."""
+    return {
+        "WEBSITE_URL": server.url,
+        "USERNAME": USERNAME,
+        "PASSWORD": PASSWORD,
+        "UNIDADE": UNIDADE,
+        "ENFERMEIRO": ENFERMEIRO,
+        "PACIENTE": paciente,
+        "TELEGRAM_API_URL": server.url.rstrip("/"),
+        "SESSION_CACHE": False,
+    }
@@ -0,0 +1,361 @@
+# Servidor local que imita o e-SUS para testes e benchmarks offline
+# Uso: python -m tests.mock_esus.server --port 8765 --latency-ms 80 --slots 24 --occupancy 0.5
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import date, datetime, timedelta
+from aiohttp import web
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+
+UNIDADE = "UBS MOCK CENTRO"
+ENFERMEIRO = "ANA MOCK SOUZA"
+CBO_ESF = "ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA"
+USERNAME = "mock.usuario"
+PASSWORD = "mock.senha"
+
+CIAPS = [
+    {"codigo": "A03", "descricao": "FEBRE", "inclui": "hipertermia, pirexia"},
+    {"codigo": "A04", "descricao": "DEBILIDADE / CANSAÇO GERAL", "inclui": "astenia, fadiga"},
+    {"codigo": "R05", "descricao": "TOSSE", "inclui": "tosse seca, tosse produtiva"},
+    {"codigo": "K86", "descricao": "HIPERTENSÃO SEM COMPLICAÇÕES", "inclui": "hipertensão essencial"},
+    {"codigo": "T90", "descricao": "DIABETES NÃO INSULINO-DEPENDENTE", "inclui": "diabetes tipo 2"},
+]
+
+
+def default_config():
+    """Configuração padrão do mock; qualquer chave pode ser sobrescrita na criação ou via /__mock/config."""
+    return {
+        "latency_ms": 0,  # Latência de cada chamada à API
+        "jitter_ms": 0,  # Variação aleatória somada à latência
+        "error_rate": 0.0,  # Fração de chamadas que respondem HTTP 503
+        "slots_per_day": 20,  # Tamanho da grade (horários por dia)
+        "slot_minutes": 30,
+        "start_hour": 7,
+        "occupancy": 0.5,  # Fração de horários já ocupados
+        "full_days": 0,  # Dias (a partir de base_date) totalmente lotados
+        "days_per_week": 5,
+        "base_date": None,  # AAAA-MM-DD; padrão: hoje
+        "session_dialog": False,  # Exibe o diálogo "Continuar" de sessão existente após o login
+        "session_ttl": 3600,
+        "cidadao_field": "nome",  # "nome" (Digite o nome completo do...) ou "cidadao" (Cidadão*)
+        "units": [
+            {"nome": "UBS MOCK NORTE", "cbos": ["MÉDICO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA"]},
+            {"nome": UNIDADE, "cbos": ["Enfermeiro da estratégia de saúde da família"]},
+        ],
+        "professionals": [
+            {"id": 1, "nome": ENFERMEIRO, "cbo": CBO_ESF},
+            {"id": 2, "nome": "ANA MOCK LIMA", "cbo": "TÉCNICO DE ENFERMAGEM"},
+            {"id": 3, "nome": "CARLOS MOCK PEREIRA", "cbo": "MÉDICO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA"},
+        ],
+        "patients": 200,  # Quantidade de cidadãos "PACIENTE MOCK NNN"
+    }
+
+
+class MockEsus:
+    """Estado e rotas do e-SUS simulado: login, lotações, agenda, lista de atendimentos e SOAP."""
+
+    def __init__(self, **config):
+        self.config = {**default_config(), **config}
+        self.reset()
+
+    def reset(self):
+        self.sessions = {}
+        self.appointments = {}
+        self.queue = {}
+        self.finished = []
+        self.messages = []
+        self.calls = {}
+        self._next_id = 1
+
+    # Dados derivados da configuração
+
+    def base_date(self):
+        valor = self.config["base_date"]
+        return date.fromisoformat(valor) if valor else date.today()
+
+    def patients(self):
+        return [{"id": i, "nome": f"PACIENTE MOCK {i:03d}"} for i in range(1, self.config["patients"] + 1)]
+
+    def times(self):
+        inicio = datetime(2000, 1, 1, self.config["start_hour"])
+        passo = timedelta(minutes=self.config["slot_minutes"])
+        return [(inicio + passo * i).strftime("%H:%M") for i in range(self.config["slots_per_day"])]
+
+    def _occupied(self, profissional_id, dia, horario):
+        """Ocupação determinística: o mesmo dia/horário está sempre livre ou ocupado."""
+        if (dia - self.base_date()).days < self.config["full_days"]:
+            return True
+        chave = f"{profissional_id}:{dia.isoformat()}:{horario}".encode()
+        return int(hashlib.sha256(chave).hexdigest()[:8], 16) / 0xFFFFFFFF < self.config["occupancy"]
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    # Sessão
+
+    def _session(self, request):
+        token = request.cookies.get("MOCK_SESSION")
+        sessao = self.sessions.get(token)
+        if sessao and time.time() - sessao["created"] < self.config["session_ttl"]:
+            return sessao
+        return None
+
+    # Operações "GraphQL"
+
+    def op_sessao(self, sessao, variables):
+        if not sessao:
+            return {"autenticado": False}
+        return {"autenticado": True, "lotacao": sessao.get("lotacao"), "dialogo": sessao.pop("dialogo", False)}
+
+    def op_lotacoes(self, sessao, variables):
+        return [{"index": i, **unidade} for i, unidade in enumerate(self.config["units"])]
+
+    def op_selecionar_lotacao(self, sessao, variables):
+        sessao["lotacao"] = self.config["units"][int(variables["index"])]["nome"]
+        return {"ok": True}
+
+    def op_profissionais(self, sessao, variables):
+        busca = (variables.get("query") or "").lower()
+        return [p for p in self.config["professionals"] if busca in p["nome"].lower() or busca in p["cbo"].lower()]
+
+    def op_cidadaos(self, sessao, variables):
+        busca = (variables.get("query") or "").lower()
+        return [c for c in self.patients() if busca in c["nome"].lower()][:20]
+
+    def op_agenda(self, sessao, variables):
+        profissional_id = int(variables["profissionalId"])
+        dias = []
+        for valor in variables["datas"]:
+            dia = date.fromisoformat(valor)
+            agendados = {
+                a["horario"]: a for a in self.appointments.values()
+                if a["profissionalId"] == profissional_id and a["data"] == valor
+            }
+            dias.append({
+                "data": valor,
+                "horarios": [
+                    {"horario": h, "disponivel": h not in agendados and not self._occupied(profissional_id, dia, h)}
+                    for h in self.times()
+                ],
+                "agendamentos": list(agendados.values()),
+            })
+        return dias
+
+    def op_salvar_agendamento(self, sessao, variables):
+        chave = (int(variables["profissionalId"]), variables["data"], variables["horario"])
+        dia = date.fromisoformat(variables["data"])
+        if self._occupied(chave[0], dia, chave[2]) or any(
+            (a["profissionalId"], a["data"], a["horario"]) == chave for a in self.appointments.values()
+        ):
+            raise ValueError("Horário indisponível")
+        cidadao = next(c for c in self.patients() if c["id"] == int(variables["cidadaoId"]))
+        agendamento = {
+            "id": self._new_id(),
+            "profissionalId": chave[0],
+            "data": chave[1],
+            "horario": chave[2],
+            "cidadao": cidadao["nome"],
+        }
+        self.appointments[agendamento["id"]] = agendamento
+        return agendamento
+
+    def op_cancelar_agendamento(self, sessao, variables):
+        return {"ok": self.appointments.pop(int(variables["id"]), None) is not None}
+
+    def op_lista_atendimento(self, sessao, variables):
+        return list(self.queue.values())
+
+    def op_adicionar_atendimento(self, sessao, variables):
+        cidadao = next(c for c in self.patients() if c["id"] == int(variables["cidadaoId"]))
+        profissional = next(p for p in self.config["professionals"] if p["id"] == int(variables["profissionalId"]))
+        item = {
+            "id": self._new_id(),
+            "cidadao": cidadao["nome"],
+            "profissional": profissional["nome"],
+            "tipo": variables.get("tipo"),
+            "status": "AGUARDANDO",
+        }
+        self.queue[item["id"]] = item
+        return item
+
+    def op_ciap(self, sessao, variables):
+        busca = (variables.get("query") or "").lower()
+        return [c for c in CIAPS if busca in c["codigo"].lower() or busca in c["descricao"].lower()]
+
+    def op_finalizar_atendimento(self, sessao, variables):
+        item = self.queue.pop(int(variables["id"]))
+        item.update(status="FINALIZADO", problemas=variables.get("problemas"), alta=variables.get("alta"))
+        self.finished.append(item)
+        return {"ok": True}
+
+    OPERATIONS = {
+        "Sessao": ("op_sessao", False),
+        "Lotacoes": ("op_lotacoes", True),
+        "SelecionarLotacao": ("op_selecionar_lotacao", True),
+        "Profissionais": ("op_profissionais", True),
+        "Cidadaos": ("op_cidadaos", True),
+        "Agenda": ("op_agenda", True),
+        "SalvarAgendamento": ("op_salvar_agendamento", True),
+        "CancelarAgendamento": ("op_cancelar_agendamento", True),
+        "ListaAtendimento": ("op_lista_atendimento", True),
+        "AdicionarAtendimento": ("op_adicionar_atendimento", True),
+        "Ciap": ("op_ciap", True),
+        "FinalizarAtendimento": ("op_finalizar_atendimento", True),
+    }
+
+    # Rotas HTTP
+
+    async def _delay(self):
+        atraso = self.config["latency_ms"] + secrets.randbelow(self.config["jitter_ms"] + 1)
+        if atraso:
+            await asyncio.sleep(atraso / 1000)
+
+    async def graphql(self, request):
+        corpo = await request.json()
+        nome = corpo.get("operationName")
+        self.calls[nome] = self.calls.get(nome, 0) + 1
+        await self._delay()
+        if self.config["error_rate"] and secrets.randbelow(10_000) < self.config["error_rate"] * 10_000:
+            return web.json_response({"errors": [{"message": "Serviço indisponível"}]}, status=503)
+        if nome not in self.OPERATIONS:
+            return web.json_response({"errors": [{"message": f"Operação desconhecida: {nome}"}]}, status=400)
+        metodo, exige_sessao = self.OPERATIONS[nome]
+        sessao = self._session(request)
+        if exige_sessao and not sessao:
+            return web.json_response({"errors": [{"message": "Sessão expirada"}]}, status=401)
+        try:
+            dados = getattr(self, metodo)(sessao, corpo.get("variables") or {})
+        except (ValueError, KeyError, StopIteration) as e:
+            return web.json_response({"data": None, "errors": [{"message": str(e) or "Dados inválidos"}]})
+        return web.json_response({"data": {nome: dados}})
+
+    async def login(self, request):
+        corpo = await request.json()
+        await self._delay()
+        if (corpo.get("usuario"), corpo.get("senha")) != (USERNAME, PASSWORD):
+            return web.json_response({"ok": False}, status=401)
+        token = secrets.token_hex(16)
+        self.sessions[token] = {"created": time.time(), "lotacao": None, "dialogo": self.config["session_dialog"]}
+        resposta = web.json_response({"ok": True})
+        resposta.set_cookie("MOCK_SESSION", token, httponly=True)
+        return resposta
+
+    async def telegram(self, request):
+        """Stub do sendMessage da Bot API, para que as notificações não saiam da máquina."""
+        dados = await request.post() if request.content_type != "application/json" else await request.json()
+        self.messages.append(dados["text"])
+        return web.json_response({"ok": True, "result": {
+            "message_id": len(self.messages), "date": int(time.time()),
+            "chat": {"id": int(dados["chat_id"]), "type": "group"}, "text": dados["text"],
+        }})
+
+    async def index(self, request):
+        with open(os.path.join(STATIC_DIR, "index.html"), encoding="utf-8") as arquivo:
+            html = arquivo.read()
+        config = {**self.config, "base_date": self.base_date().isoformat(), "times": self.times()}
+        html = html.replace("/*MOCK_CONFIG*/", f"window.MOCK_CONFIG = {json.dumps(config, ensure_ascii=False)};")
+        return web.Response(text=html, content_type="text/html")
+
+    async def update_config(self, request):
+        self.config.update(await request.json())
+        return web.json_response(self.config)
+
+    async def reset_state(self, request):
+        self.reset()
+        return web.json_response({"ok": True})
+
+    async def state(self, request):
+        return web.json_response({
+            "appointments": list(self.appointments.values()),
+            "queue": list(self.queue.values()),
+            "finished": self.finished,
+            "messages": self.messages,
+            "calls": self.calls,
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/api/graphql", self.graphql)
+        app.router.add_post("/api/login", self.login)
+        app.router.add_post("/bot{token}/sendMessage", self.telegram)
+        app.router.add_post("/__mock/config", self.update_config)
+        app.router.add_post("/__mock/reset", self.reset_state)
+        app.router.add_get("/__mock/state", self.state)
+        app.router.add_static("/static", STATIC_DIR)
+        app.router.add_get("/{tail:.*}", self.index)
+        return app
+
+
+class MockEsusServer:
+    """Executa o MockEsus em uma thread própria, para uso em testes e benchmarks."""
+
+    def __init__(self, host="127.0.0.1", port=0, **config):
+        self.mock = MockEsus(**config)
+        self.host = host
+        self.port = port
+        self.url = None
+        self._loop = None
+        self._thread = None
+        self._runner = None
+
+    def start(self):
+        iniciado = threading.Event()
+
+        def executar():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.mock.app())
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, self.host, self.port)
+            self._loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            self.url = f"http://{self.host}:{self.port}/"
+            iniciado.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=executar, name="mock-esus", daemon=True)
+        self._thread.start()
+        iniciado.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="e-SUS simulado para testes e benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--jitter-ms", type=int, default=0)
+    parser.add_argument("--slots", type=int, default=20, help="Horários por dia na grade")
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--full-days", type=int, default=0)
+    parser.add_argument("--session-dialog", action="store_true")
+    args = parser.parse_args()
+    mock = MockEsus(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slots_per_day=args.slots,
+        occupancy=args.occupancy, full_days=args.full_days, session_dialog=args.session_dialog,
+    )
+    print(f"e-SUS simulado em http://{args.host}:{args.port}/ (usuário {USERNAME} / senha {PASSWORD})")
+    web.run_app(mock.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
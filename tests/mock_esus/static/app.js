@@ -0,0 +1,451 @@
+// e-SUS APS simulado: reproduz a marcação que a automação usa (login, lotações, agenda, lista e SOAP)
+(() => {
+  const config = window.MOCK_CONFIG;
+  const root = document.getElementById('root');
+  const modalRoot = document.getElementById('modal-root');
+  const WEEKDAYS = ['dom', 'seg', 'ter', 'qua', 'qui', 'sex', 'sáb'];
+  const state = {professional: null, date: config.base_date, mode: 'dia', atendimento: null};
+
+  const esc = value => String(value ?? '').replace(/[&<>"']/g, c => (
+    {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]
+  ));
+
+  // Datas no formato AAAA-MM-DD, sem depender do fuso do navegador
+  const parseDate = iso => new Date(`${iso}T12:00:00Z`);
+  const isoDate = date => date.toISOString().slice(0, 10);
+  const addDays = (iso, days) => { const d = parseDate(iso); d.setUTCDate(d.getUTCDate() + days); return isoDate(d); };
+  const shortDate = iso => `${iso.slice(8, 10)}/${iso.slice(5, 7)}`;
+  const longDate = iso => `${shortDate(iso)}/${iso.slice(0, 4)}`;
+  const weekday = iso => WEEKDAYS[parseDate(iso).getUTCDay()];
+
+  function toast(message) {
+    const alert = document.createElement('div');
+    alert.setAttribute('role', 'alert');
+    alert.textContent = message;
+    document.body.appendChild(alert);
+    setTimeout(() => alert.remove(), 3000);
+  }
+
+  async function api(operationName, variables = {}) {
+    const response = await fetch('/api/graphql', {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify({operationName, variables}),
+    });
+    const body = await response.json().catch(() => ({}));
+    if (response.status === 401) {
+      closeModal();
+      renderLogin();
+      throw new Error('Sessão expirada');
+    }
+    if (!response.ok || body.errors) {
+      const message = body.errors ? body.errors[0].message : `HTTP ${response.status}`;
+      toast(message);
+      throw new Error(message);
+    }
+    return body.data[operationName];
+  }
+
+  function openModal(html) {
+    modalRoot.innerHTML = `<div class="overlay">${html}</div>`;
+    return modalRoot.querySelector('[role=dialog]');
+  }
+
+  function closeModal() {
+    modalRoot.innerHTML = '';
+  }
+
+  document.addEventListener('keydown', event => {
+    if (event.key === 'Escape' && modalRoot.innerHTML) closeModal();
+  });
+
+  // Autocomplete no padrão do e-SUS: textbox + listbox com role=option, teclado e clique
+  function autocomplete(container, {label, testid, search, option, text, onSelect}) {
+    container.innerHTML = `<div class="autocomplete"><input aria-label="${esc(label)}" ${testid ? `data-testid="${esc(testid)}"` : ''} autocomplete="off"><ul role="listbox"></ul></div>`;
+    const input = container.querySelector('input');
+    const listbox = container.querySelector('[role=listbox]');
+    let items = [];
+    let active = -1;
+    let sequence = 0;
+
+    const close = () => { items = []; active = -1; listbox.innerHTML = ''; };
+    const highlight = () => listbox.querySelectorAll('[role=option]').forEach((el, i) => el.setAttribute('aria-selected', String(i === active)));
+    const select = index => {
+      const item = items[index];
+      if (!item) return;
+      input.value = text(item);
+      close();
+      onSelect(item);
+    };
+
+    input.addEventListener('input', async () => {
+      const current = ++sequence;
+      const query = input.value.trim();
+      if (!query) return close();
+      const results = await search(query);
+      if (current !== sequence) return;
+      items = results;
+      active = -1;
+      listbox.innerHTML = results.map((item, i) => `<li role="option" aria-selected="false" data-index="${i}">${option(item)}</li>`).join('');
+    });
+    input.addEventListener('keydown', event => {
+      if (!items.length) return;
+      if (event.key === 'ArrowDown') { active = Math.min(active + 1, items.length - 1); highlight(); event.preventDefault(); }
+      if (event.key === 'ArrowUp') { active = Math.max(active - 1, 0); highlight(); event.preventDefault(); }
+      if (event.key === 'Enter' && active >= 0) { select(active); event.preventDefault(); }
+    });
+    listbox.addEventListener('mousedown', event => {
+      const el = event.target.closest('[role=option]');
+      if (!el) return;
+      event.preventDefault();
+      select(Number(el.dataset.index));
+    });
+    return input;
+  }
+
+  const professionalOption = p => `${esc(p.nome)}<span>${esc(p.cbo)}</span>`;
+  const citizenOption = c => `${esc(c.nome)}<span>CPF 000.000.000-${String(c.id % 100).padStart(2, '0')}</span>`;
+  const ciapOption = c => `<b>${esc(c.descricao)}</b> Código ${esc(c.codigo)} <small>Inclui: ${esc(c.inclui)}</small>`;
+
+  // Login: a aninhamento de divs reproduz os XPaths dos campos usados pela automação
+  function renderLogin() {
+    root.innerHTML = `
+      <div>
+        <div class="topbar">e-SUS APS</div>
+        <div><div class="cookies"><span>Este site utiliza cookies.</span><button type="button" id="aceitar">Aceitar todos</button></div></div>
+        <div class="login-page">
+          <div><div>
+            <div class="logo"><h1>Acesso ao sistema</h1></div>
+            <div><div><form>
+              <div>
+                <div><div>
+                  <div><div><div><input name="usuario" aria-label="CPF/Usuário"></div></div></div>
+                  <div class="erro" id="erro"></div>
+                </div></div>
+                <div><div><div><div>
+                  <div><div><div><input name="senha" type="password" aria-label="Senha"></div></div></div>
+                </div></div></div></div>
+                <div><button type="submit">Entrar</button></div>
+              </div>
+            </form></div></div>
+          </div></div>
+        </div>
+      </div>`;
+    root.querySelector('#aceitar').addEventListener('click', event => event.target.closest('.cookies').remove());
+    root.querySelector('form').addEventListener('submit', async event => {
+      event.preventDefault();
+      const form = event.target;
+      const response = await fetch('/api/login', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({usuario: form.usuario.value, senha: form.senha.value}),
+      });
+      if (!response.ok) {
+        root.querySelector('#erro').textContent = 'Usuário e/ou senha incorretos';
+        return;
+      }
+      boot();
+    });
+  }
+
+  function renderSessionDialog() {
+    const dialog = openModal(`<div role="dialog" aria-label="Sessão em uso"><p>Existe uma sessão aberta para este usuário em outro navegador.</p><button type="button">Continuar</button></div>`);
+    dialog.querySelector('button').addEventListener('click', () => { closeModal(); renderLotacoes(); });
+  }
+
+  async function renderLotacoes() {
+    const lotacoes = await api('Lotacoes');
+    root.innerHTML = `<div><main><h2>Selecione uma lotação</h2>${lotacoes.map(l => `
+      <section class="lotacao" data-index="${l.index}"><div><h3>${esc(l.nome)}</h3></div><div>${l.cbos.map(c => `<span>${esc(c)}</span>`).join('')}</div></section>`).join('')}
+    </main></div>`;
+    root.querySelectorAll('.lotacao').forEach(section => section.addEventListener('click', async () => {
+      await api('SelecionarLotacao', {index: Number(section.dataset.index)});
+      renderApp('inicio');
+    }));
+  }
+
+  function renderApp(view) {
+    root.innerHTML = `<div><nav><a href="#acompanhamentos" data-view="inicio">Acompanhamentos</a><a href="#agenda" data-view="agenda">Agenda</a><a href="#busca" data-view="inicio">Busca</a><a href="#lista" data-view="lista">Lista de atendimentos</a></nav><main></main></div>`;
+    root.querySelectorAll('nav a').forEach(link => link.addEventListener('click', event => {
+      event.preventDefault();
+      closeModal();
+      renderApp(link.dataset.view);
+    }));
+    const main = root.querySelector('main');
+    if (view === 'agenda') return renderAgenda(main);
+    if (view === 'lista') return renderLista(main);
+    if (view === 'atendimento') return renderAtendimento(main);
+    main.innerHTML = '<h1>Acompanhamentos</h1>';
+  }
+
+  // Agenda (react-big-calendar)
+
+  function renderAgenda(main) {
+    state.professional = null;
+    state.date = config.base_date;
+    state.mode = 'dia';
+    main.innerHTML = '<h1>Agenda</h1><div class="busca"></div><div class="calendario"><p>Selecione um profissional para ver a agenda.</p></div>';
+    autocomplete(main.querySelector('.busca'), {
+      label: 'Busque um profissional pelo nome, CPF, CNS ou CBO',
+      search: query => api('Profissionais', {query}),
+      option: professionalOption,
+      text: p => p.nome,
+      onSelect: p => { state.professional = p; loadCalendar(); },
+    });
+  }
+
+  function viewDates() {
+    if (state.mode === 'dia') return [state.date];
+    const date = parseDate(state.date);
+    const monday = addDays(state.date, -((date.getUTCDay() + 6) % 7));
+    return Array.from({length: config.days_per_week}, (_, i) => addDays(monday, i));
+  }
+
+  function viewLabel(dates) {
+    if (state.mode === 'dia') return `${weekday(dates[0])} ${longDate(dates[0])}`;
+    return `${longDate(dates[0])} – ${longDate(dates[dates.length - 1])}`;
+  }
+
+  async function loadCalendar() {
+    const container = root.querySelector('.calendario');
+    if (!container || !state.professional) return;
+    // A grade some enquanto os dados carregam e volta inteira, como no React
+    container.innerHTML = '<p>Carregando…</p>';
+    const dates = viewDates();
+    const dias = await api('Agenda', {profissionalId: state.professional.id, datas: dates});
+    if (!root.contains(container)) return;
+    container.innerHTML = calendarHtml(dates, dias);
+    bindCalendar(container, dias);
+  }
+
+  function calendarHtml(dates, dias) {
+    const times = config.times;
+    const gutter = times.map(t => `<div class="rbc-timeslot-group"><div class="rbc-time-slot"><span class="rbc-label">${t}</span></div></div>`).join('');
+    const columns = dias.map(dia => {
+      const slots = dia.horarios.map(h => h.disponivel
+        ? `<div class="rbc-timeslot-group"><div class="rbc-time-slot rbc-time-slot-available" data-date="${dia.data}" data-time="${h.horario}"><div class="rbc-time-slot-hover"><button type="button">+<span class="sr-only">Adicionar agendamento</span></button></div></div></div>`
+        : `<div class="rbc-timeslot-group"><div class="rbc-time-slot"></div></div>`).join('');
+      const events = dia.agendamentos.map(a => `
+        <div class="rbc-event" data-id="${a.id}" title="${a.horario}: ${esc(a.cidadao)}" style="top:${times.indexOf(a.horario) * 32}px;height:30px"><div class="rbc-event-content"><div>${esc(a.cidadao)}</div></div><button type="button" aria-haspopup="true" aria-label="Mais opções">⋮</button></div>`).join('');
+      return `<div class="rbc-day-slot rbc-time-column">${slots}<div class="rbc-events-container">${events}</div></div>`;
+    }).join('');
+    return `
+      <div class="rbc-calendar">
+        <div class="rbc-toolbar">
+          <span class="rbc-btn-group"><button type="button" data-nav="hoje">Hoje</button><button type="button" data-nav="-1">Anterior</button><button type="button" data-nav="1">Próximo</button></span>
+          <span class="rbc-toolbar-label">${viewLabel(dates)}</span>
+          <span class="rbc-btn-group"><button type="button" data-mode="dia">Dia</button><button type="button" data-mode="semana">Semana</button></span>
+        </div>
+        <div class="rbc-time-view">
+          <div class="rbc-time-header"><div class="rbc-label rbc-time-header-gutter"></div><div class="rbc-time-header-content"><div class="rbc-row rbc-time-header-cell">${dates.map(d => `<div class="rbc-header">${weekday(d)} ${shortDate(d)}</div>`).join('')}</div></div></div>
+          <div class="rbc-time-content"><div class="rbc-time-gutter rbc-time-column">${gutter}</div>${columns}</div>
+        </div>
+      </div>`;
+  }
+
+  function bindCalendar(container) {
+    container.querySelectorAll('[data-nav]').forEach(button => button.addEventListener('click', () => {
+      const passo = state.mode === 'dia' ? 1 : 7;
+      state.date = button.dataset.nav === 'hoje' ? config.base_date : addDays(state.date, Number(button.dataset.nav) * passo);
+      loadCalendar();
+    }));
+    container.querySelectorAll('[data-mode]').forEach(button => button.addEventListener('click', () => {
+      if (state.mode === button.dataset.mode) return;
+      state.mode = button.dataset.mode;
+      loadCalendar();
+    }));
+    container.querySelectorAll('.rbc-time-slot-hover button').forEach(button => button.addEventListener('click', () => {
+      const slot = button.closest('.rbc-time-slot');
+      openBooking(slot.dataset.date, slot.dataset.time);
+    }));
+    container.querySelectorAll('.rbc-event button[aria-haspopup]').forEach(button => button.addEventListener('click', event => {
+      event.stopPropagation();
+      openEventMenu(button, Number(button.closest('.rbc-event').dataset.id));
+    }));
+  }
+
+  function openBooking(data, horario) {
+    let cidadao = null;
+    const dialog = openModal(`
+      <div role="dialog" aria-label="Agendar consulta">
+        <h2>Agendar consulta</h2>
+        <p>${weekday(data)} ${longDate(data)} às ${horario} – ${esc(state.professional.nome)}</p>
+        <label>Cidadão*</label><div class="cidadao"></div>
+        <label class="check"><input type="checkbox" name="comprovante"><span></span>Imprimir comprovante ao salvar</label>
+        <footer><button type="button" data-acao="cancelar">Cancelar</button><button type="button" data-acao="salvar">Salvar</button></footer>
+      </div>`);
+    autocomplete(dialog.querySelector('.cidadao'), {
+      label: 'Cidadão*',
+      search: query => api('Cidadaos', {query}),
+      option: citizenOption,
+      text: c => c.nome,
+      onSelect: c => { cidadao = c; },
+    });
+    dialog.querySelector('[data-acao=cancelar]').addEventListener('click', closeModal);
+    dialog.querySelector('[data-acao=salvar]').addEventListener('click', async () => {
+      if (!cidadao) return toast('Selecione um cidadão');
+      await api('SalvarAgendamento', {profissionalId: state.professional.id, cidadaoId: cidadao.id, data, horario});
+      closeModal();
+      loadCalendar();
+    });
+  }
+
+  function openEventMenu(button, id) {
+    document.querySelectorAll('[role=menu]').forEach(menu => menu.remove());
+    const rect = button.getBoundingClientRect();
+    const menu = document.createElement('div');
+    menu.setAttribute('role', 'menu');
+    menu.style.top = `${rect.bottom + window.scrollY}px`;
+    menu.style.left = `${rect.left + window.scrollX - 80}px`;
+    menu.innerHTML = '<div role="menuitem"><div>Editar</div></div><div role="menuitem"><div>Cancelar</div></div>';
+    document.body.appendChild(menu);
+    menu.children[1].addEventListener('click', () => {
+      menu.remove();
+      const dialog = openModal(`<div role="dialog" aria-label="Cancelar agendamento"><p>Deseja excluir este agendamento?</p><footer><button type="button" data-acao="voltar">Voltar</button><button type="button" data-acao="excluir">Excluir</button></footer></div>`);
+      dialog.querySelector('[data-acao=voltar]').addEventListener('click', closeModal);
+      dialog.querySelector('[data-acao=excluir]').addEventListener('click', async () => {
+        await api('CancelarAgendamento', {id});
+        closeModal();
+        loadCalendar();
+      });
+    });
+    menu.children[0].addEventListener('click', () => menu.remove());
+  }
+
+  // Lista de atendimentos
+
+  async function renderLista(main) {
+    main.innerHTML = '<h1>Lista de atendimentos</h1><button type="button" data-testid="adicionarCidadaoAtendimento">Adicionar cidadão</button><div class="fila"><p>Carregando…</p></div>';
+    main.querySelector('[data-testid=adicionarCidadaoAtendimento]').addEventListener('click', openAdicionarCidadao);
+    await loadFila();
+  }
+
+  async function loadFila() {
+    const fila = root.querySelector('.fila');
+    if (!fila) return;
+    const itens = await api('ListaAtendimento');
+    fila.innerHTML = itens.length ? itens.map(item => `
+      <div class="linha" data-id="${item.id}"><div><span>${esc(item.cidadao)}</span> <small>${esc(item.profissional)} · ${esc(item.tipo)}</small></div><button type="button" title="Atender" aria-label="Atender">▶</button></div>`).join('')
+      : '<p>Nenhum cidadão aguardando atendimento.</p>';
+    fila.querySelectorAll('button[title=Atender]').forEach(button => button.addEventListener('click', () => {
+      const linha = button.closest('.linha');
+      state.atendimento = {id: Number(linha.dataset.id), cidadao: linha.querySelector('span').textContent};
+      renderApp('atendimento');
+    }));
+  }
+
+  function openAdicionarCidadao() {
+    const escolha = {cidadao: null, profissional: null};
+    const porNome = config.cidadao_field === 'nome';
+    const dialog = openModal(`
+      <div role="dialog" aria-label="Adicionar cidadão">
+        <h2>Adicionar cidadão</h2>
+        ${porNome ? `<div class="modo"><label class="check"><input type="radio" name="modo" value="cpf" checked><span></span>CPF/CNS</label><label class="check"><input type="radio" name="modo" value="nome"><span></span>Nome</label></div>` : '<label>Cidadão*</label>'}
+        <div class="cidadao"></div>
+        <div class="profissional"></div>
+        <div class="tipo">
+          <label class="check"><input type="radio" name="tipo" value="CONSULTA"><span></span>CONSULTA</label>
+          <label class="check"><input type="radio" name="tipo" value="DEMANDA ESPONTÂNEA"><span></span>DEMANDA ESPONTÂNEA</label>
+          <label class="check"><input type="radio" name="tipo" value="ESCUTA INICIAL"><span></span>ESCUTA INICIAL</label>
+        </div>
+        <footer><button type="button" data-acao="cancelar">Cancelar</button><button type="button" data-testid="adicionarAtendimento">Adicionar</button></footer>
+      </div>`);
+    const campoCidadao = label => autocomplete(dialog.querySelector('.cidadao'), {
+      label,
+      search: query => api('Cidadaos', {query}),
+      option: citizenOption,
+      text: c => c.nome,
+      onSelect: c => { escolha.cidadao = c; },
+    });
+    campoCidadao(porNome ? 'CPF ou CNS do cidadão' : 'Cidadão*');
+    if (porNome) {
+      dialog.querySelectorAll('input[name=modo]').forEach(radio => radio.addEventListener('change', () => {
+        campoCidadao(radio.value === 'nome' ? 'Digite o nome completo do cidadão' : 'CPF ou CNS do cidadão');
+      }));
+    }
+    autocomplete(dialog.querySelector('.profissional'), {
+      label: 'Profissional',
+      search: query => api('Profissionais', {query}),
+      option: professionalOption,
+      text: p => p.nome,
+      onSelect: p => { escolha.profissional = p; },
+    });
+    dialog.querySelector('[data-acao=cancelar]').addEventListener('click', closeModal);
+    dialog.querySelector('[data-testid=adicionarAtendimento]').addEventListener('click', async () => {
+      const tipo = dialog.querySelector('input[name=tipo]:checked');
+      if (!escolha.cidadao || !escolha.profissional || !tipo) return toast('Preencha cidadão, profissional e tipo de atendimento');
+      await api('AdicionarAtendimento', {cidadaoId: escolha.cidadao.id, profissionalId: escolha.profissional.id, tipo: tipo.value});
+      await loadFila();
+      closeModal();
+    });
+  }
+
+  // Atendimento individual (SOAP)
+
+  function renderAtendimento(main) {
+    const atendimento = state.atendimento;
+    const problemas = [];
+    let motivo = null;
+    main.innerHTML = `
+      <h1>Atendimento individual – ${esc(atendimento.cidadao)}</h1>
+      <div role="tablist"><button type="button" role="tab" aria-selected="false">Folha de rosto</button><button type="button" role="tab" aria-selected="false">SOAP</button><button type="button" role="tab" aria-selected="false">Finalização</button></div>
+      <div class="painel"><p>Selecione a aba SOAP para registrar o atendimento.</p></div>
+      <footer><button type="button" data-testid="AtendimentoIndividualFooter.cancelar">Cancelar atendimento</button><button type="button" data-testid="AtendimentoIndividualFooter.finalizar">Finalizar atendimento</button></footer>`;
+    const painel = main.querySelector('.painel');
+    const renderProblemas = () => {
+      main.querySelector('.problemas-lista').innerHTML = problemas.map((p, i) => `
+        <div class="linha"><span>${esc(p.codigo)} ${esc(p.descricao)}</span><label class="check"><input type="checkbox" data-index="${i}"><span></span>Alta do episódio</label></div>`).join('');
+      main.querySelectorAll('.problemas-lista input').forEach(input => input.addEventListener('change', () => {
+        problemas[Number(input.dataset.index)].alta = input.checked;
+      }));
+    };
+    main.querySelectorAll('[role=tab]').forEach(tab => tab.addEventListener('click', () => {
+      main.querySelectorAll('[role=tab]').forEach(t => t.setAttribute('aria-selected', String(t === tab)));
+      if (tab.textContent !== 'SOAP' || painel.querySelector('.soap')) return;
+      painel.innerHTML = `<div class="soap"><h3>Subjetivo</h3><div class="motivo"></div><h3>Avaliação</h3><div class="problemas"><div class="ciap"></div><button type="button" data-testid="ProblemasCondicoesFormFooterButtons.adicionar">Adicionar</button><div class="problemas-lista"></div></div></div>`;
+      autocomplete(painel.querySelector('.motivo'), {
+        label: 'Motivo da consulta (CIAP 2)',
+        search: query => api('Ciap', {query}),
+        option: ciapOption,
+        text: c => `${c.codigo} ${c.descricao}`,
+        onSelect: c => { motivo = c; },
+      });
+      let ciap = null;
+      const campoCiap = autocomplete(painel.querySelector('.ciap'), {
+        label: 'CIAP 2',
+        testid: 'ProblemasCondicoesForm.ciap',
+        search: query => api('Ciap', {query}),
+        option: ciapOption,
+        text: c => `${c.codigo} ${c.descricao}`,
+        onSelect: c => { ciap = c; },
+      });
+      painel.querySelector('[data-testid="ProblemasCondicoesFormFooterButtons.adicionar"]').addEventListener('click', () => {
+        if (!ciap) return toast('Informe o CIAP 2 do problema/condição');
+        problemas.push({...ciap, alta: false});
+        ciap = null;
+        campoCiap.value = '';
+        renderProblemas();
+      });
+    }));
+    main.querySelector('[data-testid="AtendimentoIndividualFooter.finalizar"]').addEventListener('click', async () => {
+      if (!motivo) return toast('Informe o motivo da consulta');
+      await api('FinalizarAtendimento', {
+        id: atendimento.id,
+        motivo: motivo.codigo,
+        problemas: problemas.map(p => p.codigo),
+        alta: problemas.map(p => p.alta),
+      }).catch(() => null);
+      renderApp('lista');
+    });
+  }
+
+  async function boot() {
+    const sessao = await api('Sessao');
+    if (!sessao.autenticado) return renderLogin();
+    if (sessao.dialogo) return renderSessionDialog();
+    if (!sessao.lotacao) return renderLotacoes();
+    renderApp('inicio');
+  }
+
+  boot();
+})();
@@ -0,0 +1,133 @@
+# Testes do controle adaptativo (AIMD) de fluxos simultâneos
+import asyncio
+import time
+from datetime import datetime
+import aiohttp
+import pytest
+from src.core.adaptive_limiter import AdaptiveLimiter, parse_schedule
+from src.core.context_pool import ContextPool
+from tests.mock_esus import MockEsusServer
+from tests.test_context_pool import FakeAutomation, FakeBrowser
+
+SUCESSO = {"status": "sucesso", "erro": None}
+TIMEOUT = {"status": "falha", "erro": "Timeout 15000ms exceeded."}
+
+
+def limitador(**kwargs):
+    opcoes = {"minimum": 1, "maximum": 8, "initial": 4, "latency_ms": 500, "error_rate": 0.1, "window": 2, "schedule": ""}
+    return AdaptiveLimiter(**{**opcoes, **kwargs})
+
+
+def janela(limiter, latencia_ms=100, status=200, resultado=SUCESSO, saturada=True):
+    limiter.saturated = saturada
+    for _ in range(limiter.window):
+        limiter.observe_latency(latencia_ms)
+        limiter.observe_status(status)
+        limiter.observe_flow(resultado)
+    return limiter.decisions[-1]
+
+
+def test_aumenta_um_e_cai_pela_metade():
+    limiter = limitador()
+    assert janela(limiter)["motivo"] == "aumento" and limiter.limit == 5
+    # Folga sem todos os fluxos em uso: não há motivo para subir
+    assert janela(limiter, saturada=False)["motivo"] == "mantido" and limiter.limit == 5
+    decisao = janela(limiter, latencia_ms=900)
+    assert (decisao["motivo"], decisao["p90_ms"], limiter.limit) == ("latencia", 900, 2)
+    assert janela(limiter, status=503)["motivo"] == "erros_5xx" and limiter.limit == 1
+    assert janela(limiter, resultado=TIMEOUT)["motivo"] == "timeouts" and limiter.limit == 1
+
+
+def test_tetos_por_horario():
+    assert parse_schedule("07:00-12:00=2, 13:00-17:30=3") == [(420, 720, 2), (780, 1050, 3)]
+    for invalida in ("7h-12h=2", "12:00-07:00=2", "07:00-12:00=0"):
+        with pytest.raises(ValueError, match="ADAPTIVE_SCHEDULE"):
+            parse_schedule(invalida)
+
+    agora = [datetime(2026, 10, 20, 9, 0)]
+    limiter = limitador(initial=6, schedule="07:00-12:00=2", clock=lambda: agora[0])
+    assert (limiter.ceiling(), limiter.current()) == (2, 2)
+    # No teto do horário o limite AIMD não continua subindo
+    limiter.limit = 2
+    assert janela(limiter)["motivo"] == "mantido" and limiter.limit == 2
+    agora[0] = datetime(2026, 10, 20, 12, 30)
+    assert limiter.current() == 2 and janela(limiter)["motivo"] == "aumento" and limiter.current() == 3
+
+
+class ObservedBrowser(FakeBrowser):
+    """Contextos que aceitam os listeners de rede do limitador."""
+
+    async def new_context(self, **kwargs):
+        context = await super().new_context(**kwargs)
+        context.eventos = []
+        context.on = lambda evento, handler: context.eventos.append(evento)
+        return context
+
+
+def test_pool_respeita_o_limite_vigente():
+    class ContandoAutomation(FakeAutomation):
+        simultaneos = 0
+        pico = 0
+
+        async def process_patient(self, page, entry):
+            self.simultaneos += 1
+            self.pico = max(self.pico, self.simultaneos)
+            try:
+                return await super().process_patient(page, entry)
+            finally:
+                self.simultaneos -= 1
+
+    async def cenario():
+        automation = ContandoAutomation()
+        limiter = limitador(initial=1, maximum=3, window=100)
+        browser = ObservedBrowser()
+        pool = ContextPool(browser, automation, size=3, governor=False, limiter=limiter)
+        await pool.start()
+        resultados = await pool.run([{"paciente": f"P{i}"} for i in range(6)])
+        stats = pool.stats()
+        await pool.close()
+        return browser, automation, resultados, stats
+
+    browser, automation, resultados, stats = asyncio.run(cenario())
+    assert len(resultados) == 6 and automation.pico == 1
+    assert all(c.eventos == ["requestfinished", "response", "requestfailed"] for c in browser.contexts)
+    assert stats["concorrencia"]["limite"] == 1 and stats["concorrencia"]["ativos"] == 0
+
+
+async def _fluxos(url, limiter, quantidade, chamadas=2):
+    """Fluxos simulados: cada um faz chamadas à API do mock dentro de uma vaga do limitador."""
+    async with aiohttp.ClientSession() as sessao:
+        async def fluxo():
+            await limiter.acquire()
+            resultado = dict(SUCESSO)
+            try:
+                for _ in range(chamadas):
+                    inicio = time.perf_counter()
+                    async with sessao.post(url, json={"operationName": "Ciap"}) as resposta:
+                        await resposta.read()
+                    limiter.observe_latency((time.perf_counter() - inicio) * 1000)
+                    limiter.observe_status(resposta.status)
+            finally:
+                await limiter.release(resultado)
+
+        await asyncio.gather(*(fluxo() for _ in range(quantidade)))
+
+
+def test_recua_com_latencia_e_erros_injetados_no_mock():
+    with MockEsusServer() as server:
+        url = server.url + "api/graphql"
+        limiter = limitador(initial=2, maximum=4, latency_ms=150, window=4)
+        asyncio.run(_fluxos(url, limiter, 8))
+        assert limiter.limit == 4
+
+        server.mock.config["latency_ms"] = 250
+        asyncio.run(_fluxos(url, limiter, 4))
+        assert limiter.decisions[-1]["motivo"] == "latencia" and limiter.limit == 2
+
+        server.mock.config.update(latency_ms=0, error_rate=1.0)
+        asyncio.run(_fluxos(url, limiter, 4))
+        assert limiter.decisions[-1]["motivo"] == "erros_5xx" and limiter.limit == 1
+
+        server.mock.config["error_rate"] = 0.0
+        asyncio.run(_fluxos(url, limiter, 4))
+    assert limiter.decisions[-1]["motivo"] == "aumento" and limiter.limit == 2
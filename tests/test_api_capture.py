@@ -0,0 +1,153 @@
+# Testes da captura das respostas da API, com payloads gravados do e-SUS simulado (tests/fixtures/api)
+import asyncio
+import json
+import os
+import aiohttp
+from aiohttp import web
+from src.core.api_capture import ApiCapture, Appointment, Professional, QueueEntry, Slot, agenda_slots, parse_payload
+from src.core.slot_scanner import SlotIndex
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "api")
+
+
+def gravacao(nome):
+    with open(os.path.join(FIXTURES, f"{nome}.json"), encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def ingerir(capture, *nomes):
+    for nome in nomes:
+        dados = gravacao(nome)
+        capture.ingest(dados["response"], dados["request"]["variables"])
+
+
+def test_agenda_vira_slots_e_agendamentos():
+    capture = ApiCapture()
+    ingerir(capture, "agenda")
+    assert [data for data, _ in capture.agenda["dias"]] == ["2026-10-19", "2026-10-20", "2026-10-21"]
+    assert capture.agenda["profissional_id"] == 1
+    assert capture.agenda["dias"][0][1][0] == Slot(data="2026-10-19", horario="07:00", disponivel=True, profissional_id=1)
+    assert list(capture.appointments.values()) == [
+        Appointment(id=2, data="2026-10-20", horario="07:30", cidadao="PACIENTE MOCK 007", profissional_id=1)
+    ]
+    assert capture.appointments_for("paciente mock 007", 1)
+
+
+def test_indices_da_grade_seguem_o_dom():
+    """Primeiro os grupos da coluna de horários, depois os de cada dia."""
+    capture = ApiCapture()
+    ingerir(capture, "agenda")
+    slots, grupos = agenda_slots(capture.agenda)
+    assert grupos == 4 * (3 + 1)
+    assert [s["index"] for s in slots[:5]] == [4, 5, 6, 7, 8]
+    index = SlotIndex(slots, {"label": "semana", "headers": ["seg 19/10", "ter 20/10", "qua 21/10"]})
+    assert index.pick()["time"] == "07:00"
+    assert index.pick("after", "08:00")["day_key"] == "ter 20/10"
+    assert index.full_days() == set()
+
+
+def test_profissional_pelo_cbo():
+    capture = ApiCapture()
+    ingerir(capture, "profissionais")
+    cbos = ("ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA", "ENFERMEIRO")
+    assert capture.professional("ana mock", cbos) == Professional(
+        id=1, nome="ANA MOCK SOUZA", cbo="ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA"
+    )
+    assert capture.professional("ana mock lima", cbos) is None
+    assert capture.professional("ana mock lima").cbo == "TÉCNICO DE ENFERMAGEM"
+
+
+def test_fila_completa_e_item_adicionado():
+    capture = ApiCapture()
+    ingerir(capture, "lista_atendimento", "adicionar_atendimento")
+    assert [item.cidadao for item in capture.queue] == ["PACIENTE MOCK 003", "PACIENTE MOCK 012"]
+    assert capture.queue_position("PACIENTE MOCK 012") == 1
+    assert capture.queue_position("PACIENTE MOCK 999") is None
+    # Uma nova consulta da lista substitui a fila inteira
+    capture.ingest({"data": {"ListaAtendimento": [
+        {"id": 3, "cidadao": "PACIENTE MOCK 012", "profissional": "ANA MOCK SOUZA", "status": "AGUARDANDO"},
+    ]}})
+    assert capture.queue_position("PACIENTE MOCK 012") == 0 and capture.queue_position("PACIENTE MOCK 003") is None
+
+
+def test_formatos_alternativos_e_respostas_ignoradas():
+    payload = {"data": {"fila": {"itens": [
+        {"uuid": "a1", "paciente": {"nome": "MARIA"}, "lotacao": {"nome": "ANA"}, "statusAtendimento": "AGUARDANDO"},
+    ]}}}
+    assert parse_payload(payload)["queue"] == [QueueEntry(id="a1", cidadao="MARIA", profissional="ANA", status="AGUARDANDO")]
+    capture = ApiCapture()
+    capture.ingest({"data": {"Cidadaos": [{"id": 1, "nome": "PACIENTE MOCK 001"}]}})
+    capture.ingest({"data": None, "errors": [{"message": "Horário indisponível"}]})
+    assert capture.stats == {"respostas": 0, "ignoradas": 2, "erros": 0}
+
+
+class GravacaoResponse:
+    """Adapta a resposta HTTP do stub à interface usada de playwright.async_api.Response."""
+
+    class Request:
+        def __init__(self, method, corpo):
+            self.method = method
+            self.post_data_json = corpo
+
+    def __init__(self, url, corpo, payload):
+        self.url = url
+        self.request = self.Request("POST", corpo)
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+
+async def _servir_gravacoes():
+    """Stub local que devolve os payloads gravados conforme o operationName da requisição."""
+    gravacoes = {}
+    for arquivo in os.listdir(FIXTURES):
+        dados = gravacao(arquivo[:-5])
+        gravacoes[dados["request"]["operationName"]] = dados["response"]
+
+    async def graphql(request):
+        corpo = await request.json()
+        return web.json_response(gravacoes[corpo["operationName"]])
+
+    app = web.Application()
+    app.router.add_post("/api/graphql", graphql)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+def test_captura_respostas_do_stub():
+    async def cenario():
+        runner, base = await _servir_gravacoes()
+        capture = ApiCapture(url_pattern="graphql")
+        try:
+            async with aiohttp.ClientSession() as session:
+
+                async def chamar(operacao, variables, url=f"{base}/api/graphql"):
+                    corpo = {"operationName": operacao, "variables": variables}
+                    async with session.post(f"{base}/api/graphql", json=corpo) as resposta:
+                        await capture._on_response(GravacaoResponse(url, corpo, await resposta.json()))
+
+                marca = capture.mark()
+                esperando = asyncio.create_task(capture.wait_agenda(marca, timeout=2000))
+                await chamar("Profissionais", {"query": "ana"}, url=f"{base}/static/app.js")
+                await chamar("Agenda", {"profissionalId": 1, "datas": ["2026-10-19", "2026-10-20", "2026-10-21"]})
+                agenda = await esperando
+                await chamar("ListaAtendimento", {})
+                await chamar("AdicionarAtendimento", {"cidadaoId": 12})
+        finally:
+            await runner.cleanup()
+        return capture, agenda
+
+    capture, agenda = asyncio.run(cenario())
+    assert agenda is capture.agenda and len(agenda["dias"]) == 3
+    assert capture.professionals == {}  # URL fora do padrão não é capturada
+    assert capture.queue_position("PACIENTE MOCK 012") == 1
+    assert capture.stats["respostas"] == 3
+
+
+def test_espera_sem_resposta_expira():
+    capture = ApiCapture()
+    assert asyncio.run(capture.wait_agenda(capture.mark(), timeout=50)) is None
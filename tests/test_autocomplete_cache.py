@@ -0,0 +1,127 @@
+# Testes do cache de resolução dos autocompletes (profissionais, cidadãos e CIAP)
+import asyncio
+import json
+import time
+import pytest
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError
+from src.core.agendamento import ScheduleAppointment
+from src.core.automation import WebsiteAutomation
+from src.utils.autocomplete_cache import AutocompleteCache, autocomplete_cache, label_pattern
+
+
+def novo_cache(tmp_path, **kwargs):
+    return AutocompleteCache(path=str(tmp_path / "autocomplete.json"), enabled=True, **kwargs)
+
+
+class FakeOption:
+    def __init__(self, page, padrao):
+        self.page = page
+        self.padrao = padrao
+
+    @property
+    def first(self):
+        return self
+
+    def filter(self, has_text):
+        return FakeOption(self.page, has_text)
+
+    async def click(self, timeout=None):
+        if not any(self.padrao.match(opcao) for opcao in self.page.opcoes):
+            raise TimeoutError("opção ausente")
+        self.page.cliques.append(self.padrao.pattern)
+
+
+class FakePage:
+    def __init__(self, opcoes):
+        self.opcoes = opcoes
+        self.cliques = []
+
+    def get_by_role(self, role):
+        return FakeOption(self, None)
+
+
+def test_chave_por_campo_busca_e_unidade(tmp_path):
+    cache = novo_cache(tmp_path)
+    cache.put("agenda.profissional", "Ana Mock", "UBS 1", "ANA MOCK\n ENFERMEIRO", cbo="ENFERMEIRO")
+    assert cache.get("agenda.profissional", " ana  mock ", "ubs 1") == {
+        "label": "ANA MOCK ENFERMEIRO", "cbo": "ENFERMEIRO", "salvo": pytest.approx(time.time(), abs=5),
+    }
+    assert cache.get("agenda.profissional", "Ana Mock", "UBS 2") is None
+    assert cache.get("lista.profissional", "Ana Mock", "UBS 1") is None
+    assert cache.stats()["por_campo"] == {
+        "agenda.profissional": {"acertos": 1, "falhas": 1}, "lista.profissional": {"acertos": 0, "falhas": 1},
+    }
+
+
+def test_validade_e_descarte_dos_menos_usados(tmp_path):
+    cache = novo_cache(tmp_path, ttl=60, max_entries=2)
+    for nome in ("A", "B"):
+        cache.put("lista.cidadao", nome, None, nome)
+    cache.get("lista.cidadao", "A")  # A passa a ser a mais recente
+    cache.put("lista.cidadao", "C", None, "C")
+    assert [e["label"] for e in cache.entries.values()] == ["A", "C"]
+    cache.entries[cache.key("lista.cidadao", "A")]["salvo"] -= 120
+    assert cache.get("lista.cidadao", "A") is None and len(cache.entries) == 1
+
+
+def test_persistido_entre_execucoes(tmp_path):
+    primeira = novo_cache(tmp_path)
+    primeira.put("agenda.profissional", "ANA", "UBS", "ANA MOCK ENFERMEIRO")
+    primeira.put("agenda.cidadao", "MARIA", "UBS", "MARIA")
+    primeira.save()
+    # Outra execução em paralelo grava depois e remove uma entrada que não aparecia mais
+    segunda = novo_cache(tmp_path)
+    segunda.invalidate("agenda.cidadao", "MARIA", "UBS")
+    segunda.put("lista.cidadao", "JOSE", "UBS", "JOSE")
+    primeira.put("soap.ciap", "A03", None, "FEBRE Código A03")
+    primeira.save()
+    segunda.save()
+    salvas = json.loads((tmp_path / "autocomplete.json").read_text(encoding="utf-8"))
+    assert sorted(salvas) == ["agenda.profissional|ana|ubs", "lista.cidadao|jose|ubs", "soap.ciap|a03|"]
+    assert novo_cache(tmp_path).get("agenda.profissional", "ANA", "UBS")["label"] == "ANA MOCK ENFERMEIRO"
+
+
+def test_opcao_em_cache_clicada_direto_ou_descartada(tmp_path):
+    cache = novo_cache(tmp_path)
+    cache.put("agenda.profissional", "ANA", "UBS", "ANA MOCK ENFERMEIRO")
+    # Nome e CBO em elementos separados: o texto da opção pode vir sem o espaço
+    page = FakePage(["ANA MOCK ENFERMEIRO DA ESTRATÉGIA DE SAÚDE DA FAMÍLIA", "ANA MOCKENFERMEIRO"])
+    assert asyncio.run(cache.pick(page, "agenda.profissional", "ANA", "UBS"))["label"] == "ANA MOCK ENFERMEIRO"
+    assert len(page.cliques) == 1
+
+    assert asyncio.run(cache.pick(FakePage(["ANA MOCK TÉCNICO"]), "agenda.profissional", "ANA", "UBS")) is None
+    assert cache.get("agenda.profissional", "ANA", "UBS") is None
+    assert label_pattern("ANA MOCK").match("ANA MOCK") and not label_pattern("ANA MOCK").match("ANA MOCK SOUZA")
+
+
+def test_desligado_nao_guarda_nem_conta(tmp_path):
+    cache = AutocompleteCache(path=str(tmp_path / "autocomplete.json"), enabled=False)
+    cache.put("lista.cidadao", "MARIA", None, "MARIA")
+    assert cache.get("lista.cidadao", "MARIA") is None and cache.stats()["falhas"] == 0
+    cache.save()
+    assert not (tmp_path / "autocomplete.json").exists()
+
+
+async def _agendar(pacientes):
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f"Chromium do Playwright indisponível: {e}")
+        try:
+            automation = WebsiteAutomation()
+            context = await automation.new_context(browser)
+            page = await context.new_page()
+            await automation.login(page)
+            for paciente in pacientes:
+                await ScheduleAppointment(paciente=paciente).schedule_appointment(page)
+        finally:
+            await browser.close()
+
+
+def test_profissional_resolvido_uma_vez_no_mock(mock_esus, monkeypatch):
+    monkeypatch.setattr(autocomplete_cache, "enabled", True)
+    monkeypatch.setattr(autocomplete_cache, "por_campo", {})
+    asyncio.run(_agendar(["PACIENTE MOCK 001", "PACIENTE MOCK 002"]))
+    assert autocomplete_cache.por_campo["agenda.profissional"] == {"acertos": 1, "falhas": 1}
+    assert len(mock_esus.mock.appointments) == 2
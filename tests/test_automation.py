@@ -1,18 +1,41 @@
 # Testes unitários para a automação
+import asyncio
 import pytest
+from playwright.async_api import async_playwright, Error as PlaywrightError
 from src.core.automation import WebsiteAutomation
 from src.config.settings import settings
 
-def test_login_success(mock_playwright):
-    """Testa o fluxo de login com mocks."""
-    automation = WebsiteAutomation()
-    # Aqui você pode mockar o Playwright para simular o login
-    # Por simplicidade, apenas verificamos se roda sem erro
-    try:
-        automation.login()
-        assert True
-    except Exception:
-        assert False, "Login falhou inesperadamente"
+async def _login():
+    """Executa o login da automação em um Chromium headless; pula o teste se o navegador não estiver instalado."""
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f"Chromium do Playwright indisponível: {e}")
+        try:
+            page = await browser.new_page()
+            automation = WebsiteAutomation()
+            await automation.login(page)
+            navegacao = page.get_by_role("navigation").filter(has_text="AcompanhamentosAgendaBusca")
+            await navegacao.wait_for(state="visible", timeout=10000)
+            return automation.cbo
+        finally:
+            await browser.close()
+
+def test_login_success(mock_esus):
+    """Testa o fluxo de login completo (cookies, credenciais e unidade) no e-SUS simulado."""
+    assert asyncio.run(_login()) == "Enfermeiro da estratégia de saúde da família"
+
+def test_login_com_dialogo_de_sessao(mock_esus):
+    """O diálogo 'Continuar' de sessão existente é fechado antes da escolha da unidade."""
+    mock_esus.mock.config["session_dialog"] = True
+    assert asyncio.run(_login()) == "Enfermeiro da estratégia de saúde da família"
+
+def test_login_unidade_inexistente(mock_esus, monkeypatch):
+    """Falha com mensagem clara quando a unidade do .env não está entre as lotações."""
+    monkeypatch.setattr(settings, "UNIDADE", "UBS INEXISTENTE")
+    with pytest.raises(Exception, match="UBS INEXISTENTE"):
+        asyncio.run(_login())
 
 def test_settings_validation():
     """Testa a validação das configurações."""
@@ -20,4 +43,18 @@ def test_settings_validation():
     settings.WEBSITE_URL = None  # Simula configuração faltando
     with pytest.raises(ValueError):
         settings.validate()
-    settings.WEBSITE_URL = original_url  # Restaura para outros testes
\ No newline at end of file
+    settings.WEBSITE_URL = original_url  # Restaura para outros testes
+def test_login_falho_fecha_o_contexto(monkeypatch):
+    """Um login que falha não deixa o contexto aberto (o pool repete o login a cada sessão expirada)."""
+    from tests.test_context_pool import FakeBrowser
+
+    async def login_recusado(self, page):
+        raise Exception("Credenciais inválidas")
+
+    monkeypatch.setattr(WebsiteAutomation, "login", login_recusado)
+    automation = WebsiteAutomation()
+    monkeypatch.setattr(automation, "new_context", lambda browser, **kwargs: browser.new_context(**kwargs))
+    browser = FakeBrowser()
+    with pytest.raises(Exception, match="Credenciais inválidas"):
+        asyncio.run(automation.open_session(browser, use_cache=False))
+    assert len(browser.contexts) == 1 and browser.contexts[0].closed
@@ -0,0 +1,92 @@
+# Testes do perfil de navegador (headless e bloqueio de recursos)
+import asyncio
+import pytest
+from src.core.browser_profile import ESTIMATED_BYTES, FAST_ARGS, BrowserProfile
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.result = None
+
+    async def abort(self, error_code=None):
+        self.result = ("abort", error_code)
+
+    async def fallback(self):
+        self.result = ("fallback", None)
+
+class FakeContext:
+    def __init__(self, **options):
+        self.options = options
+        self.routes = []
+        self.init_scripts = []
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+class FakeBrowser:
+    async def new_context(self, **options):
+        return FakeContext(**options)
+
+def fast_profile():
+    return BrowserProfile("fast", block_types=["image", "font"], block_patterns=["google-analytics.com"])
+
+def test_perfil_fast_bloqueia_por_tipo_e_padrao_e_reporta():
+    """Imagens, fontes e analytics são abortados; GraphQL e documentos seguem."""
+    profile = fast_profile()
+    rotas = [
+        FakeRoute("https://esus.local/logo.png", "image"),
+        FakeRoute("https://esus.local/fonts/roboto.woff2", "font"),
+        FakeRoute("https://www.google-analytics.com/analytics.js", "script"),
+        FakeRoute("https://esus.local/api/graphql", "fetch"),
+        FakeRoute("https://esus.local/", "document"),
+    ]
+
+    async def cenario():
+        for rota in rotas:
+            await profile._route(rota)
+
+    asyncio.run(cenario())
+    assert [r.result[0] for r in rotas] == ["abort", "abort", "abort", "fallback", "fallback"]
+    relatorio = profile.report()
+    assert relatorio["bloqueadas"] == 3
+    assert relatorio["por_motivo"] == {"font": 1, "image": 1, "padrao": 1}
+    assert relatorio["bytes_economizados_estimados"] == ESTIMATED_BYTES["image"] + ESTIMATED_BYTES["font"] + ESTIMATED_BYTES["script"]
+
+def test_padrao_de_rota_so_intercepta_candidatos():
+    """A regex da rota cobre as extensões bloqueadas e os padrões, mas não a API."""
+    pattern = fast_profile().route_pattern()
+    assert pattern.search("https://esus.local/img/logo.PNG?v=3")
+    assert pattern.search("https://esus.local/fonts/roboto.woff2")
+    assert pattern.search("https://www.google-analytics.com/collect")
+    assert not pattern.search("https://esus.local/api/graphql")
+    assert not pattern.search("https://esus.local/static/app.css")
+
+def test_contexto_fast_recebe_opcoes_rotas_e_css_sem_animacoes():
+    """O contexto fast tem movimento reduzido, rota de bloqueio e o script que zera animações."""
+    async def cenario():
+        fast = await fast_profile().new_context(FakeBrowser(), storage_state={"cookies": []})
+        normal = await BrowserProfile("normal").new_context(FakeBrowser())
+        return fast, normal
+
+    fast, normal = asyncio.run(cenario())
+    assert fast.options["reduced_motion"] == "reduce"
+    assert fast.options["storage_state"] == {"cookies": []}
+    assert len(fast.routes) == 1 and "animation-duration: 0s" in fast.init_scripts[0]
+    assert normal.options == {} and normal.routes == [] and normal.init_scripts == []
+
+def test_headless_e_argumentos_por_perfil():
+    """O perfil normal mantém a janela visível; o fast é headless com argumentos ajustados."""
+    assert BrowserProfile("normal", headless=None).args == []
+    fast = BrowserProfile("fast")
+    assert fast.args == FAST_ARGS
+    assert BrowserProfile("fast", headless=False).headless is False
+    with pytest.raises(ValueError):
+        BrowserProfile("turbo")
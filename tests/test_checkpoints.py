@@ -0,0 +1,34 @@
+# Testes do armazenamento de checkpoints em SQLite
+from src.core.checkpoints import CheckpointStore, patient_key, run_key
+
+def test_registra_etapas_e_conta_tentativas(tmp_path):
+    """Falhas incrementam tentativas e a conclusão preserva os dados da etapa."""
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    store.mark("run", "p1", "agendamento", "falha", erro="timeout")
+    store.mark("run", "p1", "agendamento", "concluida", {"views_advanced": 2})
+    etapas = store.steps("run", "p1")
+    assert etapas["agendamento"]["status"] == "concluida"
+    assert etapas["agendamento"]["tentativas"] == 2
+    assert etapas["agendamento"]["dados"] == {"views_advanced": 2}
+    assert store.steps("outra", "p1") == {}
+
+def test_pacientes_concluidos_exigem_todas_as_etapas(tmp_path):
+    """Só entra em completed quem concluiu todas as etapas; o estado sobrevive à reabertura."""
+    path = str(tmp_path / "checkpoints.db")
+    store = CheckpointStore(path)
+    for etapa in ("a", "b"):
+        store.mark("run", "p1", etapa, "concluida")
+    store.mark("run", "p2", "a", "concluida")
+    store.close()
+    store = CheckpointStore(path)
+    assert store.completed("run", ("a", "b")) == {"p1"}
+    store.clear("run", ["p1"])
+    assert store.completed("run", ("a", "b")) == set()
+    assert store.steps("run", "p2")
+
+def test_chaves_de_paciente_e_execucao():
+    """A chave ignora maiúsculas; a mesma lista gera o mesmo identificador de execução."""
+    entrada = {"paciente": "Maria", "enfermeiro": "ANA", "unidade": "UBS A"}
+    assert patient_key(entrada) == patient_key({"paciente": "MARIA", "enfermeiro": "ana", "unidade": "ubs a"})
+    assert run_key([entrada]) == run_key([dict(entrada)])
+    assert run_key([entrada]) != run_key([entrada, {"paciente": "João"}])
@@ -0,0 +1,128 @@
+# Testes da linha de comando por subcomandos e da partida sem efeitos na importação
+import io
+import json
+import os
+import subprocess
+import sys
+import pytest
+from src import cli
+from src.config.settings import REQUIRED, Settings, settings
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configurar(monkeypatch, **valores):
+    """Define todas as variáveis obrigatórias (ou os valores dados), independente do .env do desenvolvedor."""
+    for escopo in REQUIRED.values():
+        for campo in escopo:
+            monkeypatch.setattr(settings, campo, valores.pop(campo, f"{campo.lower()}-teste"))
+    for campo, valor in valores.items():
+        monkeypatch.setattr(settings, campo, valor)
+
+
+def runner_har(unidade, entradas, pool_size, run_id=None, fresh=False):
+    """Runner do processo filho que devolve o modo HAR visto pelo shard, sem abrir o navegador."""
+    har = [settings.HAR_MODE, settings.HAR_PATH, settings.HAR_TIMING]
+    return [{"paciente": e["paciente"], "enfermeiro": e["enfermeiro"], "status": "sucesso", "har": har} for e in entradas]
+
+
+def python(codigo, **env):
+    processo = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, env={**os.environ, **env},
+    )
+    assert processo.returncode == 0, processo.stderr
+    return processo.stdout.split()
+
+
+def test_importar_nao_carrega_configuracoes_nem_dependencias_pesadas():
+    carregado, playwright, aiogram = python(
+        "import sys, src.cli; from src.config.settings import settings; "
+        "print('_loaded' in settings.__dict__, 'playwright' in sys.modules, 'aiogram' in sys.modules)"
+    )
+    assert (carregado, playwright, aiogram) == ("False", "False", "False")
+    # O atendimento só importa o aiogram quando há notificação a enviar
+    assert python("import sys, src.core.atendimento; print('aiogram' in sys.modules)") == ["False"]
+
+
+def test_importar_a_automacao_nao_tem_efeitos_colaterais(tmp_path):
+    """Logger, tracer e caches são criados no primeiro uso: sem .env lido, src/logs ou thread do listener."""
+    codigo = (
+        "import threading, src.core.automation, src.core.daemon, src.core.sharding; "
+        "from src.config.settings import settings; "
+        "print('_loaded' in settings.__dict__, threading.active_count())"
+    )
+    processo = subprocess.run([sys.executable, "-c", codigo], cwd=tmp_path, capture_output=True, text=True,
+                              env={**os.environ, "PYTHONPATH": RAIZ})
+    assert processo.returncode == 0, processo.stderr
+    assert processo.stdout.split() == ["False", "1"]
+    assert not (tmp_path / "src").exists()
+
+
+def test_configuracoes_lidas_no_primeiro_acesso(monkeypatch):
+    monkeypatch.setenv("POOL_SIZE", "7")
+    novas = Settings()
+    assert "POOL_SIZE" not in novas.__dict__
+    novas.HAR_MODE = "replay"  # Atribuído antes da leitura: prevalece sobre o ambiente
+    assert novas.POOL_SIZE == 7 and novas.HAR_MODE == "replay"
+    with pytest.raises(AttributeError):
+        novas.INEXISTENTE
+
+
+def test_validacao_por_escopo(monkeypatch):
+    configurar(monkeypatch, TELEGRAM_BOT_TOKEN=None, PACIENTE="")
+    assert settings.missing("site") == []
+    assert settings.missing() == ["PACIENTE", "TELEGRAM_BOT_TOKEN"]
+    with pytest.raises(ValueError, match="TELEGRAM_BOT_TOKEN"):
+        settings.validate(*cli.scopes_for("bot"))
+    # O replay do HAR não notifica: o token não é exigido
+    assert settings.missing(*cli.scopes_for("batch", replay=True)) == []
+    with pytest.raises(ValueError, match="Escopo"):
+        settings.missing("email")
+
+
+def test_check_config_relata_cada_subcomando(monkeypatch):
+    configurar(monkeypatch, PACIENTE=None)
+    saida = io.StringIO()
+    assert cli.check_config(out=saida) == 1
+    linhas = saida.getvalue().splitlines()
+    assert linhas[0] == "run: faltando PACIENTE"
+    assert linhas[1].startswith("batch: ok") and linhas[2].startswith("bot: ok")
+    assert settings.PASSWORD not in saida.getvalue()
+    assert cli.check_config("batch", out=io.StringIO()) == 0
+
+
+def test_subcomandos():
+    parser = cli.build_parser()
+    args = parser.parse_args(["batch", "pacientes.csv", "--pool-size", "3", "--replay-har", "s.har"])
+    assert (args.command, args.worklist, args.pool_size, args.replay_har) == ("batch", "pacientes.csv", 3, "s.har")
+    assert parser.parse_args(["bench"]).alvo == "imports"
+    with pytest.raises(SystemExit):
+        parser.parse_args(["batch", "x.csv", "--record-har", "s.har"])
+
+
+def test_senha_fora_do_log(tmp_path):
+    codigo = (
+        "from src.core.automation import WebsiteAutomation; WebsiteAutomation(); "
+        "from src.utils.logger import stop_logger; stop_logger()"
+    )
+    subprocess.run([sys.executable, "-c", codigo], cwd=tmp_path, capture_output=True, text=True,
+                   env={**os.environ, "PYTHONPATH": RAIZ, "PASSWORD": "senha-secreta", "CHECKPOINTS": "0"})
+    log = (tmp_path / "src" / "logs" / "app.log").read_text(encoding="utf-8")
+    assert "Usuário carregado" in log and "senha-secreta" not in log
+
+
+def test_batch_em_processos_herda_o_replay(tmp_path, monkeypatch):
+    """Os shards (spawn) recebem o --replay-har do coordenador, em vez de reler o .env e ir ao e-SUS."""
+    from src.core import sharding
+
+    configurar(monkeypatch, HAR_MODE=None, HAR_PATH="src/cache/sessao.har", HAR_TIMING="zero")
+    original = sharding.run_sharded
+    monkeypatch.setattr(sharding, "run_sharded", lambda entradas, **kwargs: original(entradas, runner=runner_har, **kwargs))
+    lista = tmp_path / "pacientes.csv"
+    lista.write_text("paciente,enfermeiro\nP0,ANA\nP1,BIA\n", encoding="utf-8")
+    saida = tmp_path / "resultados.jsonl"
+    argumentos = ["batch", str(lista), "--workers", "2", "--replay-har", "gravado.har", "--har-timing", "original", "--output", str(saida)]
+
+    assert cli.main(argumentos) == 0
+    resultados = [json.loads(linha) for linha in saida.read_text(encoding="utf-8").splitlines()]
+    assert [r["har"] for r in resultados] == [["replay", "gravado.har", "original"]] * 2
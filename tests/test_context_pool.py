@@ -0,0 +1,123 @@
+# Testes do pool de contextos com navegador e automação simulados
+import asyncio
+from src.core.context_pool import ContextPool
+
+class FakePage:
+    def __init__(self):
+        self.logged_out = False
+
+    async def goto(self, url):
+        pass
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.closed = False
+
+    async def new_page(self):
+        return self.page
+
+    async def storage_state(self):
+        return {"cookies": [], "origins": []}
+
+    async def close(self):
+        self.closed = True
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, **kwargs):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+class FakeAutomation:
+    url = "http://localhost"
+
+    def __init__(self, expire_for=None):
+        self.logins = 0
+        self.expire_for = expire_for
+
+    async def new_context(self, browser, **kwargs):
+        return await browser.new_context(**kwargs)
+
+    async def open_session(self, browser, use_cache=True):
+        self.logins += 1
+        context = await self.new_context(browser)
+        return context, await context.new_page()
+
+    async def process_patient(self, page, entry):
+        await asyncio.sleep(0.01)
+        if entry["paciente"] == self.expire_for and not getattr(page, "renewed", False):
+            page.logged_out = True
+            return {"paciente": entry["paciente"], "status": "falha"}
+        return {"paciente": entry["paciente"], "status": "sucesso"}
+
+    async def is_logged_out(self, page):
+        return page.logged_out
+
+def test_pool_preserva_ordem_e_reporta_estatisticas():
+    """Processa em paralelo mantendo a ordem dos resultados."""
+    async def cenario():
+        browser, automation = FakeBrowser(), FakeAutomation()
+        pool = ContextPool(browser, automation, size=3)
+        await pool.start()
+        resultados = await pool.run([{"paciente": f"P{i}"} for i in range(7)])
+        stats = pool.stats()
+        await pool.close()
+        return browser, automation, resultados, stats
+
+    browser, automation, resultados, stats = asyncio.run(cenario())
+    assert [r["paciente"] for r in resultados] == [f"P{i}" for i in range(7)]
+    assert automation.logins == 1
+    assert len(browser.contexts) == 3
+    assert stats["processados"] == 7 and stats["fila"] == 0
+    assert all(context.closed for context in browser.contexts)
+
+def test_pool_substitui_contexto_expirado():
+    """Renova a sessão e repete o paciente quando o contexto volta ao login."""
+    async def cenario():
+        browser, automation = FakeBrowser(), FakeAutomation(expire_for="P1")
+        pool = ContextPool(browser, automation, size=1)
+        await pool.start()
+        original = FakeContext.new_page
+
+        async def new_page(self):
+            self.page.renewed = True
+            return self.page
+
+        FakeContext.new_page = new_page
+        try:
+            resultados = await pool.run([{"paciente": "P0"}, {"paciente": "P1"}])
+        finally:
+            FakeContext.new_page = original
+        await pool.close()
+        return automation, pool, resultados
+
+    automation, pool, resultados = asyncio.run(cenario())
+    assert [r["status"] for r in resultados] == ["sucesso", "sucesso"]
+    assert pool.replaced == 1
+    assert automation.logins == 2
+
+def test_pool_mantem_o_contexto_quando_o_novo_login_falha():
+    """Um login que falha vira o resultado do paciente; o slot não fica com um contexto fechado."""
+    class LoginFalhaAutomation(FakeAutomation):
+        async def open_session(self, browser, use_cache=True):
+            if not use_cache:
+                raise Exception("Login recusado")
+            return await super().open_session(browser, use_cache)
+
+    async def cenario():
+        browser, automation = FakeBrowser(), LoginFalhaAutomation(expire_for="P1")
+        pool = ContextPool(browser, automation, size=1, governor=False)
+        await pool.start()
+        resultados = await pool.run([{"paciente": f"P{i}"} for i in range(3)])
+        contexto, _ = pool.contexts[0]
+        await pool.close()
+        return browser, resultados, contexto
+
+    browser, resultados, contexto = asyncio.run(cenario())
+    assert [r["status"] for r in resultados] == ["sucesso", "falha", "sucesso"]
+    assert resultados[1]["erro"] == "Login recusado"
+    assert contexto is browser.contexts[0] and len(browser.contexts) == 1
@@ -0,0 +1,133 @@
+# Testes do daemon com fila de jobs, com navegador e automação simulados
+import asyncio
+import aiohttp
+from src.core import pipeline as pipeline_module
+from src.core.daemon import AutomationDaemon
+from tests.test_context_pool import FakeAutomation, FakeBrowser
+
+
+class LentaAutomation(FakeAutomation):
+    """Registra as entradas recebidas e o pico de pacientes em paralelo."""
+
+    def __init__(self, falhar=None):
+        super().__init__()
+        self.entradas = []
+        self.em_execucao = 0
+        self.pico = 0
+        self.falhar = falhar
+        self.liberar = asyncio.Event()
+
+    async def process_patient(self, page, entry):
+        self.entradas.append(entry)
+        self.em_execucao += 1
+        self.pico = max(self.pico, self.em_execucao)
+        await self.liberar.wait()
+        self.em_execucao -= 1
+        if entry["paciente"] == self.falhar:
+            return {"paciente": entry["paciente"], "status": "falha", "erro": "Paciente não encontrado"}
+        return {"paciente": entry["paciente"], "status": "sucesso"}
+
+
+def test_respostas_e_limite_de_concorrencia():
+    async def cenario():
+        automation = LentaAutomation(falhar="P2")
+        daemon = AutomationDaemon(automation, concurrency=2, max_queue=5, browser=FakeBrowser())
+        await daemon.start()
+        respostas = {}
+
+        def reply_para(paciente):
+            async def reply(texto):
+                respostas.setdefault(paciente, []).append(texto)
+            return reply
+
+        jobs = [await daemon.submit("agendar", f"P{i}", reply=reply_para(f"P{i}")) for i in range(3)]
+        await asyncio.sleep(0.05)
+        executando = [job.status for job in jobs]
+        automation.liberar.set()
+        await daemon.close()
+        return automation, jobs, executando, respostas
+
+    automation, jobs, executando, respostas = asyncio.run(cenario())
+    assert executando == ["executando", "executando", "na_fila"]
+    assert automation.pico == 2 and automation.logins == 1
+    assert [job.status for job in jobs] == ["concluido", "concluido", "falha"]
+    assert "na fila: posição 1" in respostas["P2"][0]
+    assert "executando" in respostas["P0"][1] and "concluído" in respostas["P0"][2]
+    assert "Paciente não encontrado" in respostas["P2"][-1]
+    assert automation.entradas[0] == {"paciente": "P0", "etapas": ("agendamento",)}
+
+
+def test_fila_cheia_recusa_pedidos():
+    async def cenario():
+        automation = LentaAutomation()
+        daemon = AutomationDaemon(automation, concurrency=1, max_queue=1, browser=FakeBrowser())
+        await daemon.start()
+        respostas = []
+
+        async def reply(texto):
+            respostas.append(texto)
+
+        jobs = [await daemon.submit("atender", f"P{i}", "ANA", reply=reply) for i in range(3)]
+        await asyncio.sleep(0.02)
+        automation.liberar.set()
+        await asyncio.gather(*daemon.tasks)
+        jobs.append(await daemon.submit("fluxo", "P3", reply=reply))
+        await daemon.close()
+        return automation, jobs, respostas
+
+    automation, jobs, respostas = asyncio.run(cenario())
+    # P0 executa, P1 aguarda e a fila (1) fica cheia para P2; P3 cabe depois que a fila esvazia
+    assert [job.status for job in jobs] == ["concluido", "concluido", "recusado", "concluido"]
+    assert any(texto.startswith("Fila cheia") for texto in respostas)
+    assert automation.entradas[0] == {"paciente": "P0", "etapas": ("atendimento", "soap"), "enfermeiro": "ANA"}
+    assert automation.entradas[-1]["etapas"] is None
+
+
+def test_api_local():
+    async def cenario():
+        automation = LentaAutomation()
+        automation.liberar.set()
+        daemon = AutomationDaemon(automation, concurrency=1, max_queue=2, browser=FakeBrowser())
+        await daemon.start()
+        porta = await daemon.serve_http(port=0)
+        base = f"http://127.0.0.1:{porta}"
+        async with aiohttp.ClientSession() as sessao:
+            async with sessao.post(f"{base}/jobs", json={"tipo": "agendar", "paciente": "MARIA"}) as resposta:
+                criado = resposta.status, await resposta.json()
+            async with sessao.post(f"{base}/jobs", json={"tipo": "cancelar", "paciente": "MARIA"}) as resposta:
+                invalido = resposta.status
+            await asyncio.gather(*daemon.tasks)
+            async with sessao.get(f"{base}/jobs/{criado[1]['id']}") as resposta:
+                job = await resposta.json()
+            async with sessao.get(f"{base}/jobs/999") as resposta:
+                inexistente = resposta.status
+            async with sessao.get(f"{base}/status") as resposta:
+                status = await resposta.json()
+        await daemon.close()
+        return criado, invalido, job, inexistente, status
+
+    criado, invalido, job, inexistente, status = asyncio.run(cenario())
+    assert criado[0] == 202 and criado[1]["status"] == "na_fila"
+    assert invalido == 400 and inexistente == 404
+    assert job["status"] == "concluido" and job["paciente"] == "MARIA"
+    assert status["jobs"] == {"concluido": 1} and status["pool"]["processados"] == 1
+
+
+def test_pipeline_executa_apenas_as_etapas_do_job():
+    class Automation:
+        unidade = "UBS A"
+
+        async def is_logged_out(self, page):
+            return False
+
+    executadas = []
+
+    def etapa(nome):
+        async def executar(page, entry, concluidas):
+            executadas.append(nome)
+        return executar
+
+    steps = {nome: etapa(nome) for nome in pipeline_module.STEPS}
+    etapas = pipeline_module.PatientPipeline(Automation(), steps=steps, retries=0, backoff={"padrao": 0})
+    asyncio.run(etapas.run(None, {"paciente": "Maria", "etapas": ("atendimento", "soap")}))
+    assert executadas == ["atendimento", "soap"]
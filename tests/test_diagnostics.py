@@ -0,0 +1,118 @@
+# Testes dos pacotes de diagnóstico de falhas
+import asyncio
+import json
+import os
+import time
+import pytest
+from src.core import pipeline as pipeline_module
+from src.utils.diagnostics import Diagnostics
+
+
+class FakePage:
+    """Página com HTML e screenshot de tamanhos controlados e contagem das idas ao navegador."""
+
+    context = object()
+
+    def __init__(self, html="<html><body><h3>UBS</h3></body></html>", tela=b"\x89PNG" + b"0" * 100):
+        self.html = html
+        self.tela = tela
+        self.chamadas = []
+
+    async def content(self):
+        self.chamadas.append("content")
+        return self.html
+
+    async def evaluate(self, script):
+        self.chamadas.append("evaluate")
+        return {"url": "http://esus/lista", "title": "e-SUS", "buttons": ["Atender"], "inputs": []}
+
+    async def screenshot(self, **kwargs):
+        self.chamadas.append("screenshot")
+        return self.tela
+
+
+def capturar(diagnostics, page, motivo="soap", **contexto):
+    async def executar():
+        destino = await diagnostics.capture(page, motivo, erro=Exception("Botão não encontrado"), **contexto)
+        await diagnostics.flush()
+        return destino
+    return asyncio.run(executar())
+
+
+def test_pacote_com_uma_ida_ao_navegador_por_artefato(tmp_path):
+    diagnostics = Diagnostics(root=str(tmp_path), enabled=True, trace=False)
+    page = FakePage()
+    destino = capturar(diagnostics, page, paciente="Maria")
+    assert sorted(page.chamadas) == ["content", "evaluate", "screenshot"]
+    assert sorted(os.listdir(destino)) == ["page.html", "resumo.json", "screenshot.png"]
+    with open(os.path.join(destino, "resumo.json"), encoding="utf-8") as arquivo:
+        resumo = json.load(arquivo)
+    assert resumo["erro"] == "Botão não encontrado"
+    assert resumo["contexto"] == {"paciente": "Maria"}
+    assert resumo["tela"]["buttons"] == ["Atender"]
+    assert resumo["omitidos"] == []
+
+
+def test_limite_de_tamanho_do_pacote(tmp_path):
+    diagnostics = Diagnostics(root=str(tmp_path), enabled=True, trace=False, max_bundle_mb=0.001)  # ~1 KB
+    destino = capturar(diagnostics, FakePage(html="x" * 5000, tela=b"0" * 5000))
+    assert os.path.getsize(os.path.join(destino, "page.html")) == 1048
+    assert not os.path.exists(os.path.join(destino, "screenshot.png"))
+    with open(os.path.join(destino, "resumo.json"), encoding="utf-8") as arquivo:
+        assert json.load(arquivo)["omitidos"] == ["page.html (truncado)", "screenshot.png"]
+
+
+def test_retencao_e_limite_total(tmp_path):
+    diagnostics = Diagnostics(root=str(tmp_path), enabled=True, trace=False, max_mb=0.0005, keep_days=1)  # ~500 B
+    antigo = tmp_path / "antigo"
+    antigo.mkdir()
+    (antigo / "page.html").write_text("velho")
+    dois_dias = time.time() - 2 * 86400
+    os.utime(antigo, (dois_dias, dois_dias))
+
+    primeiro = capturar(diagnostics, FakePage(), motivo="primeiro")
+    assert not antigo.exists()  # fora da retenção
+    time.sleep(0.01)
+    segundo = capturar(diagnostics, FakePage(), motivo="segundo")
+    # Acima do limite total, o mais antigo sai e o mais recente sempre fica
+    assert not os.path.exists(primeiro) and os.path.exists(segundo)
+
+
+def test_falha_na_captura_nao_esconde_o_erro(tmp_path):
+    diagnostics = Diagnostics(root=str(tmp_path), enabled=True, trace=False)
+    assert capturar(diagnostics, object()) is None
+    assert os.listdir(tmp_path) == []
+    assert capturar(Diagnostics(root=str(tmp_path), enabled=False), FakePage()) is None
+
+
+def test_pipeline_captura_na_falha_definitiva(tmp_path, monkeypatch):
+    diagnostics = Diagnostics(root=str(tmp_path), enabled=True, trace=False)
+    monkeypatch.setattr(pipeline_module, "diagnostics", diagnostics)
+
+    class Automation:
+        unidade = "UBS A"
+
+        async def is_logged_out(self, page):
+            return False
+
+    class Keyboard:
+        async def press(self, key):
+            pass
+
+    page = FakePage()
+    page.keyboard = Keyboard()
+
+    async def falha(page, entry, concluidas):
+        raise Exception("SOAP indisponível")
+
+    steps = {nome: falha for nome in pipeline_module.STEPS}
+    etapas = pipeline_module.PatientPipeline(Automation(), steps=steps, retries=1, backoff={"padrao": 0})
+
+    async def executar():
+        with pytest.raises(Exception, match="SOAP indisponível"):
+            await etapas.run(page, {"paciente": "Maria", "enfermeiro": "ANA"})
+        await diagnostics.flush()
+
+    asyncio.run(executar())
+    # Uma captura por falha definitiva, não a cada tentativa
+    assert len(diagnostics.bundles) == 1 and diagnostics.bundles[0].endswith("agendamento")
@@ -0,0 +1,154 @@
+# Testes da gravação e do replay do tráfego em HAR
+import asyncio
+import base64
+import json
+import time
+import pytest
+from playwright.async_api import async_playwright, Error as PlaywrightError
+from src.config.settings import settings
+from src.core.automation import WebsiteAutomation
+from src.core.har_replay import HarSession, load_har, request_key, response_from
+from tests.mock_esus import MockEsusServer, settings_for
+
+URL = "http://esus.local/api/graphql"
+
+
+def _entry(corpo, resposta, tempo=0, **extra):
+    return {
+        "startedDateTime": "2026-10-20T10:00:00.000Z",
+        "time": tempo,
+        "request": {"method": "POST", "url": URL, "postData": {"mimeType": "application/json", "text": corpo}},
+        "response": {
+            "status": 200,
+            "headers": [{"name": "Content-Type", "value": "application/json"}, {"name": "Content-Length", "value": "999"}],
+            "content": {"mimeType": "application/json", "text": json.dumps(resposta), **extra},
+        },
+    }
+
+
+def gravar(tmp_path, entradas):
+    caminho = tmp_path / "sessao.har"
+    caminho.write_text(json.dumps({"log": {"version": "1.2", "entries": entradas}}), encoding="utf-8")
+    return str(caminho)
+
+
+class FakeRequest:
+    def __init__(self, post_data, method="POST", url=URL):
+        self.method = method
+        self.url = url
+        self.post_data = post_data
+
+
+class FakeRoute:
+    def __init__(self, post_data, **kwargs):
+        self.request = FakeRequest(post_data, **kwargs)
+        self.resposta = None
+        self.abortada = None
+
+    async def fulfill(self, status, headers, body):
+        self.resposta = (status, headers, json.loads(body))
+
+    async def abort(self, motivo):
+        self.abortada = motivo
+
+
+def servir(har, entradas, *corpos, **kwargs):
+    rotas = [FakeRoute(corpo, **kwargs) for corpo in corpos]
+
+    async def executar():
+        for rota in rotas:
+            await har._serve(rota, entradas)
+
+    asyncio.run(executar())
+    return rotas
+
+
+def test_respostas_na_ordem_gravada(tmp_path):
+    agenda = '{"operationName": "Agenda", "variables": {"profissionalId": 1}}'
+    caminho = gravar(tmp_path, [
+        _entry(agenda, {"data": {"Agenda": "antes"}}),
+        _entry('{"operationName": "SalvarAgendamento"}', {"data": {"SalvarAgendamento": {"id": 7}}}),
+        _entry(agenda, {"data": {"Agenda": "depois"}}),
+    ])
+    har = HarSession(mode="replay", path=caminho, timing="zero")
+    entradas, inicio = load_har(caminho)
+    assert inicio == "2026-10-20T10:00:00.000Z"
+    # O corpo é comparado como JSON: a ordem das chaves não importa
+    reordenado = '{"variables": {"profissionalId": 1}, "operationName": "Agenda"}'
+    rotas = servir(har, entradas, reordenado, '{"operationName": "SalvarAgendamento"}', agenda, agenda)
+    assert [r.resposta[2]["data"] for r in rotas] == [
+        {"Agenda": "antes"}, {"SalvarAgendamento": {"id": 7}}, {"Agenda": "depois"}, {"Agenda": "depois"},
+    ]
+    assert "content-length" not in rotas[0].resposta[1]
+    # Cada contexto começa do início da gravação
+    assert servir(har, load_har(caminho)[0], agenda)[0].resposta[2]["data"] == {"Agenda": "antes"}
+
+
+def test_requisicao_fora_do_har_e_abortada(tmp_path):
+    har = HarSession(mode="replay", path=gravar(tmp_path, [_entry("{}", {"ok": True})]), timing="zero")
+    rota = servir(har, load_har(har.path)[0], "{}", method="GET", url="http://esus.local/outra")[0]
+    assert rota.abortada == "internetdisconnected" and rota.resposta is None
+    assert har.report()["nao_encontradas"] == 1
+
+
+def test_tempos_originais_ou_zero(tmp_path):
+    caminho = gravar(tmp_path, [_entry("{}", {"ok": True}, tempo=120)])
+    for timing, minimo, maximo in (("original", 0.12, 1.0), ("zero", 0.0, 0.1)):
+        har = HarSession(mode="replay", path=caminho, timing=timing)
+        inicio = time.perf_counter()
+        servir(har, load_har(caminho)[0], "{}")
+        assert minimo <= time.perf_counter() - inicio < maximo
+    assert har.report()["espera_segundos"] == 0.0
+
+
+def test_corpo_binario_e_cookies():
+    entrada = _entry("{}", {}, encoding="base64")
+    entrada["response"]["content"]["text"] = base64.b64encode(b"\x89PNG").decode()
+    entrada["response"]["headers"] += [{"name": "Set-Cookie", "value": "a=1"}, {"name": "Set-Cookie", "value": "b=2"}]
+    status, headers, corpo = response_from(entrada)
+    assert status == 200 and corpo == b"\x89PNG"
+    assert headers["set-cookie"] == "a=1\nb=2"
+    assert request_key("post", URL + "#x", None) == ("POST", URL, "")
+
+
+def test_configuracao_invalida(tmp_path):
+    with pytest.raises(ValueError):
+        HarSession(mode="tocar")
+    with pytest.raises(ValueError):
+        HarSession(mode="replay", path=str(tmp_path / "inexistente.har"))
+    with pytest.raises(ValueError):
+        HarSession(mode="record", path=str(tmp_path / "x.har"), timing="lenta")
+
+
+async def _login_navegacao(automation, browser):
+    context, page = await automation.open_session(browser, use_cache=False)
+    navegacao = page.get_by_role("navigation").filter(has_text="AcompanhamentosAgendaBusca")
+    await navegacao.wait_for(state="visible", timeout=10000)
+    await context.close()
+
+
+def test_login_gravado_roda_sem_o_servidor(tmp_path, monkeypatch):
+    """Login gravado contra o e-SUS simulado e repetido com o servidor já desligado."""
+    caminho = str(tmp_path / "login.har")
+
+    async def executar(modo):
+        monkeypatch.setattr(settings, "HAR_MODE", modo)
+        monkeypatch.setattr(settings, "HAR_PATH", caminho)
+        async with async_playwright() as p:
+            try:
+                browser = await p.chromium.launch(headless=True)
+            except PlaywrightError as e:
+                pytest.skip(f"Chromium do Playwright indisponível: {e}")
+            try:
+                automation = WebsiteAutomation()
+                await _login_navegacao(automation, browser)
+                return automation.har
+            finally:
+                await browser.close()
+
+    with MockEsusServer() as server:
+        for chave, valor in settings_for(server).items():
+            monkeypatch.setattr(settings, chave, valor)
+        asyncio.run(executar("record"))
+    har = asyncio.run(executar("replay"))
+    assert har.served > 0 and har.report()["nao_encontradas"] == 0
@@ -0,0 +1,17 @@
+# Testes do backend de logs
+import json
+import logging
+import logging.handlers
+from src.utils.logger import JsonFormatter, logger
+
+def test_logger_usa_fila():
+    """O logger da automação só enfileira; a escrita fica com o QueueListener."""
+    assert any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers)
+    assert not any(isinstance(h, logging.FileHandler) for h in logger.handlers)
+
+def test_formato_json():
+    """Cada registro vira uma linha JSON com a mensagem já formatada."""
+    record = logging.LogRecord("AutomationLogger", logging.INFO, __file__, 1, "Paciente %s: %s", ("Maria", "sucesso"), None)
+    linha = json.loads(JsonFormatter().format(record))
+    assert linha["message"] == "Paciente Maria: sucesso"
+    assert linha["level"] == "INFO"
@@ -0,0 +1,89 @@
+# Testes do notificador do Telegram contra um stub local da Bot API
+import asyncio
+from aiohttp import web
+from src.core.notifier import TelegramNotifier
+
+class BotApiStub:
+    """Servidor HTTP local que imita o sendMessage da Bot API."""
+
+    def __init__(self, retry_after_first=0):
+        self.messages = []
+        self.retry_after_first = retry_after_first
+        self.calls = 0
+
+    async def send_message(self, request):
+        self.calls += 1
+        dados = await request.post() if request.content_type != "application/json" else await request.json()
+        if self.retry_after_first and self.calls == 1:
+            return web.json_response(
+                {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                 "parameters": {"retry_after": self.retry_after_first}},
+                status=429,
+            )
+        self.messages.append(dados["text"])
+        return web.json_response({"ok": True, "result": {
+            "message_id": len(self.messages), "date": 0,
+            "chat": {"id": int(dados["chat_id"]), "type": "group"}, "text": dados["text"],
+        }})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", self.send_message)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+def notifier_for(stub, **kwargs):
+    return TelegramNotifier(token="123:abc", chat_id="-100", api_url=stub.url, min_interval=0, **kwargs)
+
+def test_agrupa_conclusoes_em_resumos():
+    """Cinco conclusões com batch_size=2 geram três mensagens numa única sessão."""
+    async def cenario():
+        async with BotApiStub() as stub:
+            notifier = notifier_for(stub, batch_size=2, interval=5)
+            for i in range(5):
+                notifier.notify(f"Paciente {i} concluído")
+            await notifier.close()
+            return stub, notifier
+
+    stub, notifier = asyncio.run(cenario())
+    assert len(stub.messages) == 3
+    assert stub.messages[0].startswith("Resumo: 2 notificações")
+    assert stub.messages[-1] == "Paciente 4 concluído"
+    assert notifier.sent == 3
+
+def test_respeita_retry_after():
+    """Um 429 com retry_after é aguardado e a mensagem é reenviada."""
+    async def cenario():
+        async with BotApiStub(retry_after_first=1) as stub:
+            notifier = notifier_for(stub, batch_size=1, interval=0)
+            notifier.notify("Automação concluída")
+            await notifier.close()
+            return stub, notifier
+
+    stub, notifier = asyncio.run(cenario())
+    assert stub.messages == ["Automação concluída"]
+    assert notifier.retries == 1 and notifier.failed == 0
+
+def test_notify_nao_bloqueia():
+    """notify retorna imediatamente mesmo com o envio lento."""
+    async def cenario():
+        async with BotApiStub() as stub:
+            notifier = notifier_for(stub, batch_size=1, interval=0)
+            loop = asyncio.get_running_loop()
+            inicio = loop.time()
+            for i in range(3):
+                notifier.notify(f"Paciente {i}")
+            decorrido = loop.time() - inicio
+            await notifier.close()
+            return decorrido, stub
+
+    decorrido, stub = asyncio.run(cenario())
+    assert decorrido < 0.05
+    assert len(stub.messages) == 3
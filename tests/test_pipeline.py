@@ -0,0 +1,111 @@
+# Testes do pipeline de etapas com checkpoints e backoff
+import asyncio
+import pytest
+from src.core.checkpoints import CheckpointStore
+from src.core.pipeline import STEPS, PatientPipeline, parse_backoff
+
+class FakeKeyboard:
+    async def press(self, key):
+        pass
+
+class FakePage:
+    keyboard = FakeKeyboard()
+
+class FakeAutomation:
+    unidade = "UBS A"
+
+    async def is_logged_out(self, page):
+        return False
+
+class FakeSteps:
+    """Etapas que registram as chamadas e falham nas etapas/vezes indicadas."""
+
+    def __init__(self, falhas=None):
+        self.falhas = dict(falhas or {})
+        self.chamadas = []
+
+    def mapping(self):
+        def etapa(nome):
+            async def executar(page, entry, concluidas):
+                self.chamadas.append(nome)
+                if self.falhas.get(nome, 0) > 0:
+                    self.falhas[nome] -= 1
+                    raise Exception(f"{nome} falhou")
+                return {"etapa": nome, "anteriores": sorted(concluidas)}
+            return executar
+        return {nome: etapa(nome) for nome in STEPS}
+
+ENTRADA = {"paciente": "Maria", "enfermeiro": "ANA"}
+
+def pipeline(tmp_path, steps, retries=0):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    return PatientPipeline(FakeAutomation(), store, steps=steps.mapping(), retries=retries, backoff={"padrao": 0})
+
+def test_retomada_comeca_na_primeira_etapa_pendente(tmp_path):
+    """Depois de uma falha no SOAP, a nova execução não repete agendamento, remoção nem atendimento."""
+    primeira = FakeSteps(falhas={"soap": 1})
+    with pytest.raises(Exception, match="soap falhou"):
+        asyncio.run(pipeline(tmp_path, primeira).run(FakePage(), ENTRADA, "run"))
+    assert primeira.chamadas == ["agendamento", "remocao", "atendimento", "soap"]
+
+    segunda = FakeSteps()
+    retomadas = asyncio.run(pipeline(tmp_path, segunda).run(FakePage(), ENTRADA, "run"))
+    assert retomadas == ["agendamento", "remocao", "atendimento"]
+    assert segunda.chamadas == ["soap", "notificacao"]
+
+def test_novas_tentativas_na_mesma_execucao(tmp_path):
+    """Uma falha transitória é repetida na própria etapa, sem refazer as anteriores."""
+    etapas = FakeSteps(falhas={"soap": 2})
+    asyncio.run(pipeline(tmp_path, etapas, retries=2).run(FakePage(), ENTRADA, "run"))
+    assert etapas.chamadas == ["agendamento", "remocao", "atendimento", "soap", "soap", "soap", "notificacao"]
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    assert store.steps("run", "maria|ana|ubs a")["soap"]["tentativas"] == 3
+
+def test_etapas_que_gravam_so_sao_repetidas_apos_conferencia(tmp_path):
+    """Agendamento e atendimento só se repetem quando a conferência mostra que nada foi gravado."""
+    # Sem conferência: a falha é definitiva na primeira tentativa
+    etapas = FakeSteps(falhas={"atendimento": 1})
+    with pytest.raises(Exception, match="atendimento falhou"):
+        asyncio.run(pipeline(tmp_path, etapas, retries=2).run(FakePage(), ENTRADA, "sem"))
+    assert etapas.chamadas.count("atendimento") == 1
+
+    conferidas = []
+
+    async def agendamento_salvo(page, entry, tentativa):
+        conferidas.append("agendamento")
+        return {"agendamento": {"id": "42"}}
+
+    async def atendimento_salvo(page, entry, tentativa):
+        conferidas.append("atendimento")
+        return None
+
+    etapas = FakeSteps(falhas={"agendamento": 1, "atendimento": 1})
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    fluxo = PatientPipeline(FakeAutomation(), store, steps=etapas.mapping(), retries=2, backoff={"padrao": 0},
+                            verify={"agendamento": agendamento_salvo, "atendimento": atendimento_salvo})
+    asyncio.run(fluxo.run(FakePage(), ENTRADA, "com"))
+    # O agendamento foi gravado apesar da falha: não é refeito; o atendimento não foi, então é repetido
+    assert etapas.chamadas == ["agendamento", "remocao", "atendimento", "atendimento", "soap", "notificacao"]
+    assert conferidas == ["agendamento", "atendimento"]
+    assert store.steps("com", "maria|ana|ubs a")["agendamento"]["dados"] == {"agendamento": {"id": "42"}}
+
+    async def indisponivel(page, entry, tentativa):
+        raise Exception("agenda fora do ar")
+
+    # Sem como conferir, o erro original sobe sem nova tentativa
+    etapas = FakeSteps(falhas={"agendamento": 1})
+    fluxo = PatientPipeline(FakeAutomation(), store, steps=etapas.mapping(), retries=2, backoff={"padrao": 0},
+                            verify={"agendamento": indisponivel})
+    with pytest.raises(Exception, match="agendamento falhou"):
+        asyncio.run(fluxo.run(FakePage(), ENTRADA, "fora"))
+    assert etapas.chamadas == ["agendamento"]
+
+def test_backoff_por_etapa(monkeypatch):
+    """A espera base vem da etapa (ou do padrão), dobra a cada tentativa e respeita o teto."""
+    from src.config.settings import settings
+    monkeypatch.setattr(settings, "STEP_BACKOFF_MAX", 20)
+    backoff = parse_backoff("3,notificacao=10")
+    assert backoff == {"padrao": 3.0, "notificacao": 10.0}
+    etapas = PatientPipeline(FakeAutomation(), backoff=backoff, steps=FakeSteps().mapping())
+    assert [etapas.delay("soap", t) for t in (1, 2, 3)] == [3.0, 6.0, 12.0]
+    assert etapas.delay("notificacao", 2) == 20
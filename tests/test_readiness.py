@@ -0,0 +1,19 @@
+# Testes do registro de duração das esperas
+from src.utils.readiness import WaitStats
+
+def test_resumo_das_esperas():
+    """Agrega amostras por espera, incluindo timeouts."""
+    stats = WaitStats()
+    for segundos in (0.1, 0.2, 0.3):
+        stats.record("opcoes:agenda.profissional", segundos)
+    stats.record("calendario:agenda.grade", 1.0, ok=False)
+    resumo = stats.summary()
+    assert resumo["opcoes:agenda.profissional"]["n"] == 3
+    assert resumo["opcoes:agenda.profissional"]["max"] == 0.3
+    assert resumo["calendario:agenda.grade"]["timeouts"] == 1
+
+def test_espera_acima_do_orcamento_gera_aviso(caplog):
+    """Esperas acima do orçamento do tipo são registradas como lentas."""
+    stats = WaitStats()
+    stats.record("opcoes:lista.cidadao", 10.0)
+    assert "orçamento" in caplog.text
@@ -0,0 +1,177 @@
+# Testes da remoção de agendamentos pelos identificadores registrados na criação
+import asyncio
+import pytest
+from playwright.async_api import async_playwright, Error as PlaywrightError
+from src.core import automation as automation_module
+from src.core.agendamento import ScheduleAppointment, match_event
+from src.core.automation import WebsiteAutomation
+from src.core.checkpoints import CheckpointStore, patient_key
+from src.core.pipeline import appointment_from
+
+EVENTOS = [
+    {"id": "11", "title": "07:30: PACIENTE MOCK 001", "text": "PACIENTE MOCK 001"},
+    {"id": "12", "title": "08:00: PACIENTE MOCK 001", "text": "PACIENTE MOCK 001"},
+    {"id": "13", "title": "08:30: PACIENTE MOCK 002", "text": "PACIENTE MOCK 002"},
+]
+
+
+def test_evento_casado_pelo_id_ou_horario_e_cidadao():
+    assert match_event(EVENTOS, {"id": 12, "paciente": "PACIENTE MOCK 001", "horario": "07:30"}) == 1
+    # ID registrado que não está mais na grade: não cai no nome (seria outro agendamento do cidadão)
+    assert match_event(EVENTOS, {"id": 99, "paciente": "PACIENTE MOCK 001", "horario": "07:30"}) is None
+    sem_ids = [{**evento, "id": None} for evento in EVENTOS]
+    assert match_event(sem_ids, {"id": 12, "paciente": "paciente mock 001", "horario": "08:00"}) == 1
+    assert match_event(sem_ids, {"id": None, "paciente": "PACIENTE MOCK 002", "horario": "07:30"}) is None
+
+
+def test_checkpoint_antigo_vira_agendamento():
+    dados = {"views_advanced": 2, "horario": {"time": "08:00", "day_key": "Ter 21/10"}}
+    agendamento = appointment_from({"paciente": "MARIA", "enfermeiro": "ANA"}, dados)
+    assert agendamento == {
+        "id": None, "paciente": "MARIA", "enfermeiro": "ANA", "dia": "Ter 21/10", "horario": "08:00", "views_advanced": 2,
+    }
+    assert appointment_from({"paciente": "MARIA"}, {"agendamento": {"id": 5}}) == {"id": 5}
+
+
+def test_remocao_em_lote_marca_falhas_e_checkpoints(tmp_path, monkeypatch):
+    chamadas = []
+
+    class FakeScheduler:
+        def __init__(self, enfermeiro=None, **kwargs):
+            self.enfermeiro = enfermeiro
+
+        async def cancelar_agendamentos(self, page, agendamentos):
+            chamadas.append((self.enfermeiro, [a["id"] for a in agendamentos]))
+            return {
+                "removidos": [a for a in agendamentos if a["id"] != 2],
+                "pendentes": [{"agendamento": a, "motivo": "não encontrado na agenda"} for a in agendamentos if a["id"] == 2],
+            }
+
+    monkeypatch.setattr(automation_module, "ScheduleAppointment", FakeScheduler)
+    automation = WebsiteAutomation()
+    automation.checkpoints = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    automation.run_id = "run"
+    entradas = [{"paciente": f"P{i}"} for i in range(1, 4)]
+    resultados = [{"paciente": e["paciente"], "enfermeiro": "ANA", "status": "sucesso", "erro": None} for e in entradas]
+    # P3 falhou antes de agendar: não há o que remover
+    for i, entrada in enumerate(entradas[:2], start=1):
+        automation.pipeline.created[patient_key(entrada, automation.unidade)] = {"id": i, "paciente": entrada["paciente"]}
+
+    removidos = asyncio.run(automation.cancel_appointments(None, entradas, resultados))
+    assert removidos == 1
+    assert chamadas == [("ANA", [1, 2])]  # uma passada pela agenda da enfermeira
+    assert [r["status"] for r in resultados] == ["sucesso", "falha", "sucesso"]
+    assert resultados[1]["erro"] == "Agendamento não removido: não encontrado na agenda"
+    etapas = automation.checkpoints.steps("run", patient_key(entradas[0], automation.unidade))
+    assert etapas["remocao"]["status"] == "concluida" and etapas["remocao"]["dados"] == {"agendamento": 1}
+
+
+def test_retomada_nao_remove_de_novo_o_que_ja_saiu_da_agenda(tmp_path, monkeypatch):
+    """Com a remoção já concluída numa execução anterior, a remoção em lote não procura o agendamento de novo."""
+    from src.core.pipeline import BATCH_STEPS, PatientPipeline
+    from tests.test_pipeline import FakePage
+
+    chamadas = []
+
+    class AgendaVazia:
+        def __init__(self, enfermeiro=None, **kwargs):
+            pass
+
+        async def cancelar_agendamentos(self, page, agendamentos):
+            chamadas.append([a["id"] for a in agendamentos])
+            return {"removidos": [], "pendentes": [{"agendamento": a, "motivo": "não encontrado na agenda"} for a in agendamentos]}
+
+    falhar = {"atendimento": True}
+
+    async def etapa(nome, page, entry, concluidas):
+        if falhar.get(nome):
+            raise Exception(f"{nome} falhou")
+        return {"agendamento": {"id": 7, "paciente": entry["paciente"]}} if nome == "agendamento" else {}
+
+    def automacao():
+        automation = WebsiteAutomation()
+        automation.checkpoints = CheckpointStore(str(tmp_path / "checkpoints.db"))
+        automation.run_id = "run"
+        steps = {nome: (lambda nome: lambda *args: etapa(nome, *args))(nome) for nome in ("agendamento", "remocao", "atendimento", "soap", "notificacao")}
+        automation.pipeline = PatientPipeline(automation, automation.checkpoints, steps=steps, retries=0, backoff={"padrao": 0})
+        return automation
+
+    monkeypatch.setattr(automation_module, "ScheduleAppointment", AgendaVazia)
+    entrada = {"paciente": "MARIA", "enfermeiro": "ANA"}
+    primeira = automacao()
+    with pytest.raises(Exception, match="atendimento falhou"):
+        asyncio.run(primeira.pipeline.run(FakePage(), entrada, "run"))
+
+    falhar.clear()
+    retomada = automacao()
+    asyncio.run(retomada.pipeline.run(FakePage(), {**entrada, "etapas": BATCH_STEPS}, "run"))
+    resultados = [{"paciente": "MARIA", "enfermeiro": "ANA", "status": "sucesso", "erro": None}]
+    assert asyncio.run(retomada.cancel_appointments(None, [entrada], resultados)) == 0
+    # Mesmo com o agendamento ainda registrado, o checkpoint de remoção concluída prevalece
+    chave = patient_key(entrada, retomada.unidade)
+    retomada.pipeline.created[chave] = {"id": 7, "paciente": "MARIA"}
+    asyncio.run(retomada.cancel_appointments(None, [entrada], resultados))
+    assert chamadas == [] and resultados[0]["status"] == "sucesso"
+    assert retomada.checkpoints.steps("run", chave)["remocao"]["status"] == "concluida"
+
+
+def test_falha_num_evento_nao_interrompe_a_remocao():
+    """Um erro ao cancelar um evento vira pendência só dele; os demais continuam sendo removidos."""
+    class Teclado:
+        async def press(self, tecla):
+            pass
+
+    class Grade:
+        keyboard = Teclado()
+
+        def __init__(self):
+            self.eventos = [dict(evento) for evento in EVENTOS]
+
+        async def evaluate(self, script):
+            return [dict(evento) for evento in self.eventos]
+
+    class Agenda(ScheduleAppointment):
+        async def _open_agenda(self, page, etapa):
+            pass
+
+        async def _cancel_event(self, page, evento, agendamento):
+            if evento["id"] == "12":
+                raise Exception("menu de opções não abriu")
+            page.eventos = [e for e in page.eventos if e["id"] != evento["id"]]
+
+    agendamentos = [{"id": i, "paciente": "PACIENTE MOCK", "horario": None} for i in (11, 12, 13)]
+    resultado = asyncio.run(Agenda(enfermeiro="ANA").cancelar_agendamentos(Grade(), agendamentos))
+    assert [a["id"] for a in resultado["removidos"]] == [11, 13]
+    assert resultado["pendentes"] == [{"agendamento": agendamentos[1], "motivo": "falha ao cancelar: menu de opções não abriu"}]
+
+
+async def _agendar_e_remover(pacientes):
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f"Chromium do Playwright indisponível: {e}")
+        try:
+            automation = WebsiteAutomation()
+            context = await automation.new_context(browser)
+            page = await context.new_page()
+            await automation.login(page)
+            agendamentos = []
+            for paciente in pacientes:
+                scheduler = ScheduleAppointment(paciente=paciente)
+                await scheduler.schedule_appointment(page)
+                agendamentos.append(scheduler.appointment)
+            resultado = await ScheduleAppointment().cancelar_agendamentos(page, agendamentos)
+            return agendamentos, resultado
+        finally:
+            await browser.close()
+
+
+def test_remocao_em_lote_no_mock(mock_esus):
+    """Dois agendamentos criados e removidos numa única abertura da agenda, conferidos na grade."""
+    agendamentos, resultado = asyncio.run(_agendar_e_remover(["PACIENTE MOCK 001", "PACIENTE MOCK 002"]))
+    assert all(a["id"] is not None and a["horario"] for a in agendamentos)
+    assert resultado["removidos"] == agendamentos and resultado["pendentes"] == []
+    estado = mock_esus.mock
+    assert estado.appointments == {}
+    assert estado.calls["CancelarAgendamento"] == 2
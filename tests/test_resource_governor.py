@@ -0,0 +1,144 @@
+# Testes do governador de recursos: reciclagem de contextos e relançamento do navegador
+import asyncio
+from playwright.async_api import Error as PlaywrightError
+from src.core.context_pool import ContextPool
+from src.core.resource_governor import ResourceGovernor
+from src.utils.tracing import Tracer
+from tests.test_context_pool import FakeAutomation, FakeBrowser
+
+
+class FakeCDPSession:
+    def __init__(self, heap_mb):
+        self.heap_mb = heap_mb
+        self.enviados = []
+
+    async def send(self, metodo):
+        self.enviados.append(metodo)
+        if metodo == "Performance.getMetrics":
+            return {"metrics": [
+                {"name": "JSHeapUsedSize", "value": self.heap_mb * 1024 * 1024},
+                {"name": "Nodes", "value": 1500},
+                {"name": "JSEventListeners", "value": 80},
+            ]}
+        return {}
+
+
+class FakeMetricsContext:
+    def __init__(self, heap_mb=50, erro=None):
+        self.sessao = FakeCDPSession(heap_mb)
+        self.erro = erro
+
+    async def new_cdp_session(self, page):
+        if self.erro:
+            raise PlaywrightError(self.erro)
+        return self.sessao
+
+
+class FakeMetricsPage:
+    def __init__(self, **kwargs):
+        self.context = FakeMetricsContext(**kwargs)
+
+
+def test_limites_de_heap_e_de_fluxos():
+    governor = ResourceGovernor(max_flows=3, max_heap_mb=200, max_nodes=0)
+    page = FakeMetricsPage(heap_mb=120)
+    assert asyncio.run(governor.check(0, page)) is None
+    assert governor.last[0] == {"fluxos": 1, "heap_mb": 120.0, "nodes": 1500, "listeners": 80}
+    # A sessão CDP é aberta uma vez por página
+    page.context.sessao.heap_mb = 250
+    assert asyncio.run(governor.check(0, page)) == "heap"
+    assert page.context.sessao.enviados.count("Performance.enable") == 1
+    governor.retire(0, "heap")
+
+    page.context.sessao.heap_mb = 10
+    for _ in range(2):
+        assert asyncio.run(governor.check(0, page)) is None
+    assert asyncio.run(governor.check(0, page)) == "fluxos"
+    governor.retire(0, "fluxos")
+    stats = governor.stats()
+    assert stats["aposentados"] == {"heap": 1, "fluxos": 1} and stats["heap_mb_pico"] == 250.0
+    assert stats["fluxos_por_contexto"] == 2.5
+
+
+def test_sem_cdp_conta_so_os_fluxos():
+    governor = ResourceGovernor(max_flows=2, max_heap_mb=1)
+    page = FakeMetricsPage(erro="CDP session is only available in Chromium")
+    assert asyncio.run(governor.check(0, page)) is None
+    assert asyncio.run(governor.check(0, page)) == "fluxos"
+    assert governor.last[0] == {"fluxos": 2} and not governor._cdp_available
+
+
+def test_pool_recicla_contextos_sem_perder_pacientes():
+    async def cenario():
+        browser, automation = FakeBrowser(), FakeAutomation()
+        governor = ResourceGovernor(max_flows=2, max_heap_mb=0)
+        governor._cdp_available = False
+        pool = ContextPool(browser, automation, size=2, governor=governor)
+        await pool.start()
+        resultados = await pool.run([{"paciente": f"P{i}"} for i in range(8)])
+        stats = pool.stats()
+        await pool.close()
+        return browser, automation, resultados, stats
+
+    browser, automation, resultados, stats = asyncio.run(cenario())
+    assert [r["status"] for r in resultados] == ["sucesso"] * 8
+    # Cada contexto atende 2 pacientes: 2 iniciais + 4 trocas, sem novo login
+    assert stats["reciclados"] == 4 and automation.logins == 1
+    assert len(browser.contexts) == 6 and all(context.closed for context in browser.contexts)
+    assert stats["governador"]["aposentados"] == {"fluxos": 4}
+
+
+class CrashingBrowser(FakeBrowser):
+    def __init__(self):
+        super().__init__()
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+
+class CrashingAutomation(FakeAutomation):
+    def __init__(self, crash_for):
+        super().__init__()
+        self.crash_for = crash_for
+        self.browser = None
+
+    async def process_patient(self, page, entry):
+        if entry["paciente"] == self.crash_for and self.browser.connected:
+            self.browser.connected = False
+            return {"paciente": entry["paciente"], "status": "falha"}
+        return await super().process_patient(page, entry)
+
+
+def test_pool_relanca_o_navegador_e_repete_o_paciente():
+    async def cenario():
+        browser = CrashingBrowser()
+        automation = CrashingAutomation(crash_for="P1")
+        automation.browser = browser
+        novos = []
+
+        async def launch():
+            novos.append(CrashingBrowser())
+            return novos[-1]
+
+        pool = ContextPool(browser, automation, size=2, launch=launch, governor=False)
+        await pool.start()
+        resultados = await pool.run([{"paciente": f"P{i}"} for i in range(4)])
+        stats = pool.stats()
+        await pool.close()
+        return pool, novos, resultados, stats
+
+    pool, novos, resultados, stats = asyncio.run(cenario())
+    assert [r["status"] for r in resultados] == ["sucesso"] * 4
+    assert stats["relancamentos"] == 1 and pool.browser is novos[0]
+    assert len(novos[0].contexts) == 2
+
+
+def test_metricas_de_memoria_e_vazao_no_prometheus():
+    tracer = Tracer()
+    tracer.gauge("healthsync_context_heap_mb", 120.5, contexto=0)
+    tracer.gauge("healthsync_pool_flows_per_minute", 12.0)
+    texto = tracer.prometheus()
+    assert 'healthsync_context_heap_mb{contexto="0"} 120.5' in texto
+    assert "healthsync_pool_flows_per_minute 12.0" in texto
+    assert texto.count("# TYPE healthsync_context_heap_mb gauge") == 1
@@ -0,0 +1,116 @@
+# Testes do registro de seletores com variantes
+import asyncio
+import json
+import time
+import pytest
+from playwright.async_api import TimeoutError
+from src.utils.selector_registry import SelectorRegistry
+
+
+class FakeLocator:
+    """Locator que fica visível após `aparece_em` segundos (None: nunca aparece)."""
+
+    def __init__(self, aparece_em=None, partes=None):
+        self.aparece_em = aparece_em
+        self.partes = partes or [self]
+        self.inicio = time.monotonic()
+        self.esperas = 0
+
+    @property
+    def first(self):
+        return self
+
+    def or_(self, outro):
+        return FakeLocator(partes=self.partes + outro.partes)
+
+    def _visivel(self):
+        return any(p.aparece_em is not None and time.monotonic() - p.inicio >= p.aparece_em for p in self.partes)
+
+    async def wait_for(self, state="visible", timeout=None):
+        self.esperas += 1
+        limite = time.monotonic() + timeout / 1000
+        while not self._visivel():
+            if time.monotonic() >= limite:
+                raise TimeoutError(f"Timeout {timeout}ms")
+            await asyncio.sleep(0.005)
+
+    async def is_visible(self):
+        return self._visivel()
+
+    async def count(self):
+        return int(self._visivel())
+
+
+def registro(tmp_path, strategy="race", **variantes):
+    registry = SelectorRegistry(path=str(tmp_path / "selectors.json"), strategy=strategy, probe_ms=50)
+    registry.register("campo", *((nome, lambda page, loc=loc: loc) for nome, loc in variantes.items()))
+    return registry
+
+
+def test_race_nao_espera_o_timeout_da_primeira_variante(tmp_path):
+    registry = registro(tmp_path, nome=FakeLocator(None), cidadao=FakeLocator(0.02))
+    inicio = time.monotonic()
+    variante, _ = asyncio.run(registry.resolve(None, "campo", timeout=2000))
+    assert variante == "cidadao"
+    assert time.monotonic() - inicio < 1
+    assert registry.report()["campo"]["cidadao"] == {"tentativas": 1, "acertos": 1, "taxa": 1.0}
+    assert registry.report()["campo"]["nome"]["acertos"] == 0
+
+
+def test_race_respeita_a_preferencia_quando_ambas_presentes(tmp_path):
+    registry = registro(tmp_path, cbo_esf=FakeLocator(0), cbo_enfermeiro=FakeLocator(0))
+    assert asyncio.run(registry.resolve(None, "campo", timeout=500))[0] == "cbo_esf"
+
+
+def test_ordered_aprende_a_variante_que_funciona(tmp_path):
+    nome, cidadao = FakeLocator(None), FakeLocator(0)
+    registry = registro(tmp_path, strategy="ordered", nome=nome, cidadao=cidadao)
+    assert [v for v, _ in registry.order("campo")] == ["nome", "cidadao"]
+    assert asyncio.run(registry.resolve(None, "campo", timeout=1000))[0] == "cidadao"
+    assert nome.esperas == 1
+    # Com a taxa registrada, a variante certa passa à frente e a errada nem é aguardada
+    assert [v for v, _ in registry.order("campo")] == ["cidadao", "nome"]
+    asyncio.run(registry.resolve(None, "campo", timeout=1000))
+    assert nome.esperas == 1
+
+
+def test_nenhuma_variante(tmp_path):
+    registry = registro(tmp_path, nome=FakeLocator(None), cidadao=FakeLocator(None))
+    with pytest.raises(TimeoutError, match="nome, cidadao"):
+        asyncio.run(registry.resolve(None, "campo", timeout=50))
+    with pytest.raises(ValueError):
+        asyncio.run(registry.resolve(None, "inexistente"))
+
+
+def test_ordered_sem_orcamento_nao_espera_sem_limite(tmp_path):
+    """Sondagens que esgotam o orçamento não deixam a última variante com timeout=0 (espera sem fim)."""
+    nome, cidadao = FakeLocator(None), FakeLocator(None)
+    registry = registro(tmp_path, strategy="ordered", nome=nome, cidadao=cidadao)
+
+    async def resolver():
+        return await asyncio.wait_for(registry.resolve(None, "campo", timeout=50), 2)
+
+    with pytest.raises(TimeoutError, match="Nenhuma variante"):
+        asyncio.run(resolver())
+    assert (nome.esperas, cidadao.esperas) == (1, 0)
+
+
+def test_taxas_persistem_e_somam_entre_processos(tmp_path):
+    registry = registro(tmp_path, nome=FakeLocator(None), cidadao=FakeLocator(0))
+    asyncio.run(registry.resolve(None, "campo", timeout=200))
+    # Outro processo salvou enquanto este executava
+    with open(tmp_path / "selectors.json", "w", encoding="utf-8") as arquivo:
+        json.dump({"campo": {"cidadao": {"tentativas": 4, "acertos": 4}}}, arquivo)
+    registry.save()
+
+    nova = registro(tmp_path, strategy="ordered", nome=FakeLocator(None), cidadao=FakeLocator(0))
+    assert nova.report()["campo"]["cidadao"] == {"tentativas": 5, "acertos": 5, "taxa": 1.0}
+    assert nova.order("campo")[0][0] == "cidadao"
+
+
+def test_regex_compilada_uma_vez(tmp_path):
+    registry = SelectorRegistry(path=str(tmp_path / "selectors.json"))
+    assert registry.regex("ana mock") is registry.regex("ana mock")
+    assert registry.regex("ana mock").search("ANA MOCK SOUZA")
+    with pytest.raises(ValueError):
+        SelectorRegistry(strategy="aleatoria")
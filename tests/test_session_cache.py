@@ -0,0 +1,25 @@
+# Testes do cache de sessão criptografado
+import time
+from cryptography.fernet import Fernet
+from src.core.session_cache import SessionCache
+
+STATE = {"cookies": [{"name": "JSESSIONID", "value": "abc"}], "origins": []}
+
+def test_salva_e_carrega_sessao_criptografada(tmp_path):
+    """A sessão é gravada criptografada e recuperada para o mesmo usuário e unidade."""
+    cache = SessionCache(path=str(tmp_path / "session.bin"), ttl=60, key=Fernet.generate_key())
+    cache.save(STATE, "http://esus", "usuario", "UBS Centro", cbo="Enfermeiro", login_seconds=12.5)
+    assert b"JSESSIONID" not in (tmp_path / "session.bin").read_bytes()
+    payload = cache.load("http://esus", "usuario", "UBS Centro")
+    assert payload["storage_state"] == STATE
+    assert payload["cbo"] == "Enfermeiro"
+    assert cache.load("http://esus", "usuario", "Outra UBS") is None
+
+def test_sessao_expirada_e_descartada(tmp_path, monkeypatch):
+    """Sessões mais antigas que o TTL são removidas do disco."""
+    cache = SessionCache(path=str(tmp_path / "session.bin"), ttl=60, key=Fernet.generate_key())
+    cache.save(STATE, "http://esus", "usuario", "UBS Centro")
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + 120)
+    assert cache.load("http://esus", "usuario", "UBS Centro") is None
+    assert not (tmp_path / "session.bin").exists()
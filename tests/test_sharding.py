@@ -0,0 +1,63 @@
+# Testes da divisão do lote em processos por unidade/enfermeiro
+import asyncio
+import logging
+import os
+from src.core.sharding import merge_results, run_sharded, shard_worklist
+from src.utils.logger import logger
+
+def fake_runner(unidade, entradas, pool_size, run_id=None, fresh=False):
+    """Substitui o navegador no processo filho: falha o shard da unidade 'QUEBRADA'."""
+    logger.info("Processando %s pacientes de %s no pid %s", len(entradas), unidade, os.getpid())
+    if unidade == "QUEBRADA":
+        raise RuntimeError("navegador encerrado")
+    return [{"paciente": e["paciente"], "enfermeiro": e["enfermeiro"], "status": "sucesso", "pid": os.getpid()} for e in entradas]
+
+ENTRADAS = [
+    {"paciente": "P0", "unidade": "UBS A", "enfermeiro": "ANA"},
+    {"paciente": "P1", "unidade": "UBS B", "enfermeiro": "ANA"},
+    {"paciente": "P2", "unidade": "ubs a", "enfermeiro": "ana"},
+    {"paciente": "P3", "unidade": "UBS A", "enfermeiro": "BIA"},
+    {"paciente": "P4", "unidade": "QUEBRADA", "enfermeiro": "ANA"},
+]
+
+def test_divide_por_unidade_e_enfermeiro_sem_diferenciar_maiusculas():
+    """Entradas da mesma unidade/enfermeiro ficam no mesmo shard, com a posição original."""
+    shards = shard_worklist(ENTRADAS)
+    assert [(s["unidade"], s["enfermeiro"]) for s in shards] == [
+        ("UBS A", "ANA"), ("UBS B", "ANA"), ("UBS A", "BIA"), ("QUEBRADA", "ANA"),
+    ]
+    assert [i for i, _ in shards[0]["entradas"]] == [0, 2]
+
+def test_consolida_na_ordem_original():
+    """O relatório soma os shards e os resultados voltam à ordem da lista."""
+    shards = shard_worklist(ENTRADAS[:3])
+    parciais = {
+        0: [{"paciente": "P0", "status": "sucesso", "indice": 0}, {"paciente": "P2", "status": "falha", "indice": 2}],
+        1: [{"paciente": "P1", "status": "sucesso", "indice": 1}],
+    }
+    resultados, relatorio = merge_results(shards, parciais, {0: 1.0, 1: 2.0})
+    assert [r["paciente"] for r in resultados] == ["P0", "P1", "P2"]
+    assert [r["shard"] for r in resultados] == [0, 1, 0]
+    assert relatorio["sucessos"] == 2 and relatorio["falhas"] == 1
+    assert relatorio["shards"][0]["pacientes"] == 2
+
+def test_executa_shards_em_processos_e_reencaminha_logs():
+    """Cada shard roda em outro processo; logs dos filhos chegam ao logger do coordenador."""
+    mensagens = []
+
+    class Captura(logging.Handler):
+        def emit(self, record):
+            mensagens.append((record.name, record.getMessage()))
+
+    captura = Captura()
+    logger.addHandler(captura)
+    try:
+        resultados, relatorio = asyncio.run(run_sharded(ENTRADAS, workers=2, runner=fake_runner))
+    finally:
+        logger.removeHandler(captura)
+
+    assert [r["paciente"] for r in resultados] == ["P0", "P1", "P2", "P3", "P4"]
+    assert all(r["pid"] != os.getpid() for r in resultados if r["status"] == "sucesso")
+    assert resultados[4]["status"] == "falha" and "navegador encerrado" in resultados[4]["erro"]
+    assert relatorio["processos"] == 2 and relatorio["sucessos"] == 4
+    assert any(nome.endswith("shard-1") and "UBS B" in texto for nome, texto in mensagens)
@@ -0,0 +1,82 @@
+# Testes das políticas de escolha de horário sobre a grade capturada
+import asyncio
+import pytest
+from src.core.slot_scanner import FullDayCache, SlotIndex, matches_dom, to_minutes
+
+def grade():
+    horarios = ["07:00", "07:30", "08:00", "08:30", "09:00"]
+    livres = {"07:30", "08:30", "09:00"}
+    return SlotIndex([
+        {"index": i, "day": 0, "row": i, "label": None, "time": h, "header": "seg 20",
+         "classes": "rbc-time-slot" + (" rbc-time-slot-available" if h in livres else ""),
+         "available": h in livres}
+        for i, h in enumerate(horarios)
+    ])
+
+def test_to_minutes():
+    assert to_minutes("07:30") == 450
+    assert to_minutes("7h05") == 425
+    assert to_minutes("1:00 PM") == 780
+    assert to_minutes("sem horário") is None
+
+def test_politica_earliest():
+    assert grade().pick()["time"] == "07:30"
+
+def test_politica_closest():
+    assert grade().pick("closest", "08:40")["time"] == "08:30"
+
+def test_politica_after():
+    assert grade().pick("after", "08:31")["time"] == "09:00"
+    assert grade().pick("after", "10:00") is None
+
+def test_politica_invalida():
+    with pytest.raises(ValueError):
+        grade().candidates("closest")
+    with pytest.raises(ValueError):
+        grade().candidates("latest")
+
+def test_dias_lotados_na_visao_semanal():
+    """Colunas sem vaga são registradas e a visão é pulada quando todos os dias estão lotados."""
+    view = {"label": "20 – 21 out", "headers": ["seg 20", "ter 21"]}
+    index = SlotIndex([
+        {"index": 0, "day": 0, "row": 0, "time": "07:00", "available": False},
+        {"index": 1, "day": 1, "row": 0, "time": "07:00", "available": True},
+    ], view)
+    assert index.full_days() == {"seg 20"}
+
+    cache = FullDayCache()
+    cache.add("Ana Souza", index.full_days())
+    assert not cache.is_full("ANA SOUZA", view)
+    cache.add("Ana Souza", {"ter 21"})
+    assert cache.is_full("ana souza", view)
+    assert not cache.is_full("Outro Profissional", view)
+
+def test_dias_lotados_expiram_com_ttl():
+    """No daemon, um dia lotado deixa de valer depois do ttl (cancelamentos, virada do mês)."""
+    view = {"label": "20 out", "headers": ["seg 20"]}
+    agora = [0.0]
+    cache = FullDayCache(ttl=600, clock=lambda: agora[0])
+    cache.add("Ana Souza", {"seg 20"})
+    agora[0] = 599
+    assert cache.is_full("Ana Souza", view)
+    agora[0] = 600
+    assert not cache.is_full("Ana Souza", view)
+    cache.add("Ana Souza", {"seg 20"})
+    assert cache.is_full("Ana Souza", view)
+
+class GrupoNaTela:
+    """Página que devolve o dia e o horário de um grupo da grade (SLOT_AT_JS)."""
+
+    def __init__(self, grupo):
+        self.grupo = grupo
+
+    async def evaluate(self, script, index):
+        return self.grupo
+
+def test_slot_da_api_conferido_na_tela():
+    """O índice deduzido da API só vale se o grupo da tela for o mesmo dia e horário."""
+    slot = SlotIndex([{"index": 17, "day": 1, "row": 3, "time": "08:30", "available": True}], source="api").slots[0]
+    assert asyncio.run(matches_dom(GrupoNaTela({"day": 1, "row": 3, "time": "8:30"}), slot))
+    assert not asyncio.run(matches_dom(GrupoNaTela({"day": 1, "row": 3, "time": "09:00"}), slot))
+    assert not asyncio.run(matches_dom(GrupoNaTela({"day": 0, "row": 3, "time": "08:30"}), slot))
+    assert not asyncio.run(matches_dom(GrupoNaTela(None), slot))
@@ -0,0 +1,191 @@
+# Testes dos modelos de SOAP compilados em planos de passos
+import asyncio
+import json
+import pytest
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from src.config.settings import settings
+from src.core import soap_templates
+from src.core.atendimento import AttendanceList
+from src.core.automation import WebsiteAutomation
+from src.core.soap_templates import compile_template, load_plan, template_path
+from src.utils.autocomplete_cache import AutocompleteCache
+
+
+class FakeLocator:
+    """Locator que registra as ações no log da página."""
+
+    def __init__(self, page, descricao):
+        self.page = page
+        self.descricao = descricao
+
+    def __getattr__(self, nome):
+        if nome in ("first",):
+            return self
+        def encadeia(*args, **kwargs):
+            argumentos = [str(a) for a in args] + [f"{k}={v}" for k, v in kwargs.items()]
+            return FakeLocator(self.page, f"{self.descricao}.{nome}({', '.join(argumentos)})")
+        return encadeia
+
+    async def click(self, timeout=None):
+        if self.descricao in self.page.ausentes:
+            raise PlaywrightTimeoutError(f"{self.descricao} não apareceu")
+        self.page.log.append(("click", self.descricao))
+
+    async def fill(self, texto):
+        self.page.log.append(("fill", self.descricao, texto))
+
+    async def wait_for(self, **kwargs):
+        pass
+
+    async def inner_text(self):
+        return "FEBRE Código A03 Inclui: hipertermia, pirexia"
+
+
+class FakePage:
+    def __init__(self, ausentes=()):
+        self.log = []
+        self.ausentes = set(ausentes)  # Locators cujo clique esgota o tempo
+
+    def get_by_role(self, role, name=None, exact=False):
+        # Por substring, o rótulo de um código casaria com outras opções que o contêm
+        assert role != "option" or name is None or exact, f"opção '{name}' sem exact=True"
+        return FakeLocator(self, f"{role}:{name}")
+
+    def get_by_test_id(self, test_id):
+        return FakeLocator(self, test_id)
+
+    def locator(self, seletor):
+        return FakeLocator(self, seletor)
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    registro = []
+
+    async def wait_for_options(page, padrao=None, nome="opcoes", **kwargs):
+        registro.append(nome)
+
+    async def nada(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(soap_templates, "wait_for_options", wait_for_options)
+    monkeypatch.setattr(soap_templates, "wait_for_visible", nada)
+    monkeypatch.setattr(soap_templates, "wait_for_network_idle", nada)
+    return registro
+
+
+def test_modelo_padrao_compila_o_fluxo_a03():
+    plano = load_plan()
+    assert plano.nome == "a03"
+    assert plano.passos == [
+        ("aba", "SOAP"),
+        ("ciap", "motivo", "A03"),
+        ("ciap", "problema", "A03"),
+        ("adicionar_problema",),
+        ("alta", 0),
+        ("finalizar",),
+    ]
+    # Compilado uma vez por processo
+    assert load_plan("a03") is plano
+
+
+def test_varios_problemas_e_campos_de_texto(tmp_path):
+    modelo = {
+        "nome": "cronicos",
+        "campos": {"Subjetivo": "Retorno"},
+        "motivo": ["r05"],
+        "problemas": ["K86", {"ciap": "T90"}, {"ciap": "R05", "alta": True}],
+    }
+    arquivo = tmp_path / "cronicos.json"
+    arquivo.write_text(json.dumps(modelo), encoding="utf-8")
+    plano = load_plan(str(arquivo))
+    assert plano.passos[1] == ("texto", "Subjetivo", "Retorno")
+    assert [p for p in plano.passos if p[0] == "ciap"] == [
+        ("ciap", "motivo", "R05"), ("ciap", "problema", "K86"), ("ciap", "problema", "T90"), ("ciap", "problema", "R05"),
+    ]
+    assert plano.passos[-2:] == [("alta", 2), ("finalizar",)]
+
+
+@pytest.mark.parametrize("modelo, erro", [
+    ({"problemas": ["A03"]}, "motivo"),
+    ({"motivo": "A3"}, "código CIAP inválido"),
+    ({"motivo": "A03", "problemas": [{"ciap": "A03", "obs": "x"}]}, "problema 1"),
+    ({"motivo": "A03", "alta": True}, "campos desconhecidos"),
+    ({"motivo": "A03", "campos": ["Subjetivo"]}, "campos"),
+    (["A03"], "objeto"),
+])
+def test_modelos_invalidos(modelo, erro):
+    with pytest.raises(ValueError, match=erro):
+        compile_template(modelo)
+
+
+def test_modelo_inexistente(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SOAP_TEMPLATES_DIR", str(tmp_path))
+    (tmp_path / "febre.yml").write_text("motivo: A03\n", encoding="utf-8")
+    assert template_path("febre").endswith("febre.yml")
+    with pytest.raises(ValueError, match="não encontrado"):
+        template_path("inexistente")
+
+
+def test_rotulo_em_cache_pula_a_busca(esperas, tmp_path):
+    plano = compile_template({"motivo": "A03", "problemas": [{"ciap": "A03", "alta": True}]})
+    labels = AutocompleteCache(path=str(tmp_path / "autocomplete.json"), enabled=True)
+    page = FakePage()
+    asyncio.run(plano.run(page, labels))
+    # Só a primeira seleção do código espera a busca; a segunda clica direto na opção conhecida
+    assert esperas == ["soap.motivo"]
+    assert labels.stats()["por_campo"] == {"soap.ciap": {"acertos": 1, "falhas": 1}}
+    assert labels.get("soap.ciap", "A03")["label"] == "FEBRE Código A03"
+    assert page.log.count(("click", "option:FEBRE Código A03")) == 2
+    assert page.log[-1] == ("click", "AtendimentoIndividualFooter.finalizar")
+
+    # Outro paciente do lote: nenhuma espera de busca
+    asyncio.run(plano.run(FakePage(), labels))
+    assert esperas == ["soap.motivo"]
+
+
+def test_rotulo_em_cache_desatualizado_refaz_a_busca(esperas, tmp_path):
+    plano = compile_template({"motivo": "A03", "problemas": []})
+    labels = AutocompleteCache(path=str(tmp_path / "autocomplete.json"), enabled=True)
+    labels.put("soap.ciap", "A03", label="FEBRE ANTIGA Código A03")
+    page = FakePage(ausentes={"option:FEBRE ANTIGA Código A03"})
+    asyncio.run(plano.run(page, labels))
+    # A opção guardada não apareceu: a entrada é trocada pelo rótulo atual, lido da busca
+    assert esperas == ["soap.motivo"]
+    assert labels.get("soap.ciap", "A03")["label"] == "FEBRE Código A03"
+    assert ("click", "option:FEBRE Código A03") in page.log
+
+
+def test_alta_marca_o_problema_certo(esperas, tmp_path):
+    plano = compile_template({"motivo": "A03", "problemas": ["K86", {"ciap": "R05", "alta": True}]})
+    labels = AutocompleteCache(path=str(tmp_path / "autocomplete.json"), enabled=True)
+    page = FakePage()
+    asyncio.run(plano.run(page, labels))
+    altas = [acao for acao in page.log if "Alta do episódio" in acao[1]]
+    # O span do segundo rótulo, e não o segundo span dentro dos rótulos
+    assert altas == [("click", "label.filter(has_text=Alta do episódio).nth(1).locator(span)")]
+
+
+async def _atender(paciente, modelo):
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f"Chromium do Playwright indisponível: {e}")
+        try:
+            automation = WebsiteAutomation()
+            _, page = await automation.open_session(browser, use_cache=False)
+            attendance = AttendanceList(paciente=paciente)
+            await attendance.lista_atendimento(page)
+            await attendance.abrir_atendimento(page)
+            await attendance.preencher_soap(page, modelo)
+            await page.get_by_test_id("adicionarCidadaoAtendimento").wait_for(state="visible")
+        finally:
+            await browser.close()
+
+
+def test_modelo_com_varios_problemas_no_mock(mock_esus):
+    asyncio.run(_atender("PACIENTE MOCK 003", "exemplo_multiplos"))
+    finalizado = mock_esus.mock.finished[-1]
+    assert finalizado["problemas"] == ["K86", "T90", "R05"]
+    assert finalizado["alta"] == [False, False, True]
@@ -0,0 +1,40 @@
+# Testes da instrumentação por spans
+import asyncio
+import json
+import pytest
+from src.utils.tracing import Tracer
+
+def test_spans_com_atributos_e_linhas():
+    """Spans herdam paciente/unidade e cada tarefa do pool ganha sua linha no trace."""
+    tracer = Tracer()
+
+    async def fluxo(slot, paciente):
+        with tracer.lane(f"contexto-{slot}"), tracer.attributes(paciente=paciente, unidade="UBS Centro"):
+            with tracer.span("agendamento"):
+                with tracer.span("autocomplete.agenda.profissional"):
+                    await asyncio.sleep(0.01)
+
+    async def cenario():
+        await asyncio.gather(fluxo(0, "Maria"), fluxo(1, "João"))
+
+    asyncio.run(cenario())
+    trace = tracer.chrome_trace()
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert len(spans) == 4
+    assert {e["args"]["paciente"] for e in spans} == {"Maria", "João"}
+    assert len({e["tid"] for e in spans}) == 2
+    assert json.dumps(trace)
+
+def test_span_com_erro_e_metricas_prometheus(tmp_path):
+    """Falhas marcam o span com status de erro e as métricas saem em texto Prometheus."""
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("login"):
+            raise ValueError("Unidade não encontrada")
+    with tracer.span("login"):
+        pass
+    metricas = tracer.prometheus()
+    assert 'healthsync_span_duration_seconds_count{span="login",status="error"} 1' in metricas
+    assert 'healthsync_span_duration_seconds_count{span="login",status="ok"} 1' in metricas
+    trace_path, metrics_path = tracer.export(str(tmp_path))
+    assert json.load(open(trace_path))["traceEvents"]
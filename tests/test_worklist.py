@@ -0,0 +1,40 @@
+# Testes para o carregamento da lista de trabalho do modo em lote
+import io
+import pytest
+from src.core.worklist import load_worklist
+
+def test_csv_com_cabecalho(tmp_path):
+    """Lê CSV com cabeçalho e colunas opcionais."""
+    arquivo = tmp_path / "fila.csv"
+    arquivo.write_text("paciente,enfermeiro\nMaria Silva,Ana Souza\nJoão Lima,\n", encoding="utf-8")
+    entradas = load_worklist(str(arquivo))
+    assert entradas == [
+        {"paciente": "Maria Silva", "enfermeiro": "Ana Souza", "unidade": None},
+        {"paciente": "João Lima", "enfermeiro": None, "unidade": None},
+    ]
+
+def test_csv_sem_cabecalho(tmp_path):
+    """Aceita uma coluna simples de nomes."""
+    arquivo = tmp_path / "fila.csv"
+    arquivo.write_text("Maria Silva\n\nJoão Lima\n", encoding="utf-8")
+    assert [e["paciente"] for e in load_worklist(str(arquivo))] == ["Maria Silva", "João Lima"]
+
+def test_csv_sem_cabecalho_com_paciente_no_nome(tmp_path):
+    """Um nome que contém "paciente" na primeira linha não é tomado por cabeçalho."""
+    arquivo = tmp_path / "fila.csv"
+    arquivo.write_text("Paciente Teste da Silva\nJoão Lima\n", encoding="utf-8")
+    assert [e["paciente"] for e in load_worklist(str(arquivo))] == ["Paciente Teste da Silva", "João Lima"]
+
+def test_jsonl_pela_entrada_padrao(monkeypatch):
+    """Detecta JSONL na entrada padrão."""
+    monkeypatch.setattr("sys.stdin", io.StringIO('{"paciente": "Maria Silva", "unidade": "UBS Centro"}\n"João Lima"\n'))
+    entradas = load_worklist("-")
+    assert entradas[0]["unidade"] == "UBS Centro"
+    assert entradas[1]["paciente"] == "João Lima"
+
+def test_entrada_sem_paciente(tmp_path):
+    """Rejeita entradas sem o nome do paciente."""
+    arquivo = tmp_path / "fila.jsonl"
+    arquivo.write_text('{"enfermeiro": "Ana Souza"}\n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_worklist(str(arquivo))